@@ -1,15 +1,14 @@
 # create_tables.py
-from database import engine, Base
-# Importa todos los modelos para que se registren con Base
-from modules.documents.models.user import User
-from modules.documents.models.document import Document
-from modules.documents.models.signature import Signature
+from database import engine
+from migrations import run_migrations
 
 def crear_tablas():
-    """Crea todas las tablas en la base de datos"""
-    print("🔍 Tablas a crear:", list(Base.metadata.tables.keys()))
-    Base.metadata.create_all(bind=engine)
-    print("✅ Tablas creadas exitosamente!")
+    """Aplica las migraciones de esquema pendientes"""
+    applied = run_migrations(engine)
+    if applied:
+        print(f"✅ Migraciones aplicadas: {', '.join(applied)}")
+    else:
+        print("✅ Esquema al día")
 
 if __name__ == "__main__":
     crear_tablas()
@@ -1,17 +1,154 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import NullPool
+
+DB_USER = os.getenv("DB_USER", "postgres")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "root")
+DB_HOST = os.getenv("DB_HOST", "db")
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_NAME = os.getenv("DB_NAME", "dp-db")
+
+DATABASE_URL = os.getenv(
+    "DATABASE_URL", f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+# Réplica de solo lectura opcional; si no se define, las lecturas van al primario.
+# Las rutas que leen de la réplica (p. ej. GET /documents) pueden no ver
+# durante unos instantes lo recién escrito en el primario (retraso de replicación).
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+# Pool de conexiones (por proceso)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Timeouts en milisegundos (0 = sin límite)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+DB_LOCK_TIMEOUT_MS = int(os.getenv("DB_LOCK_TIMEOUT_MS", "0"))
+
+# Detrás de pgbouncer (modo transacción): sin pool propio, sin parámetros de
+# arranque ni prepared statements, y timeouts con SET LOCAL por transacción
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
+
+
+def _parse_url(url: str) -> URL:
+    """Acepta también el alias postgres:// (Heroku, docker, etc.)"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgres":
+        parsed = parsed.set(drivername="postgresql" + parsed.drivername[len("postgres"):])
+    return parsed
+
+def _is_postgres(url: URL) -> bool:
+    return url.get_backend_name() == "postgresql"
+
+def is_postgres_url(url: str) -> bool:
+    return _is_postgres(_parse_url(url))
+
+def libpq_dsn(url: str) -> str:
+    """DSN sin driver (postgresql://...) para clientes directos como asyncpg.connect"""
+    return _parse_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+def _async_url(url: str) -> URL:
+    """Misma base con el driver asyncpg, sea cual sea el driver de la URL"""
+    return _parse_url(url).set(drivername="postgresql+asyncpg")
+
+def _timeouts() -> dict:
+    settings = {}
+    if DB_STATEMENT_TIMEOUT_MS:
+        settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+    if DB_LOCK_TIMEOUT_MS:
+        settings["lock_timeout"] = str(DB_LOCK_TIMEOUT_MS)
+    return settings
 
-DB_USER = "postgres"
-DB_PASSWORD = "root"
-DB_HOST = "db"
-DB_PORT = "5432"
-DB_NAME = "dp-db"
+def _pool_options() -> dict:
+    if DB_PGBOUNCER:
+        return {"poolclass": NullPool}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+def _set_local_timeouts(sync_engine):
+    settings = _timeouts()
+    if not settings:
+        return
 
-engine = create_engine(DATABASE_URL)
+    @event.listens_for(sync_engine, "begin")
+    def _on_begin(conn):
+        for name, value in settings.items():
+            conn.exec_driver_sql(f"SET LOCAL {name} = {value}")
+
+def build_engine(url: str):
+    parsed = _parse_url(url)
+    if not _is_postgres(parsed):
+        return create_engine(parsed)
+
+    connect_args = {}
+    settings = _timeouts()
+    if settings and not DB_PGBOUNCER:
+        connect_args["options"] = " ".join(f"-c {name}={value}" for name, value in settings.items())
+
+    sync_engine = create_engine(parsed, connect_args=connect_args, **_pool_options())
+    if DB_PGBOUNCER:
+        _set_local_timeouts(sync_engine)
+    return sync_engine
+
+def build_async_engine(url: str):
+    if not is_postgres_url(url):
+        parsed = _parse_url(url)
+        if parsed.drivername == "sqlite":
+            # Desarrollo/tests con SQLite: el motor asíncrono necesita aiosqlite
+            parsed = parsed.set(drivername="sqlite+aiosqlite")
+        return create_async_engine(parsed)
+
+    connect_args = {}
+    if DB_PGBOUNCER:
+        connect_args.update({"statement_cache_size": 0, "prepared_statement_cache_size": 0})
+    elif _timeouts():
+        connect_args["server_settings"] = _timeouts()
+
+    async_engine = create_async_engine(_async_url(url), connect_args=connect_args, **_pool_options())
+    if DB_PGBOUNCER:
+        _set_local_timeouts(async_engine.sync_engine)
+    return async_engine
+
+
+engine = build_engine(DATABASE_URL)
+read_engine = build_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else engine
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sesiones para rutas de solo lectura (réplica si está configurada)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Motor asíncrono (asyncpg) para routers que no deben ocupar un hilo esperando a Postgres
+async_engine = build_async_engine(DATABASE_URL)
+async_read_engine = build_async_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else async_engine
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
 Base = declarative_base()
+
+
+async def get_async_db():
+    """Dependency: sesión asíncrona sobre el primario"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """Dependency: sesión asíncrona de solo lectura (réplica si está configurada)"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,116 @@
+"""
+Pools para sacar trabajo bloqueante del event loop.
+
+- IO (hilos): consultas SQLAlchemy síncronas, lectura/escritura de archivos
+  y hashing incremental (hashlib libera el GIL con buffers grandes).
+- CPU (procesos): parseo de PDFs y otro trabajo intensivo en Python puro.
+
+Los tamaños se configuran con IO_POOL_SIZE y CPU_POOL_SIZE.
+"""
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+IO_POOL_SIZE = int(os.getenv("IO_POOL_SIZE", "16"))
+CPU_POOL_SIZE = int(os.getenv("CPU_POOL_SIZE", str(os.cpu_count() or 2)))
+
+class _TrackedPool:
+    """Executor creado bajo demanda que lleva la cuenta de tareas en curso."""
+
+    def __init__(self, name: str, factory: Callable[[int], Executor], max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        # Executor que atendió cada future, para reiniciar solo el que se rompió
+        self._owners: "weakref.WeakKeyDictionary[Future, Executor]" = weakref.WeakKeyDictionary()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory(self.max_workers)
+            executor = self._executor
+            self._in_flight += 1
+            self._submitted += 1
+        try:
+            future = executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._task_done(None)
+            raise
+        with self._lock:
+            self._owners[future] = executor
+        future.add_done_callback(self._task_done)
+        return future
+
+    def executor_for(self, future: Future) -> Optional[Executor]:
+        with self._lock:
+            return self._owners.get(future)
+
+    def reset_if(self, executor: Optional[Executor]) -> bool:
+        """
+        Descarta el executor indicado si sigue siendo el actual (p. ej. un
+        ProcessPoolExecutor roto); el siguiente submit crea uno nuevo. No toca
+        un reemplazo ya creado ni cancela su trabajo. Devuelve si lo descartó.
+        """
+        with self._lock:
+            if executor is None or self._executor is not executor:
+                return False
+            self._executor = None
+        executor.shutdown(wait=False)
+        return True
+
+    def _task_done(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.max_workers),
+                "submitted": self._submitted,
+                "completed": self._completed,
+            }
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+io_pool = _TrackedPool(
+    "io",
+    lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="io"),
+    IO_POOL_SIZE,
+)
+cpu_pool = _TrackedPool(
+    "cpu",
+    lambda n: ProcessPoolExecutor(max_workers=n),
+    CPU_POOL_SIZE,
+)
+
+async def run_io(fn: Callable, *args, **kwargs) -> Any:
+    """Ejecuta fn (DB/archivos) en el pool de hilos y espera el resultado."""
+    return await asyncio.wrap_future(io_pool.submit(functools.partial(fn, *args, **kwargs)))
+
+async def run_cpu(fn: Callable, *args) -> Any:
+    """Ejecuta fn (debe ser picklable) en el pool de procesos y espera el resultado."""
+    return await asyncio.wrap_future(cpu_pool.submit(fn, *args))
+
+def executor_metrics() -> Dict[str, Dict[str, Any]]:
+    return {pool.name: pool.metrics() for pool in (io_pool, cpu_pool)}
+
+def shutdown_executors():
+    io_pool.shutdown()
+    cpu_pool.shutdown()
@@ -1,36 +1,81 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import os
-import uvicorn
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from create_tables import crear_tablas
 from database import SessionLocal
+from execution import executor_metrics, shutdown_executors
 
-from modules.documents.job import start_deletion_job
-from modules.documents.models import User, UserRole
-from modules.documents.services import DocumentService
-from modules.auth.services.auth_service import AuthService
+# Solo lo necesario para registrar las rutas; los jobs, el seeder y sus
+# dependencias se importan en el lifespan o al usarse por primera vez.
+from modules.jobs.services.scheduler import shutdown_scheduler
+from modules.notifications.services.notification_hub import notification_hub
 from modules.notifications.controllers.notification_controller import router as notification_router
 from modules.documents.controllers.document_controller import router as document_router
 from modules.documents.controllers.signature_controller import router as signature_router
-from modules.auth.controllers.auth_controller import router as auth_router
+from modules.auth.controllers.auth_controller import router as auth_router, verify_admin
+
+APP_ENV = os.getenv("APP_ENV", "development")
+# "full": aplica migraciones y crea datos de prueba al iniciar (desarrollo).
+# "fast": solo arranca los jobs; las migraciones se aplican aparte con
+# `python create_tables.py` antes del despliegue.
+STARTUP_MODE = os.getenv("STARTUP_MODE", "fast" if APP_ENV == "production" else "full")
+
+# Duración (ms) de cada fase del arranque, expuesta en /metrics/startup
+startup_timings = {"modules_import": round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)}
+
+def _timed(phase: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    startup_timings[phase] = round((time.perf_counter() - started) * 1000, 1)
+    return result
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # --- Startup logic ---
-    print("🚀 Iniciando aplicación...")
-    crear_tablas()
-    print("✅ Tablas creadas exitosamente")
-    start_deletion_job()
+    print(f"🚀 Iniciando aplicación (modo {STARTUP_MODE})...")
+    started = time.perf_counter()
+    if STARTUP_MODE == "full":
+        from create_tables import crear_tablas
+        _timed("migrations", crear_tablas)
+    start_deletion_job, start_integrity_scrub_job, start_notification_retention_job, start_outbox_dispatch_job = (
+        _timed("jobs_import", _import_jobs)
+    )
+    _timed("deletion_job", start_deletion_job)
     print("✅ Job de auto-eliminación iniciado")
-    _crear_datos_prueba()
+    _timed("notification_retention_job", start_notification_retention_job)
+    print("✅ Job de retención de notificaciones iniciado")
+    _timed("integrity_scrub_job", start_integrity_scrub_job)
+    print("✅ Job de verificación de integridad iniciado")
+    _timed("outbox_dispatch_job", start_outbox_dispatch_job)
+    print("✅ Job de despacho de notificaciones iniciado")
+    _timed("notification_listener", notification_hub.start_listener)
+    if STARTUP_MODE == "full":
+        _timed("seed_data", _crear_datos_prueba)
+    startup_timings["lifespan_total"] = round((time.perf_counter() - started) * 1000, 1)
+    print(f"⏱️  Tiempos de arranque (ms): {startup_timings}")
     yield
     # --- Shutdown logic ---
+    shutdown_scheduler()
+    await notification_hub.stop_listener()
+    shutdown_executors()
     print("🛑 Aplicación detenida")
 
+def _import_jobs():
+    """Importa los jobs programados (y los servicios que ejecutan) al arrancar"""
+    from modules.documents.job import start_deletion_job, start_integrity_scrub_job
+    from modules.notifications.job import start_notification_retention_job, start_outbox_dispatch_job
+    return start_deletion_job, start_integrity_scrub_job, start_notification_retention_job, start_outbox_dispatch_job
+
 def _crear_datos_prueba():
     """Crea usuarios con contraseñas."""
+    from modules.auth.services.auth_service import AuthService
+    from modules.documents.models import User, UserRole
+
     with SessionLocal() as session:
         if session.query(User).count() > 0:
             print("✅ Datos de prueba ya existen")
@@ -113,5 +158,36 @@ app.include_router(notification_router, prefix="/notifications", tags=["notifica
 app.include_router(document_router, prefix="/documents", tags=["documents"])
 app.include_router(signature_router, prefix="/documents", tags=["documents"])
 
+@app.get("/metrics/executors", tags=["metrics"], dependencies=[Depends(verify_admin)])
+def get_executor_metrics():
+    """Tareas en curso y profundidad de cola de los pools de ejecución"""
+    return executor_metrics()
+
+@app.get("/metrics/jobs", tags=["metrics"], dependencies=[Depends(verify_admin)])
+def get_job_runs(job_name: Optional[str] = None, limit: int = 50):
+    """Últimas ejecuciones de los jobs programados (job_runs). Solo administradores: detail incluye errores."""
+    from modules.jobs.services.job_runner import JobRunner
+
+    with SessionLocal() as session:
+        return [
+            {
+                "id": run.id,
+                "job_name": run.job_name,
+                "status": run.status.value,
+                "started_at": run.started_at,
+                "finished_at": run.finished_at,
+                "duration_seconds": run.duration_seconds,
+                "detail": run.detail,
+                "worker": run.worker,
+            }
+            for run in JobRunner.recent_runs(session, job_name, min(limit, 500))
+        ]
+
+@app.get("/metrics/startup", tags=["metrics"], dependencies=[Depends(verify_admin)])
+def get_startup_metrics():
+    """Modo de arranque y duración de cada fase en milisegundos"""
+    return {"mode": STARTUP_MODE, "timings_ms": startup_timings}
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,96 @@
+"""
+Migraciones de esquema versionadas.
+
+Cada módulo en migrations/versions/ se llama <NNNN>_<descripcion>.py y define
+upgrade(conn). Las versiones aplicadas quedan en la tabla schema_migrations y
+cada migración corre en su propia transacción; en Postgres sus índices se
+construyen después con CREATE INDEX CONCURRENTLY (ver ops.create_index). En
+Postgres se toma un advisory lock para que varios workers arrancando a la vez
+no migren en paralelo.
+
+Las migraciones deben ser idempotentes (usar los helpers de migrations.ops),
+ya que las bases creadas por el create_tables anterior no tienen registro en
+schema_migrations aunque ya tengan parte del esquema. 0001 es el esquema base
+congelado: no usa los modelos, que reflejan el resultado de todas las migraciones.
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from migrations import versions
+from migrations.ops import build_index_concurrently, take_deferred_indexes
+
+MIGRATIONS_LOCK_ID = 724_001  # id arbitrario para pg_advisory_lock
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def discover_migrations() -> List[Tuple[str, object]]:
+    found = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        version = info.name.split("_", 1)[0]
+        module = importlib.import_module(f"{versions.__name__}.{info.name}")
+        found.append((version, module))
+    return sorted(found, key=lambda item: item[0])
+
+def _applied_versions(conn: Connection) -> set:
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def _lock(conn: Connection):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATIONS_LOCK_ID})
+
+def _unlock(conn: Connection):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATIONS_LOCK_ID})
+
+def _record(conn: Connection, version: str):
+    conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.utcnow()))
+
+def _apply(bind: Engine, version: str, module) -> bool:
+    with bind.begin() as conn:
+        if version in _applied_versions(conn):
+            return False
+        print(f"🔧 Aplicando migración {module.__name__.rsplit('.', 1)[-1]}")
+        take_deferred_indexes(conn)  # restos de una migración fallida en esta conexión
+        module.upgrade(conn)
+        deferred = take_deferred_indexes(conn)
+        if not deferred:
+            _record(conn, version)
+            return True
+
+    # Índices en Postgres: CONCURRENTLY no puede correr dentro de una
+    # transacción. Si un build falla, la versión no queda registrada y la
+    # migración (idempotente) se repite completa en el próximo arranque.
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for spec in deferred:
+            print(f"   ↳ índice {spec.name} (CONCURRENTLY)")
+            build_index_concurrently(conn, spec)
+    with bind.begin() as conn:
+        _record(conn, version)
+    return True
+
+def run_migrations(bind: Optional[Engine] = None) -> List[str]:
+    """Aplica las migraciones pendientes. Devuelve las versiones aplicadas."""
+    if bind is None:
+        from database import engine as bind
+
+    # Lock de sesión sobre una conexión en autocommit: una transacción abierta
+    # durante toda la corrida haría esperar indefinidamente a CREATE INDEX CONCURRENTLY
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        _lock(lock_conn)
+        try:
+            with bind.begin() as conn:
+                _metadata.create_all(conn, checkfirst=True)
+            return [version for version, module in discover_migrations() if _apply(bind, version, module)]
+        finally:
+            _unlock(lock_conn)
@@ -0,0 +1,76 @@
+"""Operaciones idempotentes para usar dentro de las migraciones."""
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+# Clave en Connection.info con los índices a construir fuera de la transacción
+DEFERRED_INDEXES_KEY = "migrations_deferred_indexes"
+
+def has_table(conn: Connection, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(col["name"] == column for col in inspect(conn).get_columns(table))
+
+def add_column(conn: Connection, table: str, column: str, ddl: str):
+    """ddl: tipo y restricciones, p. ej. 'BOOLEAN NOT NULL DEFAULT false'"""
+    if not has_column(conn, table, column):
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+def create_table(conn: Connection, table):
+    """Crea la tabla (definida y congelada en la migración) si no existe."""
+    table.create(conn, checkfirst=True)
+
+@dataclass(frozen=True)
+class IndexSpec:
+    name: str
+    table: str
+    columns: Tuple[str, ...]
+    unique: bool = False
+    where: Optional[str] = None
+
+    def sql(self, concurrently: bool = False) -> str:
+        sql = (
+            f"CREATE {'UNIQUE ' if self.unique else ''}INDEX {'CONCURRENTLY ' if concurrently else ''}"
+            f"IF NOT EXISTS {self.name} ON {self.table} ({', '.join(self.columns)})"
+        )
+        if self.where:
+            sql += f" WHERE {self.where}"
+        return sql
+
+def create_index(
+    conn: Connection,
+    name: str,
+    table: str,
+    columns: Iterable[str],
+    unique: bool = False,
+    where: Optional[str] = None
+):
+    """
+    En Postgres solo registra el índice: run_migrations lo construye con
+    CREATE INDEX CONCURRENTLY al confirmar la migración, fuera de su
+    transacción, para no bloquear las escrituras sobre la tabla.
+    """
+    spec = IndexSpec(name, table, tuple(columns), unique, where)
+    if conn.dialect.name == "postgresql":
+        conn.info.setdefault(DEFERRED_INDEXES_KEY, []).append(spec)
+    else:
+        conn.exec_driver_sql(spec.sql())
+
+def take_deferred_indexes(conn: Connection) -> List[IndexSpec]:
+    """Devuelve y olvida los índices registrados en esta conexión."""
+    return conn.info.pop(DEFERRED_INDEXES_KEY, [])
+
+def build_index_concurrently(conn: Connection, spec: IndexSpec):
+    """
+    conn debe estar en modo autocommit. Un índice INVALID (build interrumpido
+    o unicidad violada en un intento anterior) se elimina y se reconstruye.
+    """
+    valid = conn.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": spec.name}
+    ).scalar()
+    if valid is False:
+        conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {spec.name}")
+    conn.exec_driver_sql(spec.sql(concurrently=True))
@@ -0,0 +1,62 @@
+"""
+Esquema base: las tablas que creaba create_tables.py antes de las migraciones.
+
+Está congelado aquí en lugar de leerse de los modelos: los modelos cambian con
+cada migración posterior, y estas deben encontrar el esquema base tal cual.
+En una base creada por el create_tables anterior no hace nada.
+"""
+from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, Integer, MetaData, String, Table
+
+baseline = MetaData()
+
+Table(
+    "users", baseline,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("email", String, unique=True, nullable=False),
+    Column("password_hash", String, nullable=False),
+    Column(
+        "role",
+        Enum("EMPLOYEE", "SUPERVISOR", "SIGNER", "INSTITUTIONAL_MANAGER", "ADMIN", name="userrole"),
+        nullable=False
+    ),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "documents", baseline,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("file_path", String, nullable=False),
+    Column("file_size", Integer, nullable=False),
+    Column("status", Enum("IN_REVIEW", "SIGNED", "REJECTED", name="documentstatus"), nullable=False),
+    Column("upload_date", DateTime),
+    Column("rejection_date", DateTime),
+    Column("signed_date", DateTime),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+)
+
+Table(
+    "signatures", baseline,
+    Column("id", Integer, primary_key=True),
+    Column("document_id", Integer, ForeignKey("documents.id"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("ts", DateTime, nullable=False),
+    Column("order", Integer, nullable=False),
+    Column("sha256_hash", String(64), nullable=False),
+)
+
+Table(
+    "notifications", baseline,
+    Column("id", Integer, primary_key=True),
+    Column("title", String(255), nullable=False),
+    Column("message", String(1024), nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("read", Boolean),
+)
+
+def upgrade(conn):
+    baseline.create_all(bind=conn, checkfirst=True)
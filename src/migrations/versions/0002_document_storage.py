@@ -0,0 +1,43 @@
+"""Blobs por contenido, hash persistido, validación profunda y nombres únicos."""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+
+from migrations.ops import add_column, create_index, create_table
+
+frozen = MetaData()
+# Solo para resolver la clave foránea; la tabla ya existe (0001)
+Table("users", frozen, Column("id", Integer, primary_key=True))
+
+document_blobs = Table(
+    "document_blobs", frozen,
+    Column("sha256", String(64), primary_key=True),
+    Column("file_path", String, nullable=False),
+    Column("file_size", Integer, nullable=False),
+    Column("ref_count", Integer, nullable=False),
+    Column("created_at", DateTime),
+)
+
+document_name_counters = Table(
+    "document_name_counters", frozen,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("original_name", String, primary_key=True),
+    Column("next_suffix", Integer, nullable=False),
+)
+
+def upgrade(conn):
+    create_table(conn, document_blobs)
+    create_table(conn, document_name_counters)
+
+    add_column(conn, "documents", "blob_sha256", "VARCHAR(64) REFERENCES document_blobs (sha256)")
+    add_column(conn, "documents", "sha256_hash", "VARCHAR(64)")
+    add_column(conn, "documents", "file_mtime", "FLOAT")
+    add_column(conn, "documents", "needs_rehash", "BOOLEAN NOT NULL DEFAULT false")
+    add_column(conn, "documents", "pdf_valid", "BOOLEAN")
+
+    # Duplicados previos (carreras del cálculo anterior) se renombran antes
+    # de exigir unicidad de (user_id, name)
+    conn.exec_driver_sql(
+        "UPDATE documents SET name = name || ' (' || CAST(id AS VARCHAR) || ')' "
+        "WHERE EXISTS (SELECT 1 FROM documents o "
+        "WHERE o.user_id = documents.user_id AND o.name = documents.name AND o.id < documents.id)"
+    )
+    create_index(conn, "uq_documents_user_id_name", "documents", ["user_id", "name"], unique=True)
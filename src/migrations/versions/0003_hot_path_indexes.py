@@ -0,0 +1,11 @@
+"""Índices para listados, limpieza de rechazados, firmas y notificaciones."""
+from migrations.ops import create_index
+
+def upgrade(conn):
+    create_index(conn, "ix_documents_user_id_upload_date", "documents", ["user_id", "upload_date"])
+    create_index(
+        conn, "ix_documents_rejected_rejection_date", "documents", ["rejection_date"],
+        where="status = 'REJECTED'"
+    )
+    create_index(conn, "ix_signatures_document_id", "signatures", ["document_id"])
+    create_index(conn, "ix_notifications_user_id_created_at", "notifications", ["user_id", "created_at"])
@@ -0,0 +1,5 @@
+"""Índice para el listado paginado por (upload_date, id)."""
+from migrations.ops import create_index
+
+def upgrade(conn):
+    create_index(conn, "ix_documents_upload_date_id", "documents", ["upload_date", "id"])
@@ -0,0 +1,5 @@
+"""Versión de token por usuario para revocar tokens sin estado."""
+from migrations.ops import add_column
+
+def upgrade(conn):
+    add_column(conn, "users", "token_version", "INTEGER NOT NULL DEFAULT 0")
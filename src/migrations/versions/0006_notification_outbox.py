@@ -0,0 +1,20 @@
+"""Outbox de notificaciones escrito junto con el cambio de estado."""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+
+from migrations.ops import create_table
+
+frozen = MetaData()
+# Solo para resolver la clave foránea; la tabla ya existe (0001)
+Table("users", frozen, Column("id", Integer, primary_key=True))
+
+notification_outbox = Table(
+    "notification_outbox", frozen,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("title", String(255), nullable=False),
+    Column("message", String(1024), nullable=False),
+    Column("created_at", DateTime, nullable=False),
+)
+
+def upgrade(conn):
+    create_table(conn, notification_outbox)
@@ -0,0 +1,9 @@
+"""Índice parcial de notificaciones no leídas (badge y feed filtrado)."""
+from migrations.ops import create_index
+
+def upgrade(conn):
+    where = "read = false" if conn.dialect.name == "postgresql" else "read = 0"
+    create_index(
+        conn, "ix_notifications_user_id_unread", "notifications",
+        ["user_id", "created_at", "id"], where=where
+    )
@@ -0,0 +1,6 @@
+"""Índice parcial de notificaciones leídas por fecha (job de retención)."""
+from migrations.ops import create_index
+
+def upgrade(conn):
+    where = "read = true" if conn.dialect.name == "postgresql" else "read = 1"
+    create_index(conn, "ix_notifications_read_created_at", "notifications", ["created_at"], where=where)
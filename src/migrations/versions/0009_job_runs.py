@@ -0,0 +1,20 @@
+"""Historial de ejecuciones de los jobs programados."""
+from sqlalchemy import Column, DateTime, Enum, Float, Integer, MetaData, String, Table
+
+from migrations.ops import create_index, create_table
+
+job_runs = Table(
+    "job_runs", MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("job_name", String(100), nullable=False),
+    Column("status", Enum("RUNNING", "SUCCEEDED", "FAILED", name="jobrunstatus"), nullable=False),
+    Column("started_at", DateTime, nullable=False),
+    Column("finished_at", DateTime),
+    Column("duration_seconds", Float),
+    Column("detail", String(2000)),
+    Column("worker", String(255)),
+)
+
+def upgrade(conn):
+    create_table(conn, job_runs)
+    create_index(conn, "ix_job_runs_job_name_started_at", "job_runs", ["job_name", "started_at"])
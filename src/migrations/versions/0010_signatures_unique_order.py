@@ -0,0 +1,19 @@
+"""Orden de firma único por documento."""
+from migrations.ops import create_index
+
+def upgrade(conn):
+    # Firmas con orden repetido (carreras previas): se renumeran por orden,
+    # fecha e id antes de exigir unicidad
+    conn.exec_driver_sql(
+        'UPDATE signatures SET "order" = ('
+        '  SELECT r.rn FROM ('
+        '    SELECT id, ROW_NUMBER() OVER (PARTITION BY document_id ORDER BY "order", ts, id) AS rn'
+        '    FROM signatures'
+        '  ) r WHERE r.id = signatures.id'
+        ') WHERE document_id IN ('
+        '  SELECT document_id FROM signatures GROUP BY document_id, "order" HAVING COUNT(*) > 1'
+        ')'
+    )
+    create_index(
+        conn, "uq_signatures_document_id_order", "signatures", ["document_id", '"order"'], unique=True
+    )
@@ -0,0 +1,6 @@
+"""Marca de actualización de usuarios (recarga incremental de versiones de token)."""
+from migrations.ops import add_column, create_index
+
+def upgrade(conn):
+    add_column(conn, "users", "updated_at", "TIMESTAMP")
+    create_index(conn, "ix_users_updated_at", "users", ["updated_at"])
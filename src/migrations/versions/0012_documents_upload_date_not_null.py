@@ -0,0 +1,11 @@
+"""upload_date obligatorio: la paginación por cursor ordena por (upload_date, id)."""
+
+def upgrade(conn):
+    # Filas antiguas sin fecha: se usa la primera fecha conocida del documento
+    conn.exec_driver_sql(
+        "UPDATE documents SET upload_date = COALESCE(signed_date, rejection_date, CURRENT_TIMESTAMP) "
+        "WHERE upload_date IS NULL"
+    )
+    # SQLite no admite ALTER COLUMN; ahí lo garantiza el default del modelo
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("ALTER TABLE documents ALTER COLUMN upload_date SET NOT NULL")
@@ -1,10 +1,14 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from database import SessionLocal
-from modules.auth.services.auth_service import AuthService, ACCESS_TOKEN_EXPIRE_MINUTES
+from database import ReadSessionLocal, SessionLocal, get_async_db
+from modules.auth.services.auth_service import AuthService, TokenPrincipal, ACCESS_TOKEN_EXPIRE_MINUTES
+from modules.auth.services.password_hasher import PasswordHasherBusy, password_hasher
+from modules.auth.services.token_versions import token_versions
+from modules.auth.services.user_cache import CachedUser, user_cache
 from modules.auth.schemas.auth_schemas import (
     LoginRequest, TokenResponse, UserCreate, UserResponse,
     UserUpdate, UserListResponse
@@ -21,9 +25,19 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
     """Dependency para obtener usuario autenticado"""
-    user = AuthService.get_current_user(db, credentials.credentials)
+    user = await AuthService.get_current_user_async(db, credentials.credentials)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -32,7 +46,39 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         )
     return user
 
-def verify_institutional_manager(current_user: User = Depends(get_current_user)):
+async def get_token_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Dependency para chequeos de autorización: con tokens sin estado no
+    consulta la BD. Expone id, email y role.
+    """
+    principal = await AuthService.get_token_principal_async(db, credentials.credentials)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+async def get_stream_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Como get_token_principal, para respuestas de larga duración (SSE).
+    FastAPI cierra las dependencias con yield recién al terminar la
+    respuesta, así que la sesión se cierra aquí para devolver la conexión
+    al pool antes de empezar a transmitir.
+    """
+    try:
+        return await get_token_principal(credentials, db)
+    finally:
+        await db.close()
+
+def verify_institutional_manager(current_user: TokenPrincipal = Depends(get_token_principal)):
     """Verifica que el usuario actual sea un Gestor Institucional"""
     if current_user.role != UserRole.INSTITUTIONAL_MANAGER:
         raise HTTPException(
@@ -41,10 +87,29 @@ def verify_institutional_manager(current_user: User = Depends(get_current_user))
         )
     return current_user
 
+def verify_admin(current_user: TokenPrincipal = Depends(get_token_principal)):
+    """Verifica que el usuario actual sea administrador"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los administradores pueden realizar esta acción"
+        )
+    return current_user
+
+def _password_hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servicio de autenticación saturado, intente nuevamente",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/login", response_model=TokenResponse)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """Endpoint de login"""
-    user = AuthService.authenticate_user(db, login_data.email, login_data.password)
+    try:
+        user = await AuthService.authenticate_user_async(db, login_data.email, login_data.password)
+    except PasswordHasherBusy:
+        raise _password_hasher_busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -54,7 +119,7 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = AuthService.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=AuthService.build_token_claims(user), expires_delta=access_token_expires
     )
 
     return TokenResponse(
@@ -69,7 +134,7 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
 def register_user(
     user_data: UserCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(verify_institutional_manager)
+    current_user: TokenPrincipal = Depends(verify_institutional_manager)
 ):
     """Registro de usuarios (solo para Gestores Institucionales)"""
     # Verificar si el email ya existe
@@ -80,7 +145,10 @@ def register_user(
         )
 
     # Crear usuario
-    hashed_password = AuthService.get_password_hash(user_data.password)
+    try:
+        hashed_password = AuthService.get_password_hash(user_data.password)
+    except PasswordHasherBusy:
+        raise _password_hasher_busy()
     new_user = User(
         name=user_data.name,
         email=user_data.email,
@@ -92,6 +160,7 @@ def register_user(
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    user_cache.invalidate(new_user.email)
 
     return new_user
 
@@ -101,8 +170,8 @@ def list_users(
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros a devolver"),
     role: Optional[UserRole] = Query(None, description="Filtrar por rol"),
     is_active: Optional[bool] = Query(None, description="Filtrar por estado activo"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(verify_institutional_manager)
+    db: Session = Depends(get_read_db),
+    current_user: TokenPrincipal = Depends(verify_institutional_manager)
 ):
     """Listar usuarios (solo para Gestores Institucionales)"""
     query = db.query(User)
@@ -125,7 +194,7 @@ def list_users(
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(verify_institutional_manager)
+    current_user: TokenPrincipal = Depends(verify_institutional_manager)
 ):
     """Obtener un usuario específico (solo para Gestores Institucionales)"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -141,7 +210,7 @@ def update_user(
     user_id: int,
     user_data: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(verify_institutional_manager)
+    current_user: TokenPrincipal = Depends(verify_institutional_manager)
 ):
     """Actualizar un usuario (solo para Gestores Institucionales)"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -165,13 +234,23 @@ def update_user(
 
     # Si se actualiza la contraseña, hashearla
     if "password" in update_data:
-        update_data["password_hash"] = AuthService.get_password_hash(update_data.pop("password"))
+        try:
+            update_data["password_hash"] = AuthService.get_password_hash(update_data.pop("password"))
+        except PasswordHasherBusy:
+            raise _password_hasher_busy()
 
+    previous_email = user.email
     for field, value in update_data.items():
         setattr(user, field, value)
 
+    # Cambios que deben invalidar los tokens ya emitidos
+    if update_data.keys() & {"role", "is_active", "password_hash", "email"}:
+        AuthService.revoke_tokens(user)
+
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(previous_email, user.email)
+    token_versions.update(user.id, user.token_version, user.is_active)
 
     return user
 
@@ -179,7 +258,7 @@ def update_user(
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(verify_institutional_manager)
+    current_user: TokenPrincipal = Depends(verify_institutional_manager)
 ):
     """Eliminar un usuario (solo para Gestores Institucionales)"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -198,10 +277,22 @@ def delete_user(
 
     db.delete(user)
     db.commit()
+    user_cache.invalidate(user.email)
+    token_versions.remove(user.id)
 
     return {"message": "Usuario eliminado exitosamente"}
 
+@router.get("/cache/stats")
+def get_user_cache_stats(current_user: TokenPrincipal = Depends(verify_institutional_manager)):
+    """Estadísticas de la caché de usuarios autenticados (solo para Gestores Institucionales)"""
+    return user_cache.stats()
+
+@router.get("/password-hasher/stats")
+def get_password_hasher_stats(current_user: TokenPrincipal = Depends(verify_institutional_manager)):
+    """Estado del pool de bcrypt (solo para Gestores Institucionales)"""
+    return password_hasher.stats()
+
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(current_user: CachedUser = Depends(get_current_user)):
     """Obtener información del usuario actual"""
     return current_user
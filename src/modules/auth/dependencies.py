@@ -1,10 +1,10 @@
 from fastapi import Depends, HTTPException, status
-from modules.documents.models.user import User
+from modules.auth.services.auth_service import TokenPrincipal
 from modules.documents.services.permission import can_perform_action
-from modules.auth.controllers.auth_controller import get_current_user
+from modules.auth.controllers.auth_controller import get_token_principal
 
 def require_permission(action: str):
-    def dependency(current_user: User = Depends(get_current_user)):
+    def dependency(current_user: TokenPrincipal = Depends(get_token_principal)):
         if not can_perform_action(current_user.role, action):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -1,3 +1,10 @@
-from .auth_service import AuthService
+from .auth_service import AuthService, TokenPrincipal
+from .password_hasher import PasswordHasher, PasswordHasherBusy, password_hasher
+from .token_versions import TokenVersionTable, token_versions
+from .user_cache import CachedUser, UserCache, user_cache
 
-__all__ = ['AuthService']
+__all__ = [
+    'AuthService', 'TokenPrincipal', 'PasswordHasher', 'PasswordHasherBusy',
+    'password_hasher', 'TokenVersionTable', 'token_versions',
+    'CachedUser', 'UserCache', 'user_cache'
+]
@@ -1,28 +1,42 @@
+import os
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Union
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from modules.documents.models.user import User
+from database import AsyncSessionLocal
+from modules.documents.models.user import User, UserRole
+from modules.auth.services.password_hasher import password_hasher
+from modules.auth.services.token_versions import token_versions
+from modules.auth.services.user_cache import CachedUser, user_cache
 
 # Configuración
 SECRET_KEY = "your-secret-key-here"  # En producción usar variable de entorno
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Tokens con id, rol y versión del usuario: la autorización no consulta la BD
+STATELESS_TOKENS = os.getenv("AUTH_STATELESS_TOKENS", "0") == "1"
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@dataclass(frozen=True)
+class TokenPrincipal:
+    """Identidad tomada de los claims de un token sin estado"""
+    id: int
+    email: str
+    role: UserRole
 
 class AuthService:
 
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        """Verifica si la contraseña coincide con el hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        """Verifica si la contraseña coincide con el hash (pool de bcrypt)"""
+        return password_hasher.verify(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        """Genera hash de la contraseña"""
-        return pwd_context.hash(password)
+        """Genera hash de la contraseña (pool de bcrypt)"""
+        return password_hasher.hash(password)
 
     @staticmethod
     def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
@@ -30,10 +44,33 @@ class AuthService:
         user = db.query(User).filter(User.email == email).first()
         if not user:
             return None
-        if not AuthService.verify_password(password, user.password_hash):
+        valid, new_hash = password_hasher.verify_and_update(password, user.password_hash)
+        if not valid:
             return None
         if not user.is_active:
             return None
+        if new_hash:
+            # El costo configurado cambió: se re-hashea de forma transparente
+            user.password_hash = new_hash
+            db.commit()
+        return user
+
+    @staticmethod
+    async def authenticate_user_async(db: AsyncSession, email: str, password: str) -> Optional[User]:
+        """Autentica usuario por email y contraseña (sesión asíncrona)"""
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalars().first()
+        if not user:
+            return None
+        valid, new_hash = await password_hasher.verify_and_update_async(password, user.password_hash)
+        if not valid:
+            return None
+        if not user.is_active:
+            return None
+        if new_hash:
+            # El costo configurado cambió: se re-hashea de forma transparente
+            user.password_hash = new_hash
+            await db.commit()
         return user
 
     @staticmethod
@@ -48,6 +85,22 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
         return encoded_jwt
 
+    @staticmethod
+    def build_token_claims(user: User) -> dict:
+        """Claims del token de acceso; en modo sin estado incluye id, rol y versión"""
+        claims = {"sub": user.email}
+        if STATELESS_TOKENS:
+            claims.update({"uid": user.id, "role": user.role.value, "ver": user.token_version or 0})
+        return claims
+
+    @staticmethod
+    def decode_token(token: str) -> Optional[dict]:
+        """Verifica token JWT y retorna sus claims"""
+        try:
+            return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+
     @staticmethod
     def verify_token(token: str) -> Optional[str]:
         """Verifica token JWT y retorna el email del usuario"""
@@ -61,10 +114,71 @@ class AuthService:
             return None
 
     @staticmethod
-    def get_current_user(db: Session, token: str) -> Optional[User]:
-        """Obtiene usuario actual desde token"""
+    def get_current_user(db: Session, token: str) -> Optional[CachedUser]:
+        """Obtiene usuario actual desde token (usa la caché de usuarios)"""
         email = AuthService.verify_token(token)
         if email is None:
             return None
+        cached = user_cache.get(email)
+        if cached is not None:
+            return cached
         user = db.query(User).filter(User.email == email).first()
+        return AuthService._cache_user(email, user)
+
+    @staticmethod
+    async def get_current_user_async(db: AsyncSession, token: str) -> Optional[CachedUser]:
+        """Obtiene usuario actual desde token (sesión asíncrona, usa la caché de usuarios)"""
+        email = AuthService.verify_token(token)
+        if email is None:
+            return None
+        return await AuthService._load_user_async(db, email)
+
+    @staticmethod
+    async def get_token_principal_async(
+        db: AsyncSession, token: str
+    ) -> Optional[Union[TokenPrincipal, CachedUser]]:
+        """
+        Identidad para chequeos de autorización. Con tokens sin estado se arma
+        desde los claims validando la versión contra la tabla en memoria; para
+        tokens antiguos o usuarios aún no cargados se usa get_current_user.
+        """
+        payload = AuthService.decode_token(token)
+        if payload is None or payload.get("sub") is None:
+            return None
+
+        stateless = STATELESS_TOKENS and {"uid", "role", "ver"} <= payload.keys()
+        if stateless:
+            # Recarga en segundo plano; mientras tanto se usa la copia vigente
+            token_versions.refresh_in_background(AsyncSessionLocal)
+            valid = token_versions.check(payload["uid"], payload["ver"])
+            if valid is False:
+                return None
+            if valid:
+                return TokenPrincipal(id=payload["uid"], email=payload["sub"], role=UserRole(payload["role"]))
+
+        user = await AuthService._load_user_async(db, payload["sub"])
+        if stateless and user is not None and (not user.is_active or user.token_version != payload["ver"]):
+            # Tabla aún sin cargar o recarga fallida: la versión se valida contra el usuario
+            return None
         return user
+
+    @staticmethod
+    async def _load_user_async(db: AsyncSession, email: str) -> Optional[CachedUser]:
+        cached = user_cache.get(email)
+        if cached is not None:
+            return cached
+        result = await db.execute(select(User).where(User.email == email))
+        return AuthService._cache_user(email, result.scalars().first())
+
+    @staticmethod
+    def revoke_tokens(user: User):
+        """Invalida los tokens sin estado ya emitidos para el usuario (sin commit)"""
+        user.token_version = (user.token_version or 0) + 1
+
+    @staticmethod
+    def _cache_user(email: str, user: Optional[User]) -> Optional[CachedUser]:
+        if user is None:
+            return None
+        snapshot = CachedUser.from_user(user)
+        user_cache.set(email, snapshot)
+        return snapshot
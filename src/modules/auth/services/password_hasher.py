@@ -0,0 +1,79 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from passlib.context import CryptContext
+
+# Costo de bcrypt; al subirlo los hashes existentes se actualizan en el próximo login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "2.0"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+class PasswordHasherBusy(Exception):
+    """No hay capacidad para procesar la contraseña ahora (reintentar más tarde)"""
+    pass
+
+class PasswordHasher:
+    """
+    Ejecuta bcrypt en un pool de hilos propio y acotado (bcrypt libera el GIL),
+    separado de los hilos que atienden requests. Si la cola está llena la
+    operación se rechaza de inmediato, y si una tarea esperó en cola más de
+    queue_timeout se descarta sin calcular el hash.
+    """
+
+    def __init__(self, workers: int, max_queue: int, queue_timeout: float):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self.rejected = 0
+        self.expired = 0
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHasherBusy("Cola de contraseñas llena")
+        enqueued_at = time.monotonic()
+
+        def task():
+            try:
+                if time.monotonic() - enqueued_at > self.queue_timeout:
+                    self.expired += 1
+                    raise PasswordHasherBusy("Tiempo de espera en cola agotado")
+                return fn(*args)
+            finally:
+                self._slots.release()
+
+        return self._executor.submit(task)
+
+    def hash(self, password: str) -> str:
+        return self._submit(pwd_context.hash, password).result()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._submit(pwd_context.verify, password, hashed).result()
+
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(válida, nuevo_hash): nuevo_hash no es None si el costo cambió"""
+        return self._submit(pwd_context.verify_and_update, password, hashed).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(pwd_context.hash, password))
+
+    async def verify_and_update_async(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await asyncio.wrap_future(self._submit(pwd_context.verify_and_update, password, hashed))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "rounds": BCRYPT_ROUNDS,
+            "rejected": self.rejected,
+            "expired": self.expired,
+        }
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE, PASSWORD_HASH_QUEUE_TIMEOUT)
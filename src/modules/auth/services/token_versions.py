@@ -0,0 +1,122 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from modules.documents.models.user import User
+
+TOKEN_VERSION_REFRESH_SECONDS = float(os.getenv("TOKEN_VERSION_REFRESH_SECONDS", "30"))
+# Las recargas son incrementales (users.updated_at); cada tanto se recarga todo
+# para descartar usuarios eliminados en otros workers
+TOKEN_VERSION_FULL_RELOAD_SECONDS = float(os.getenv("TOKEN_VERSION_FULL_RELOAD_SECONDS", "600"))
+# Margen para relojes desfasados entre nodos y transacciones largas
+TOKEN_VERSION_OVERLAP_SECONDS = float(os.getenv("TOKEN_VERSION_OVERLAP_SECONDS", "5"))
+
+class TokenVersionTable:
+    """
+    Copia en memoria de (token_version, is_active) por usuario, recargada
+    cada refresh_seconds. Permite validar tokens sin estado: un token es
+    válido si su versión coincide con la del usuario y este sigue activo.
+    Subir users.token_version revoca todos los tokens emitidos antes.
+
+    La recarga trae solo los usuarios modificados desde la anterior y corre
+    en una única tarea de fondo: mientras tanto las requests siguen usando
+    la copia vigente.
+    """
+
+    def __init__(self, refresh_seconds: float, full_reload_seconds: float, overlap_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self._versions: Dict[int, Tuple[int, bool]] = {}
+        self._loaded_at = 0.0
+        self._full_loaded_at = 0.0
+        self._watermark: Optional[datetime] = None
+        self._refreshing = False
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._loaded_at >= self.refresh_seconds
+
+    def _needs_full_reload(self) -> bool:
+        return self._watermark is None or time.monotonic() - self._full_loaded_at >= self.full_reload_seconds
+
+    def _query(self, full: bool):
+        stmt = select(User.id, User.token_version, User.is_active)
+        if not full:
+            stmt = stmt.where(User.updated_at >= self._watermark - self.overlap)
+        return stmt
+
+    def _load(self, rows, full: bool, started_at: datetime):
+        versions = {row.id: (row.token_version or 0, bool(row.is_active)) for row in rows}
+        with self._lock:
+            if full:
+                self._versions = versions
+                self._full_loaded_at = time.monotonic()
+            else:
+                self._versions.update(versions)
+            self._loaded_at = time.monotonic()
+            self._watermark = started_at
+
+    def refresh(self, db: Session):
+        full, started_at = self._needs_full_reload(), datetime.utcnow()
+        self._load(db.execute(self._query(full)).all(), full, started_at)
+
+    async def refresh_async(self, db: AsyncSession):
+        full, started_at = self._needs_full_reload(), datetime.utcnow()
+        self._load((await db.execute(self._query(full))).all(), full, started_at)
+
+    def refresh_in_background(self, session_factory: Callable[[], AsyncSession]):
+        """
+        Si la copia está vencida, lanza una sola recarga en segundo plano
+        (llamar desde el event loop). No espera su resultado.
+        """
+        if not self.is_stale():
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        self._task = asyncio.get_running_loop().create_task(self._background_refresh(session_factory))
+
+    async def _background_refresh(self, session_factory: Callable[[], AsyncSession]):
+        try:
+            async with session_factory() as db:
+                await self.refresh_async(db)
+        except Exception as e:
+            print(f"Error recargando versiones de token: {e}")
+            # Se reintenta en el próximo intervalo, no en cada request
+            with self._lock:
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def update(self, user_id: int, token_version: int, is_active: bool):
+        """Aplica un cambio hecho en este proceso sin esperar la recarga"""
+        with self._lock:
+            self._versions[user_id] = (token_version, is_active)
+
+    def remove(self, user_id: int):
+        with self._lock:
+            self._versions.pop(user_id, None)
+
+    def check(self, user_id: int, token_version: int) -> Optional[bool]:
+        """True/False si el usuario es conocido; None si no está en la tabla"""
+        with self._lock:
+            entry = self._versions.get(user_id)
+        if entry is None:
+            return None
+        version, is_active = entry
+        return is_active and version == token_version
+
+token_versions = TokenVersionTable(
+    TOKEN_VERSION_REFRESH_SECONDS, TOKEN_VERSION_FULL_RELOAD_SECONDS, TOKEN_VERSION_OVERLAP_SECONDS
+)
@@ -1,17 +1,25 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import SessionLocal
-from modules.auth.controllers.auth_controller import get_current_user
-from modules.auth.schemas.auth_schemas import UserResponse  # Ajusta el import según tu esquema
-from modules.documents.services.document_service import DocumentService
-import os
-import io
-from PyPDF2 import PdfReader
+from database import SessionLocal, get_async_db, get_async_read_db
+from execution import run_io
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError
+from modules.auth.controllers.auth_controller import get_token_principal
+from modules.auth.services.auth_service import TokenPrincipal
+from modules.documents.models.document import DocumentStatus
+from modules.documents.services.blob_storage import UPLOAD_DIR
+from modules.documents.schemas.document_schemas import DocumentListResponse
+from modules.documents.services.document_service import DocumentFilters, DocumentService
+from modules.documents.services.multipart_upload import stage_multipart_upload
+from modules.documents.services.pdf_validation import schedule_deep_validation
 
 router = APIRouter(tags=["documents"])
 
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
-UPLOAD_DIR = "uploads"
+MULTIPART_OVERHEAD = 64 * 1024  # margen para cabeceras y boundaries del multipart
 
 def get_db():
     db = SessionLocal()
@@ -19,51 +27,115 @@ def get_db():
         yield db
     finally:
         db.close()
-        
-@router.get("")
+
+@router.get("", response_model=DocumentListResponse)
 async def get_user_documents(
-    db: Session = Depends(get_db),
-    current_user: UserResponse = Depends(get_current_user)
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tamaño de página"),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto como next_cursor"),
+    status: Optional[DocumentStatus] = Query(None, description="Filtrar por estado"),
+    uploader_id: Optional[int] = Query(None, description="Filtrar por usuario que subió el documento"),
+    date_from: Optional[datetime] = Query(None, description="Subidos desde (inclusive)"),
+    date_to: Optional[datetime] = Query(
+        None, description="Subidos hasta (inclusive); una fecha sin hora incluye todo ese día"
+    ),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: TokenPrincipal = Depends(get_token_principal)
 ):
     """
-    Obtiene todos los documentos del usuario autenticado.
+    Obtiene los documentos visibles para el usuario autenticado, paginados
+    por cursor (más recientes primero).
+    Se lee de la réplica si DATABASE_REPLICA_URL está definida: un documento
+    recién subido puede tardar unos instantes en aparecer.
     """
-    documents = DocumentService.get_documents_by_user(session=db, user_id=current_user.id)
-    return {"documents": documents}
+    if date_to is not None and _is_date_only(request.query_params.get("date_to")):
+        date_to += timedelta(days=1, microseconds=-1)
+    filters = DocumentFilters(
+        status=status, uploader_id=uploader_id, date_from=_naive_utc(date_from), date_to=_naive_utc(date_to)
+    )
+    try:
+        documents, next_cursor = await DocumentService.get_documents_by_user_async(
+            session=db, user_id=current_user.id, limit=limit, cursor=cursor, filters=filters
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(400, str(e))
+
+    # response_model valida y serializa las filas ORM una sola vez
+    return {"documents": documents, "next_cursor": next_cursor}
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """upload_date se guarda en UTC sin zona horaria"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _is_date_only(raw: Optional[str]) -> bool:
+    return raw is not None and len(raw.strip()) == len("YYYY-MM-DD")
 
-@router.post("/upload")
+# El cuerpo se lee en streaming dentro del endpoint (sin UploadFile), así
+# que el formulario se documenta a mano en OpenAPI
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+@router.post("/upload", openapi_extra=UPLOAD_REQUEST_BODY)
 async def upload_document(
-    file: UploadFile = File(...),
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: UserResponse = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_token_principal)
 ):
-    # Leer el contenido del archivo
-    contents = await file.read()
-    
-    # El servicio maneja toda la lógica
-    doc = DocumentService.upload_document(
+    # Recibir el archivo por bloques (hash y tamaño incrementales) directo al
+    # temporal; un Content-Length excesivo se rechaza sin leer el cuerpo
+    staged, file = await stage_multipart_upload(
+        request, "file", UPLOAD_DIR, MAX_FILE_SIZE, MAX_FILE_SIZE + MULTIPART_OVERHEAD
+    )
+
+    # El servicio maneja el resto de la lógica (DB y archivos, fuera del event loop)
+    document_id, file_path = await run_io(
+        _store_staged_upload,
         session=db,
         user_id=current_user.id,
-        file_contents=contents,
+        staged=staged,
         filename=file.filename,
         content_type=file.content_type,
-        upload_dir=UPLOAD_DIR,
-        max_file_size=MAX_FILE_SIZE
+        upload_dir=UPLOAD_DIR
     )
 
-    return {"message": "Documento subido correctamente", "document_id": doc.id}
+    # Parseo completo fuera de la request; si falla el documento queda marcado
+    schedule_deep_validation(document_id, file_path, SessionLocal)
+
+    return {"message": "Documento subido correctamente", "document_id": document_id}
+
+def _store_staged_upload(**kwargs) -> tuple[int, str]:
+    """
+    Guarda el upload y lee id y ruta en el mismo hilo del pool: el commit
+    expira el documento y leerlos en el event loop lanzaría un SELECT bloqueante.
+    """
+    doc = DocumentService.upload_staged_document(**kwargs)
+    return doc.id, doc.file_path
 
 @router.post("/{document_id}/reject")
 async def reject_document(
     document_id: int,
-    db: Session = Depends(get_db),
-    current_user: UserResponse = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenPrincipal = Depends(get_token_principal)
 ):
     """
     Rechaza un documento y cambia su estado a REJECTED.
     """
     try:
-        DocumentService.reject_document(session=db, document_id=document_id, user_id=current_user.id)
+        await DocumentService.reject_document_async(session=db, document_id=document_id, user_id=current_user.id)
         return {"message": "Documento rechazado correctamente"}
     except ValueError as e:
         raise HTTPException(400, str(e))
@@ -1,12 +1,16 @@
-import hashlib
+from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from database import SessionLocal
-from modules.auth.controllers.auth_controller import get_current_user
-from modules.auth.schemas.auth_schemas import UserResponse  # Ajusta el import según tu esquema
+from modules.auth.controllers.auth_controller import get_token_principal
+from modules.auth.services.auth_service import TokenPrincipal
+from modules.auth.dependencies import require_permission
 from modules.documents.models import Document
+from modules.documents.schemas import BatchSignRequest, BatchSignResponse
 from modules.documents.services.document_service import DocumentService
+from modules.documents.services.integrity import DocumentIntegrity
 
 router = APIRouter(tags=["documents"])
 
@@ -21,7 +25,7 @@ def get_db():
 def sign_document(
     document_id: int,
     db: Session = Depends(get_db),
-    current_user: UserResponse = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_token_principal)
 ):
     """
     Añade una firma: hasta 5 por documento, guarda sha256.
@@ -38,14 +42,40 @@ def sign_document(
         "sha256_hash":   sig.sha256_hash
     }
 
+@router.post("/sign-batch", response_model=BatchSignResponse)
+def sign_documents_batch(
+    payload: BatchSignRequest,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(require_permission("sign"))
+):
+    """
+    Firma varios documentos en una sola transacción y devuelve el resultado
+    de cada uno (los que no se pueden firmar incluyen el motivo).
+    """
+    try:
+        results = DocumentService.sign_documents(db, payload.document_ids, current_user.id)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    signed = sum(1 for r in results if r.signed)
+    return {"signed": signed, "failed": len(results) - signed, "results": results}
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara If-None-Match con el ETag (comparación débil, RFC 9110)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
 @router.get("/{document_id}/download")
 def download_and_validate(
     document_id: int,
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: UserResponse = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_token_principal)
 ):
     """
     Devuelve el PDF si el hash coincide; si no, marca como inválido.
+    Soporta Range (206) y revalidación con ETag/If-None-Match (304).
     """
     # 1) Obtener documento y última firma
     doc = db.get(Document, document_id)
@@ -57,14 +87,26 @@ def download_and_validate(
 
     last_sig = doc.signatures[-1]
 
-    # 2) Leer archivo y recalcular hash
-    with open(doc.file_path, "rb") as f:
-        data = f.read()
-    current_hash = hashlib.sha256(data).hexdigest()
+    # 2) El ETag es el hash firmado: si el cliente ya lo tiene no se toca el archivo
+    etag = f'"{last_sig.sha256_hash}"'
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # 3) Hash persistido (solo se relee el archivo si cambió tamaño o mtime)
+    current_hash = DocumentIntegrity.current_digest(doc)
+    db.commit()
 
     if current_hash != last_sig.sha256_hash:
         raise HTTPException(400, "Integridad comprometida: hash no coincide")
 
-    # 3) Devolver PDF
-    return Response(content=data, media_type="application/pdf")
+    # 4) Devolver PDF desde disco (sendfile/pathsend si el servidor lo soporta)
+    return FileResponse(
+        doc.file_path,
+        media_type="application/pdf",
+        headers={
+            "ETag": etag,
+            "X-Document-Hash": current_hash,
+            "Cache-Control": "private, no-cache",
+        },
+    )
 
@@ -1,3 +1,4 @@
 from .auto_delete import start_deletion_job
+from .integrity_scrub import start_integrity_scrub_job
 
-__all__ = ['start_deletion_job']
+__all__ = ['start_deletion_job', 'start_integrity_scrub_job']
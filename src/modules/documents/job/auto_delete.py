@@ -1,13 +1,22 @@
-from apscheduler.schedulers.background import BackgroundScheduler
+from datetime import timedelta
 from modules.documents.services.cleanup import delete_rejected_documents
+from modules.jobs.services.job_runner import JobRunner
+from modules.jobs.services.scheduler import schedule_interval_job
 from database import SessionLocal
 
+DELETION_JOB_INTERVAL = timedelta(days=1)
+
 def start_deletion_job():
-    scheduler = BackgroundScheduler()
+    def cleanup(session):
+        report = delete_rejected_documents(session)
+        print(
+            f"Limpieza de rechazados: {report.documents} documentos, {report.files} archivos, "
+            f"{report.bytes_freed} bytes liberados, {report.errors} errores ({report.duration_seconds}s)"
+        )
+        return report
 
     def job():
-        with SessionLocal() as session:
-            delete_rejected_documents(session)
+        # Solo un worker del cluster ejecuta la limpieza en cada intervalo
+        JobRunner.run_exclusive(SessionLocal, "delete_rejected_documents", DELETION_JOB_INTERVAL, cleanup)
 
-    scheduler.add_job(job, 'interval', days=1)  # cada 24 horas
-    scheduler.start()
+    schedule_interval_job("delete_rejected_documents", job, days=1)  # cada 24 horas
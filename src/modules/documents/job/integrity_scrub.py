@@ -0,0 +1,23 @@
+from datetime import timedelta
+from modules.documents.services.blob_storage import BlobStorage
+from modules.documents.services.integrity import DocumentIntegrity
+from modules.jobs.services.job_runner import JobRunner
+from modules.jobs.services.scheduler import schedule_interval_job
+from database import SessionLocal
+
+INTEGRITY_SCRUB_INTERVAL = timedelta(hours=6)
+
+def start_integrity_scrub_job():
+    def scrub(session):
+        flagged = DocumentIntegrity.scrub(session)
+        if flagged:
+            print(f"Integridad: {flagged} documentos marcados para re-hash")
+        orphans = BlobStorage.scrub_orphans(session)
+        if orphans:
+            print(f"Integridad: {orphans} archivos huérfanos eliminados")
+        return {"flagged": flagged, "orphans_removed": orphans}
+
+    def job():
+        JobRunner.run_exclusive(SessionLocal, "integrity_scrub", INTEGRITY_SCRUB_INTERVAL, scrub)
+
+    schedule_interval_job("integrity_scrub", job, hours=6)
@@ -1,4 +1,6 @@
 from .document import Document, DocumentStatus
+from .document_blob import DocumentBlob
+from .document_name_counter import DocumentNameCounter
 from .user import User, UserRole
 
-__all__ = ['Document', 'DocumentStatus', 'User', 'UserRole']
+__all__ = ['Document', 'DocumentStatus', 'DocumentBlob', 'DocumentNameCounter', 'User', 'UserRole']
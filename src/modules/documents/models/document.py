@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey
+from sqlalchemy import (
+    Column, Integer, String, DateTime, Enum, ForeignKey, Float, Boolean, UniqueConstraint, Index, text
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum as PyEnum
@@ -11,18 +13,44 @@ class DocumentStatus(PyEnum):
 
 class Document(Base):
     __tablename__ = 'documents'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'name', name='uq_documents_user_id_name'),
+        # Listado por usuario ordenado por fecha
+        Index('ix_documents_user_id_upload_date', 'user_id', 'upload_date'),
+        # Listado paginado (keyset) de supervisores y gestores
+        Index('ix_documents_upload_date_id', 'upload_date', 'id'),
+        # Job de limpieza: solo los rechazados, por fecha de rechazo
+        Index(
+            'ix_documents_rejected_rejection_date', 'rejection_date',
+            postgresql_where=text("status = 'REJECTED'"),
+            sqlite_where=text("status = 'REJECTED'")
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)
     status = Column(Enum(DocumentStatus), nullable=False, default=DocumentStatus.IN_REVIEW)
-    upload_date = Column(DateTime, default=datetime.utcnow)
+    upload_date = Column(DateTime, default=datetime.utcnow, nullable=False)
     rejection_date = Column(DateTime, nullable=True)
     signed_date = Column(DateTime, nullable=True)
 
+    # SHA-256 del archivo calculado al subirlo; se confía en él mientras el
+    # tamaño y mtime del archivo no cambien y el scrub no lo marque
+    sha256_hash = Column(String(64), nullable=True)
+    file_mtime = Column(Float, nullable=True)
+    needs_rehash = Column(Boolean, nullable=False, default=False)
+
+    # Resultado de la validación profunda en segundo plano (NULL = pendiente)
+    pdf_valid = Column(Boolean, nullable=True)
+
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     user = relationship("User", back_populates="documents")
 
+    # Blob con el contenido (NULL para archivos anteriores al almacenamiento por hash)
+    blob_sha256 = Column(String(64), ForeignKey('document_blobs.sha256'), nullable=True)
+    blob = relationship("DocumentBlob")
+
     # Relación con firmas
     signatures = relationship("Signature",back_populates = "document",order_by = "Signature.order",cascade = "all, delete-orphan")
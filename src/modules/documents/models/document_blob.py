@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from database import Base
+
+class DocumentBlob(Base):
+    """Contenido físico de un documento, direccionado por su SHA-256.
+
+    Varios documentos con los mismos bytes comparten un único blob;
+    ref_count indica cuántos documentos lo referencian.
+    """
+    __tablename__ = 'document_blobs'
+
+    sha256 = Column(String(64), primary_key=True)
+    file_path = Column(String, nullable=False)
+    file_size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
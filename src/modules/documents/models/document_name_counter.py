@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from database import Base
+
+class DocumentNameCounter(Base):
+    """Siguiente sufijo _n a usar para cada (usuario, nombre original).
+
+    next_suffix = 0 significa que el nombre original aún está libre.
+    """
+    __tablename__ = 'document_name_counters'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    original_name = Column(String, primary_key=True)
+    next_suffix = Column(Integer, nullable=False, default=0)
@@ -1,15 +1,19 @@
 # src/modules/documents/models/signature.py
 
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
 
 class Signature(Base):
     __tablename__ = "signatures"
+    __table_args__ = (
+        # Dos firmantes concurrentes no pueden obtener el mismo orden
+        UniqueConstraint("document_id", "order", name="uq_signatures_document_id_order"),
+    )
 
     id = Column(Integer, primary_key=True)
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
     user_id     = Column(Integer, ForeignKey("users.id"),     nullable=False)
     ts          = Column(DateTime, default=datetime.utcnow, nullable=False)
     order       = Column(Integer, nullable=False)
@@ -21,7 +21,11 @@ class User(Base):
     role = Column(Enum(UserRole), nullable=False)
 
     is_active = Column(Boolean, default=True)
+    # Se incrementa al cambiar rol, contraseña o estado para revocar tokens emitidos
+    token_version = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Marca de cambios para la recarga incremental de token_versions
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # Relationship with documents
     documents = relationship("Document", back_populates="user")
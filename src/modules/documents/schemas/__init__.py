@@ -0,0 +1,9 @@
+from .document_schemas import (
+    UserSummary, SignatureResponse, DocumentResponse, DocumentListResponse,
+    BatchSignRequest, BatchSignItem, BatchSignResponse
+)
+
+__all__ = [
+    'UserSummary', 'SignatureResponse', 'DocumentResponse', 'DocumentListResponse',
+    'BatchSignRequest', 'BatchSignItem', 'BatchSignResponse'
+]
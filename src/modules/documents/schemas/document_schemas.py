@@ -0,0 +1,63 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+from modules.documents.models.document import DocumentStatus
+from modules.documents.models.user import UserRole
+
+class UserSummary(BaseModel):
+    """Datos públicos de quien subió o firmó un documento (sin password_hash)"""
+    id: int
+    name: str
+    email: str
+    role: UserRole
+
+    model_config = {"from_attributes": True}
+
+class SignatureResponse(BaseModel):
+    id: int
+    document_id: int
+    user_id: int
+    order: int
+    ts: datetime
+    sha256_hash: str
+    user: Optional[UserSummary] = None
+
+    model_config = {"from_attributes": True}
+
+class DocumentResponse(BaseModel):
+    id: int
+    name: str
+    file_size: int
+    status: DocumentStatus
+    upload_date: datetime
+    rejection_date: Optional[datetime] = None
+    signed_date: Optional[datetime] = None
+    sha256_hash: Optional[str] = None
+    pdf_valid: Optional[bool] = None
+    user_id: int
+    user: Optional[UserSummary] = None
+    signatures: List[SignatureResponse] = []
+
+    model_config = {"from_attributes": True}
+
+class DocumentListResponse(BaseModel):
+    documents: List[DocumentResponse]
+    next_cursor: Optional[str] = None
+
+class BatchSignRequest(BaseModel):
+    document_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+class BatchSignItem(BaseModel):
+    document_id: int
+    signed: bool
+    signature_id: Optional[int] = None
+    order: Optional[int] = None
+    sha256_hash: Optional[str] = None
+    error: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
+class BatchSignResponse(BaseModel):
+    signed: int
+    failed: int
+    results: List[BatchSignItem]
@@ -1,5 +1,8 @@
-from .cleanup import delete_rejected_documents
+from .blob_storage import BlobStorage
+from .cleanup import CleanupReport, delete_rejected_documents
 from .document_service import DocumentService
 from .document_state_service import DocumentStateService
+from .integrity import DocumentIntegrity
 
-__all__ = ['delete_rejected_documents', 'DocumentService', 'DocumentStateService']
+__all__ = ['BlobStorage', 'CleanupReport', 'delete_rejected_documents', 'DocumentService', 'DocumentStateService',
+           'DocumentIntegrity']
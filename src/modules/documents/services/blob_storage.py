@@ -0,0 +1,156 @@
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from modules.documents.models.document_blob import DocumentBlob
+
+UPLOAD_DIR = "uploads"
+BLOB_DIR = "blobs"
+# Un archivo sin registro más nuevo que esto puede pertenecer a una transacción en curso
+ORPHAN_MIN_AGE_SECONDS = int(os.getenv("BLOB_ORPHAN_MIN_AGE_SECONDS", "3600"))
+
+class BlobStorage:
+    """
+    Almacenamiento direccionado por contenido: cada archivo se guarda una sola
+    vez bajo <upload_dir>/blobs/<aa>/<sha256>.pdf y se cuentan sus referencias.
+    Ningún método hace commit; el llamador controla la transacción.
+    """
+
+    @staticmethod
+    def blob_path(upload_dir: str, sha256: str) -> str:
+        return os.path.join(upload_dir, BLOB_DIR, sha256[:2], f"{sha256}.pdf")
+
+    @staticmethod
+    def store(session: Session, staged, upload_dir: str) -> DocumentBlob:
+        """
+        Registra una referencia al contenido de un upload temporal (StagedUpload).
+        Si el blob ya existe se descarta el temporal; si no, se mueve a su ruta.
+        """
+        blob = session.get(DocumentBlob, staged.sha256, with_for_update=True)
+
+        if blob is None:
+            path = BlobStorage._place(staged, upload_dir)
+            blob = DocumentBlob(sha256=staged.sha256, file_path=path, file_size=staged.size, ref_count=1)
+            try:
+                with session.begin_nested():
+                    session.add(blob)
+                return blob
+            except IntegrityError:
+                # Otro upload concurrente creó el mismo blob primero
+                blob = session.get(DocumentBlob, staged.sha256, with_for_update=True, populate_existing=True)
+        elif os.path.exists(blob.file_path):
+            staged.discard()
+        else:
+            # El registro existe pero el archivo se perdió: restaurarlo
+            blob.file_path = BlobStorage._place(staged, upload_dir)
+
+        blob.ref_count = DocumentBlob.ref_count + 1
+        session.flush()
+        return blob
+
+    @staticmethod
+    def release(session: Session, sha256: str) -> Optional[str]:
+        """
+        Quita una referencia al blob. Si era la última, elimina el registro y
+        devuelve la ruta del archivo para que el llamador lo borre.
+        """
+        blob = session.get(DocumentBlob, sha256, with_for_update=True)
+        if blob is None:
+            return None
+
+        if blob.ref_count <= 1:
+            path = blob.file_path
+            session.delete(blob)
+            return path
+
+        blob.ref_count = DocumentBlob.ref_count - 1
+        return None
+
+    @staticmethod
+    def release_many(session: Session, references: Dict[str, int]) -> List[Tuple[str, int]]:
+        """
+        Versión por lotes de release: references es {sha256: referencias a quitar}.
+        Los documentos que las tenían ya deben estar eliminados. Devuelve
+        (ruta, tamaño) de los blobs que quedaron sin referencias.
+        """
+        if not references:
+            return []
+        blobs = session.execute(
+            select(DocumentBlob)
+            .where(DocumentBlob.sha256.in_(list(references)))
+            # Orden fijo de locks para no bloquearse con otra limpieza
+            .order_by(DocumentBlob.sha256)
+            .with_for_update()
+        ).scalars().all()
+
+        orphaned = []
+        for blob in blobs:
+            if blob.ref_count <= references[blob.sha256]:
+                orphaned.append(blob)
+            else:
+                blob.ref_count = DocumentBlob.ref_count - references[blob.sha256]
+
+        if orphaned:
+            session.execute(delete(DocumentBlob).where(DocumentBlob.sha256.in_([b.sha256 for b in orphaned])))
+        session.flush()
+        return [(blob.file_path, blob.file_size) for blob in orphaned]
+
+    @staticmethod
+    def scrub_orphans(
+        session: Session,
+        upload_dir: str = UPLOAD_DIR,
+        min_age_seconds: int = ORPHAN_MIN_AGE_SECONDS,
+        batch_size: int = 500
+    ) -> int:
+        """
+        Borra los archivos de blobs sin registro en document_blobs (quedan si
+        la transacción que los colocó hizo rollback) y los temporales de
+        uploads abandonados. Solo toca archivos con más de min_age_seconds.
+        Devuelve la cantidad de archivos borrados.
+        """
+        cutoff = time.time() - min_age_seconds
+
+        def is_old(path: str) -> bool:
+            try:
+                return os.stat(path).st_mtime < cutoff
+            except FileNotFoundError:
+                return False
+
+        removed = 0
+        if os.path.isdir(upload_dir):
+            for name in os.listdir(upload_dir):
+                path = os.path.join(upload_dir, name)
+                if name.startswith(".upload-") and name.endswith(".part") and is_old(path):
+                    os.remove(path)
+                    removed += 1
+
+        candidates: Dict[str, str] = {}
+        blob_root = os.path.join(upload_dir, BLOB_DIR)
+        for dirpath, _, filenames in os.walk(blob_root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.endswith(".pdf") and is_old(path):
+                    candidates[name[:-len(".pdf")]] = path
+
+        shas = list(candidates)
+        for start in range(0, len(shas), batch_size):
+            batch = shas[start:start + batch_size]
+            referenced = set(session.execute(
+                select(DocumentBlob.sha256).where(DocumentBlob.sha256.in_(batch))
+            ).scalars())
+            for sha in batch:
+                # Se vuelve a mirar la fecha: un upload pudo recolocarlo recién
+                if sha not in referenced and is_old(candidates[sha]):
+                    os.remove(candidates[sha])
+                    removed += 1
+        return removed
+
+    @staticmethod
+    def _place(staged, upload_dir: str) -> str:
+        path = BlobStorage.blob_path(upload_dir, staged.sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(staged.temp_path, path)
+        return path
@@ -1,22 +1,102 @@
 import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
 from modules.documents.models.document import Document, DocumentStatus
+from modules.documents.models.signature import Signature
+from modules.documents.services.blob_storage import BlobStorage
 
-def delete_rejected_documents(session: Session):
-    cutoff_date = datetime.utcnow() - timedelta(days=30)
+REJECTED_RETENTION_DAYS = int(os.getenv("REJECTED_RETENTION_DAYS", "30"))
+CLEANUP_BATCH_SIZE = int(os.getenv("CLEANUP_BATCH_SIZE", "500"))
+CLEANUP_UNLINK_WORKERS = int(os.getenv("CLEANUP_UNLINK_WORKERS", "4"))
 
-    documents = session.query(Document).filter(
-        Document.status == DocumentStatus.REJECTED,
-        Document.rejection_date <= cutoff_date
-    ).all()
+@dataclass
+class CleanupReport:
+    documents: int = 0
+    files: int = 0
+    bytes_freed: int = 0
+    errors: int = 0
+    batches: int = 0
+    duration_seconds: float = 0.0
 
-    for doc in documents:
-        try:
-            if os.path.exists(doc.file_path):
-                os.remove(doc.file_path)
-            session.delete(doc)
-        except Exception as e:
-            print(f"Error deleting {doc.file_path}: {e}")
+def _unlink(path: str) -> Optional[bool]:
+    """True si se borró, False si ya no existía, None si falló"""
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        print(f"Error deleting {path}: {e}")
+        return None
 
-    session.commit()
+def delete_rejected_documents(
+    session: Session,
+    retention_days: int = REJECTED_RETENTION_DAYS,
+    batch_size: int = CLEANUP_BATCH_SIZE
+) -> CleanupReport:
+    """
+    Elimina los documentos rechazados hace más de retention_days, por lotes
+    de batch_size con un commit por lote. Las filas se borran con DELETE por
+    conjunto y los archivos sin referencias en un pool de hilos pequeño.
+    """
+    started = time.perf_counter()
+    cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
+    report = CleanupReport()
+    last_id = 0
+
+    with ThreadPoolExecutor(max_workers=CLEANUP_UNLINK_WORKERS, thread_name_prefix="cleanup") as pool:
+        while True:
+            # Lote por keyset sobre id: cada commit cerraría un cursor abierto
+            rows = session.execute(
+                select(Document.id, Document.blob_sha256, Document.file_path, Document.file_size)
+                .where(
+                    Document.status == DocumentStatus.REJECTED,
+                    Document.rejection_date <= cutoff_date,
+                    Document.id > last_id
+                )
+                .order_by(Document.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            ids = [row.id for row in rows]
+
+            try:
+                session.execute(delete(Signature).where(Signature.document_id.in_(ids)))
+                session.execute(delete(Document).where(Document.id.in_(ids)))
+
+                # Los blobs compartidos solo se borran al perder su última referencia
+                files = BlobStorage.release_many(
+                    session, Counter(row.blob_sha256 for row in rows if row.blob_sha256)
+                )
+                files += [(row.file_path, row.file_size) for row in rows if not row.blob_sha256]
+
+                # Los archivos se borran antes del commit, con los blobs aún bloqueados
+                removed = list(pool.map(_unlink, [path for path, _ in files]))
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                report.errors += len(rows)
+                print(f"Error eliminando lote de documentos rechazados {ids[0]}..{ids[-1]}: {e}")
+                continue
+
+            report.documents += len(rows)
+            report.batches += 1
+            for (_, size), was_removed in zip(files, removed):
+                if was_removed is None:
+                    report.errors += 1
+                elif was_removed:
+                    report.files += 1
+                    report.bytes_freed += size or 0
+            if len(rows) < batch_size:
+                break
+
+    report.duration_seconds = round(time.perf_counter() - started, 3)
+    return report
@@ -1,18 +1,69 @@
 import hashlib
-import io
 import os
+import tempfile
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
 
-from PyPDF2 import PdfReader
-from fastapi import HTTPException
-from sqlalchemy import or_
-from sqlalchemy.orm import Session, joinedload
+from fastapi import HTTPException, UploadFile
+from execution import io_pool, run_io
+from pagination import DEFAULT_PAGE_SIZE, after_cursor, clamp_page_size, encode_cursor
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from modules.documents.models.document import Document, DocumentStatus
+from modules.documents.models.document_name_counter import DocumentNameCounter
 from modules.documents.models.signature import Signature
 from modules.documents.models.user import User
+from modules.documents.services.blob_storage import BlobStorage
 from modules.documents.services.document_state_service import DocumentStateService
+from modules.documents.services.integrity import DocumentIntegrity, FileDigest
+from modules.documents.services.pdf_validation import PdfValidationError, quick_validate_pdf
 from datetime import datetime
 from modules.documents.models.user import UserRole
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+MAX_NAME_ATTEMPTS = 5
+MAX_SIGNATURES = 5
+MAX_BATCH_SIGN = 100
+# Reintentos si otro firmante ganó el mismo orden
+SIGNATURE_ORDER_CONSTRAINT = "uq_signatures_document_id_order"
+PG_UNIQUE_VIOLATION = "23505"
+SIGNATURE_MAX_ATTEMPTS = 3
+
+
+@dataclass
+class StagedUpload:
+    """Archivo recibido en disco (temporal), con su tamaño y hash SHA-256."""
+    temp_path: str
+    size: int
+    sha256: str
+
+    def discard(self):
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+@dataclass
+class DocumentFilters:
+    """Filtros del listado de documentos (todos opcionales)."""
+    status: Optional[DocumentStatus] = None
+    uploader_id: Optional[int] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+
+@dataclass
+class BatchSignResult:
+    """Resultado de firmar un documento dentro de un lote."""
+    document_id: int
+    signed: bool
+    signature_id: Optional[int] = None
+    order: Optional[int] = None
+    sha256_hash: Optional[str] = None
+    error: Optional[str] = None
+
+
 class DocumentService:
 
     @staticmethod
@@ -43,25 +94,85 @@ class DocumentService:
         else:
             return base_q.filter(Document.user_id == user_id).all()
 
+    @staticmethod
+    async def get_documents_by_user_async(
+        session: AsyncSession,
+        user_id: int,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        filters: Optional[DocumentFilters] = None
+    ) -> tuple[list[Document], Optional[str]]:
+        """
+        Página de documentos visibles para el usuario, del más reciente al más
+        antiguo, con paginación por cursor sobre (upload_date, id).
+        Devuelve (documentos, next_cursor); next_cursor es None en la última página.
+        """
+        user = await session.get(User, user_id)
+        filters = filters or DocumentFilters()
+        limit = clamp_page_size(limit)
+
+        stmt = (
+            select(Document)
+            .options(
+                joinedload(Document.user),
+                # selectin: un JOIN a la colección rompería el LIMIT
+                selectinload(Document.signatures)
+                    .joinedload(Signature.user)
+            )
+            .order_by(Document.upload_date.desc(), Document.id.desc())
+            .limit(limit + 1)
+        )
+
+        if user.role not in [UserRole.SUPERVISOR, UserRole.INSTITUTIONAL_MANAGER]:
+            stmt = stmt.where(Document.user_id == user_id)
+        elif filters.uploader_id is not None:
+            stmt = stmt.where(Document.user_id == filters.uploader_id)
+
+        if filters.status is not None:
+            stmt = stmt.where(Document.status == filters.status)
+        if filters.date_from is not None:
+            stmt = stmt.where(Document.upload_date >= filters.date_from)
+        if filters.date_to is not None:
+            stmt = stmt.where(Document.upload_date <= filters.date_to)
+
+        if cursor:
+            stmt = stmt.where(after_cursor(Document.upload_date, Document.id, cursor))
+
+        documents = list((await session.execute(stmt)).scalars().all())
+
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            next_cursor = encode_cursor(documents[-1].upload_date, documents[-1].id)
+        return documents, next_cursor
 
     @staticmethod
     def add_signature(session: Session, document_id: int, user_id: int) -> Signature:
         """Añade una firma simple con límite de 5 por documento y calcula hash."""
-        # 1) Cargar entidad
-        doc = session.get(Document, document_id)
+        digests = DocumentService._prehash_stale(session, [document_id])
+        return DocumentService._retry_signature_conflicts(
+            session, lambda: DocumentService._add_signature_once(session, document_id, user_id, digests)
+        )
+
+    @staticmethod
+    def _add_signature_once(
+        session: Session, document_id: int, user_id: int, digests: dict[int, FileDigest]
+    ) -> Signature:
+        # 1) Cargar entidad con lock de fila: los firmantes del mismo documento
+        #    se serializan (límite y orden), los de otros documentos no
+        doc = session.get(Document, document_id, with_for_update=True, populate_existing=True)
         user = session.get(User, user_id)
         if not doc or not user:
             raise ValueError("Documento o usuario no existe")
 
         # 2) Límite de 5 firmas
         existing = doc.signatures
-        if len(existing) >= 5:
-            raise ValueError("Máximo de 5 firmas alcanzado")
+        if len(existing) >= MAX_SIGNATURES:
+            raise ValueError(f"Máximo de {MAX_SIGNATURES} firmas alcanzado")
 
-        # 3) Leer archivo y calcular SHA‑256
-        with open(doc.file_path, "rb") as f:
-            data = f.read()
-        sha256 = hashlib.sha256(data).hexdigest()
+        # 3) SHA‑256 persistido al subir; si estaba obsoleto ya se hasheó antes
+        #    del lock y solo se relee si el archivo cambió desde entonces
+        sha256 = DocumentIntegrity.current_digest(doc, digests.get(document_id))
 
         # 4) Determinar orden (1..n)
         next_order = (max([s.order for s in existing]) + 1) if existing else 1
@@ -76,12 +187,223 @@ class DocumentService:
         )
         session.add(sig)
        
+        # Firma, estado y notificación (outbox) en un único commit
         DocumentStateService.change_document_state(
-                session, document_id, user_id, DocumentStatus.SIGNED
+                session, document_id, user_id, DocumentStatus.SIGNED, commit=False
             )
         session.commit()
         return sig
 
+    @staticmethod
+    def _prehash_stale(session: Session, document_ids: list[int]) -> dict[int, FileDigest]:
+        """
+        Hashea, sin tomar locks, los archivos cuyo hash persistido está
+        obsoleto. Los candidatos se leen en una conexión propia en modo
+        autocommit: no se abre ni se descarta la transacción del llamador, y
+        no queda ninguna abierta mientras se leen los archivos. Los errores
+        de archivo se informan después, con el lock.
+        """
+        stmt = select(
+            Document.id, Document.file_path, Document.sha256_hash,
+            Document.file_size, Document.file_mtime, Document.needs_rehash
+        ).where(Document.id.in_(document_ids))
+        with session.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            rows = conn.execute(stmt).all()
+
+        paths = {}
+        for row in rows:
+            try:
+                if DocumentIntegrity.is_stale(row):
+                    paths[row.id] = row.file_path
+            except OSError:
+                pass
+
+        # hashlib libera el GIL: los archivos se leen en paralelo
+        pending = {doc_id: io_pool.submit(DocumentIntegrity.digest_file, path) for doc_id, path in paths.items()}
+        digests = {}
+        for doc_id, future in pending.items():
+            try:
+                digests[doc_id] = future.result()
+            except OSError:
+                pass
+        return digests
+
+    @staticmethod
+    def sign_documents(session: Session, document_ids: list[int], user_id: int) -> list[BatchSignResult]:
+        """
+        Firma varios documentos en una sola transacción. Primero hashea en
+        paralelo, sin locks, los archivos cuyo hash persistido está obsoleto;
+        luego carga documentos y firmas con lock en una consulta y valida cada
+        transición. Los documentos que no se pueden firmar se informan con su
+        error sin afectar al resto.
+        """
+        document_ids = list(dict.fromkeys(document_ids))
+        if len(document_ids) > MAX_BATCH_SIGN:
+            raise ValueError(f"Máximo de {MAX_BATCH_SIGN} documentos por lote")
+        digests = DocumentService._prehash_stale(session, document_ids)
+        return DocumentService._retry_signature_conflicts(
+            session, lambda: DocumentService._sign_documents_once(session, document_ids, user_id, digests)
+        )
+
+    @staticmethod
+    def _sign_documents_once(
+        session: Session, document_ids: list[int], user_id: int, digests: dict[int, FileDigest]
+    ) -> list[BatchSignResult]:
+        user = session.get(User, user_id)
+        if not user:
+            raise ValueError("Usuario no existe")
+
+        documents = {
+            doc.id: doc
+            for doc in session.execute(
+                select(Document)
+                .where(Document.id.in_(document_ids))
+                .options(selectinload(Document.signatures))
+                # Locks en orden de id para no bloquearse con otro lote
+                .order_by(Document.id)
+                .with_for_update(of=Document)
+                .execution_options(populate_existing=True)
+            ).scalars()
+        }
+
+        results: dict[int, BatchSignResult] = {}
+        eligible = []
+        for document_id in document_ids:
+            doc = documents.get(document_id)
+            if doc is None:
+                results[document_id] = BatchSignResult(document_id, False, error="Documento no existe")
+            elif len(doc.signatures) >= MAX_SIGNATURES:
+                results[document_id] = BatchSignResult(
+                    document_id, False, error=f"Máximo de {MAX_SIGNATURES} firmas alcanzado"
+                )
+            elif not DocumentStateService.can_change_state(user, doc, DocumentStatus.SIGNED):
+                results[document_id] = BatchSignResult(
+                    document_id, False,
+                    error=f"No se puede firmar un documento en estado {doc.status.value}"
+                )
+            else:
+                eligible.append(doc)
+
+        signatures = {}
+        for doc in eligible:
+            try:
+                # Usa el hash calculado antes del lock; relee solo si el archivo cambió
+                DocumentIntegrity.current_digest(doc, digests.get(doc.id))
+            except OSError as e:
+                results[doc.id] = BatchSignResult(doc.id, False, error=f"Archivo no disponible: {e}")
+                continue
+
+            existing = doc.signatures
+            sig = Signature(
+                document_id=doc.id,
+                user_id=user_id,
+                ts=datetime.utcnow(),
+                order=(max(s.order for s in existing) + 1) if existing else 1,
+                sha256_hash=doc.sha256_hash
+            )
+            session.add(sig)
+            DocumentStateService.change_document_state(
+                session, doc.id, user_id, DocumentStatus.SIGNED, commit=False
+            )
+            signatures[doc.id] = sig
+
+        # Firmas, estados y notificaciones (outbox) de todo el lote en un commit
+        session.flush()
+        for document_id, sig in signatures.items():
+            results[document_id] = BatchSignResult(
+                document_id, True, signature_id=sig.id, order=sig.order, sha256_hash=sig.sha256_hash
+            )
+        session.commit()
+        return [results[document_id] for document_id in document_ids]
+
+    @staticmethod
+    def _retry_signature_conflicts(session: Session, attempt_fn):
+        """
+        Ejecuta attempt_fn y la reintenta si la BD rechazó un orden de firma
+        repetido (p. ej. motores sin SELECT ... FOR UPDATE, como SQLite).
+        """
+        for attempt in range(1, SIGNATURE_MAX_ATTEMPTS + 1):
+            try:
+                return attempt_fn()
+            except IntegrityError as e:
+                session.rollback()
+                if not DocumentService._is_signature_order_conflict(e):
+                    raise
+                if attempt == SIGNATURE_MAX_ATTEMPTS:
+                    raise ValueError("Conflicto al firmar concurrentemente, intente nuevamente")
+
+    @staticmethod
+    def _is_signature_order_conflict(error: IntegrityError) -> bool:
+        orig = error.orig
+        diag = getattr(orig, "diag", None)
+        if diag is not None:
+            # psycopg2: unique_violation sobre la restricción del orden
+            return (
+                getattr(orig, "pgcode", None) == PG_UNIQUE_VIOLATION
+                and diag.constraint_name == SIGNATURE_ORDER_CONSTRAINT
+            )
+        # SQLite no informa el nombre de la restricción, solo sus columnas
+        return (
+            getattr(orig, "sqlite_errorname", None) == "SQLITE_CONSTRAINT_UNIQUE"
+            and "signatures.document_id, signatures.order" in str(orig)
+        )
+
+    @staticmethod
+    async def stage_upload(
+        file: UploadFile,
+        upload_dir: str,
+        max_file_size: int,
+        chunk_size: int = UPLOAD_CHUNK_SIZE
+    ) -> StagedUpload:
+        """Recibe un UploadFile por bloques hacia un temporal (ver stage_chunks)."""
+        async def chunks():
+            while chunk := await file.read(chunk_size):
+                yield chunk
+
+        return await DocumentService.stage_chunks(chunks(), upload_dir, max_file_size)
+
+    @staticmethod
+    async def stage_chunks(chunks: AsyncIterator[bytes], upload_dir: str, max_file_size: int) -> StagedUpload:
+        """
+        Escribe los bloques en un temporal dentro de upload_dir, calculando
+        el SHA-256 y el tamaño a medida que se escribe.
+        Aborta apenas se supera max_file_size. La escritura y el hash de cada
+        bloque se hacen en el pool de IO para no bloquear el event loop.
+        """
+        os.makedirs(upload_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+
+        tmp = tempfile.NamedTemporaryFile(dir=upload_dir, prefix=".upload-", suffix=".part", delete=False)
+        try:
+            with tmp:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    DocumentService._validate_size(size, max_file_size)
+                    await run_io(DocumentService._write_chunk, tmp, digest, chunk)
+        except BaseException:
+            os.remove(tmp.name)
+            raise
+
+        return StagedUpload(temp_path=tmp.name, size=size, sha256=digest.hexdigest())
+
+    @staticmethod
+    def _write_chunk(tmp, digest, chunk: bytes):
+        digest.update(chunk)
+        tmp.write(chunk)
+
+    @staticmethod
+    def _stage_bytes(file_contents: bytes, upload_dir: str) -> StagedUpload:
+        """Escribe un contenido ya leído en memoria como upload temporal."""
+        os.makedirs(upload_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=upload_dir, prefix=".upload-", suffix=".part", delete=False) as tmp:
+            tmp.write(file_contents)
+        return StagedUpload(
+            temp_path=tmp.name,
+            size=len(file_contents),
+            sha256=hashlib.sha256(file_contents).hexdigest()
+        )
+
     @staticmethod
     def upload_document(
         session: Session, 
@@ -93,44 +415,75 @@ class DocumentService:
         max_file_size: int = 10 * 1024 * 1024  # 10 MB por defecto
     ) -> Document:
         """
-        Procesa y guarda un documento completo:
+        Procesa y guarda un documento cuyo contenido ya está en memoria.
+        Para subidas HTTP usar multipart_upload.stage_multipart_upload + upload_staged_document.
+        """
+        DocumentService.validate_upload_metadata(filename, content_type)
+        DocumentService._validate_size(len(file_contents), max_file_size)
+
+        staged = DocumentService._stage_bytes(file_contents, upload_dir)
+        return DocumentService.upload_staged_document(
+            session, user_id, staged, filename, content_type, upload_dir
+        )
+
+    @staticmethod
+    def upload_staged_document(
+        session: Session,
+        user_id: int,
+        staged: StagedUpload,
+        filename: str,
+        content_type: str,
+        upload_dir: str
+    ) -> Document:
+        """
+        Procesa y guarda un documento ya recibido en disco:
         - Valida el archivo
         - Determina nombre único
-        - Guarda archivo físico
+        - Guarda el contenido como blob (deduplicado por SHA-256)
         - Crea registro en BD
         """
-        
-        # 1) Validaciones
-        DocumentService._validate_file(file_contents, filename, content_type, max_file_size)
-        
-        # 2) Determinar nombre único
-        unique_name = DocumentService._get_unique_filename(session, user_id, filename)
-        
-        # 3) Crear directorio si no existe
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # 4) Guardar archivo físico
-        file_path = os.path.join(upload_dir, unique_name)
-        with open(file_path, "wb") as f:
-            f.write(file_contents)
-        
-        # 5) Crear registro en BD
+        try:
+            # 1) Validaciones
+            DocumentService.validate_upload_metadata(filename, content_type)
+            DocumentService._validate_pdf(staged.temp_path)
+
+            # 2) Guardar contenido (si ya existe, solo se suma una referencia)
+            blob = BlobStorage.store(session, staged, upload_dir)
+        except BaseException:
+            staged.discard()
+            raise
+
         document = Document(
-            name=unique_name,
-            file_path=file_path,
-            file_size=len(file_contents),
+            file_path=blob.file_path,
+            file_size=staged.size,
             status=DocumentStatus.IN_REVIEW,
             user_id=user_id,
-            upload_date=datetime.utcnow()
+            upload_date=datetime.utcnow(),
+            blob_sha256=blob.sha256
         )
-        session.add(document)
+        DocumentIntegrity.record(document, staged.sha256)
+
+        # 3) Determinar nombre único y crear registro en BD. La restricción
+        # única (user_id, name) cubre nombres ya tomados por otra vía
+        # (p. ej. alguien subió literalmente "scan_1.pdf"): se reintenta.
+        for attempt in range(MAX_NAME_ATTEMPTS):
+            document.name = DocumentService._get_unique_filename(session, user_id, filename)
+            try:
+                with session.begin_nested():
+                    session.add(document)
+                break
+            except IntegrityError:
+                if attempt == MAX_NAME_ATTEMPTS - 1:
+                    session.rollback()
+                    raise HTTPException(409, "No se pudo asignar un nombre único al documento")
+
         session.commit()
         
         return document
     
     @staticmethod
-    def _validate_file(file_contents: bytes, filename: str, content_type: str, max_file_size: int):
-        """Valida el archivo subido"""
+    def validate_upload_metadata(filename: str, content_type: str):
+        """Valida tipo MIME y extensión antes de recibir el contenido"""
         
         # Validar MIME type
         if content_type != "application/pdf":
@@ -139,71 +492,96 @@ class DocumentService:
         # Validar extensión
         if not filename.lower().endswith(".pdf"):
             raise HTTPException(400, "La extensión debe ser .pdf")
-        
-        # Validar tamaño
-        if len(file_contents) > max_file_size:
-            raise HTTPException(400, f"El tamaño máximo es {max_file_size // (1024*1024)} MB")
-        
-        # Validar integridad del PDF
+
+    @staticmethod
+    def _validate_size(file_size: int, max_file_size: int):
+        if file_size > max_file_size:
+            raise DocumentService.file_too_large(max_file_size)
+
+    @staticmethod
+    def file_too_large(max_file_size: int) -> HTTPException:
+        return HTTPException(400, f"El tamaño máximo es {max_file_size // (1024*1024)} MB")
+
+    @staticmethod
+    def _validate_pdf(file_path: str):
+        """
+        Valida la estructura del PDF leyendo solo su inicio y final.
+        El parseo completo se hace en segundo plano (schedule_deep_validation).
+        """
         try:
-            reader = PdfReader(io.BytesIO(file_contents))
-            _ = reader.pages
-        except Exception:
+            quick_validate_pdf(file_path)
+        except (PdfValidationError, OSError):
             raise HTTPException(400, "PDF inválido o dañado")
     
     @staticmethod
     def _get_unique_filename(session: Session, user_id: int, original_name: str) -> str:
-        """Determina el nombre único que se usará para el archivo"""
-        
-        # Separar nombre y extensión
+        """
+        Reserva el siguiente nombre libre (original, original_1, original_2...)
+        usando un contador por (usuario, nombre). La fila del contador queda
+        bloqueada hasta el commit, así dos subidas concurrentes del mismo
+        nombre no pueden obtener el mismo sufijo.
+        """
+        counter = session.get(DocumentNameCounter, (user_id, original_name), with_for_update=True)
+
+        if counter is None:
+            counter = DocumentNameCounter(
+                user_id=user_id,
+                original_name=original_name,
+                next_suffix=DocumentService._legacy_next_suffix(session, user_id, original_name)
+            )
+            try:
+                with session.begin_nested():
+                    session.add(counter)
+            except IntegrityError:
+                # Otra subida concurrente creó el contador primero
+                counter = session.get(
+                    DocumentNameCounter, (user_id, original_name),
+                    with_for_update=True, populate_existing=True
+                )
+
+        suffix = counter.next_suffix
+        counter.next_suffix = suffix + 1
+        session.flush()
+
+        if suffix == 0:
+            return original_name
         base, ext = os.path.splitext(original_name)
-        
-        # Consultar documentos existentes del usuario con el mismo nombre base
+        return f"{base}_{suffix}{ext}"
+
+    @staticmethod
+    def _legacy_next_suffix(session: Session, user_id: int, original_name: str) -> int:
+        """
+        Primer sufijo libre según los documentos existentes antes de que hubiera
+        contador para este nombre. Solo se ejecuta una vez por (usuario, nombre).
+        """
+        base, ext = os.path.splitext(original_name)
+
+        def like_literal(text: str) -> str:
+            # "%", "_" y la barra invertida del nombre se buscan literalmente
+            return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
         existing_names = (
             session.query(Document.name)
             .filter(
                 Document.user_id == user_id,
                 or_(
                     Document.name == original_name,  # Nombre exacto
-                    Document.name.ilike(f"{base}_%{ext}")  # Con sufijo _n
+                    Document.name.like(f"{like_literal(base)}\\_%{like_literal(ext)}", escape="\\")  # Con sufijo _n
                 )
             )
             .all()
         )
-        existing = [row[0] for row in existing_names]
-        
-        # Si no hay duplicados, usar el nombre original
-        if not existing:
-            return original_name
-        
-        # Extraer sufijos _n ya usados
-        used_numbers = set()
-        
-        for existing_name in existing:
+
+        used_numbers = [-1]
+        for (existing_name,) in existing_names:
             if existing_name == original_name:
-                # El nombre original sin sufijo existe
-                used_numbers.add(0)  # Consideramos que el original es _0
-            elif existing_name.startswith(f"{base}_") and existing_name.endswith(ext):
-                # Extraer el número del sufijo
-                try:
-                    # Obtener la parte entre "base_" y "ext"
-                    start_idx = len(base) + 1  # Longitud de "base_"
-                    end_idx = len(existing_name) - len(ext) if ext else len(existing_name)
-                    
-                    if end_idx > start_idx:
-                        number_str = existing_name[start_idx:end_idx]
-                        number = int(number_str)
-                        used_numbers.add(number)
-                except (ValueError, IndexError):
-                    # Si no se puede extraer el número, ignorar
-                    continue
-        
-        # Encontrar el siguiente número disponible
-        next_num = 1
-        while next_num in used_numbers:
-            next_num += 1
-        
-        return f"{base}_{next_num}{ext}"
+                used_numbers.append(0)
+                continue
+            number_str = existing_name[len(base) + 1:len(existing_name) - len(ext)]
+            if number_str.isdigit():
+                used_numbers.append(int(number_str))
+
+        return max(used_numbers) + 1
 
     @staticmethod
     def sign_document(session: Session, document_id: int, user_id: int) -> Document:
@@ -222,3 +600,12 @@ class DocumentService:
         return DocumentStateService.change_document_state(
             session, document_id, user_id, DocumentStatus.REJECTED
         )
+
+    @staticmethod
+    async def reject_document_async(session: AsyncSession, document_id: int, user_id: int) -> Document:
+        """
+        Async version of reject_document
+        """
+        return await DocumentStateService.change_document_state_async(
+            session, document_id, user_id, DocumentStatus.REJECTED
+        )
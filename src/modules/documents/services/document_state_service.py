@@ -1,9 +1,9 @@
 from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from modules.documents.models.document import Document, DocumentStatus
 from modules.documents.models.user import User, UserRole
 from typing import Optional
-from modules.notifications.repositories.notification_repository import NotificationRepository
 from modules.notifications.services.notification_service import NotificationService
 
 class DocumentStateError(Exception):
@@ -41,13 +41,59 @@ class DocumentStateService:
 
     @staticmethod
     def change_document_state(session: Session, document_id: int, user_id: int,
-                             new_state: DocumentStatus) -> Document:
+                             new_state: DocumentStatus, commit: bool = True) -> Document:
         """
-        Changes document state after validating permissions and updates dates
+        Changes document state after validating permissions and updates dates.
+        The notification is written to the outbox in the same transaction;
+        with commit=False the caller commits it together with its own changes.
         """
         document = session.get(Document, document_id)
         user = session.get(User, user_id)
 
+        previous_state = DocumentStateService._apply_transition(user, document, new_state)
+        NotificationService.enqueue_change_document_state_notification(
+            session,
+            user_id=document.user_id,
+            document_name=document.name,
+            new_state=new_state.value
+        )
+
+        if commit:
+            session.commit()
+
+        print(f"Document {document.id} changed from {previous_state.value} to {new_state.value}")
+        return document
+
+    @staticmethod
+    async def change_document_state_async(session: AsyncSession, document_id: int, user_id: int,
+                                          new_state: DocumentStatus, commit: bool = True) -> Document:
+        """
+        Async version of change_document_state
+        """
+        document = await session.get(Document, document_id)
+        user = await session.get(User, user_id)
+
+        previous_state = DocumentStateService._apply_transition(user, document, new_state)
+        NotificationService.enqueue_change_document_state_notification(
+            session,
+            user_id=document.user_id,
+            document_name=document.name,
+            new_state=new_state.value
+        )
+
+        if commit:
+            await session.commit()
+
+        print(f"Document {document.id} changed from {previous_state.value} to {new_state.value}")
+        return document
+
+    @staticmethod
+    def _apply_transition(user: Optional[User], document: Optional[Document],
+                          new_state: DocumentStatus) -> DocumentStatus:
+        """
+        Validates the transition and updates state and dates (no commit).
+        Returns the previous state.
+        """
         if not document:
             raise DocumentStateError("Document not found")
 
@@ -68,18 +114,7 @@ class DocumentStateService:
         elif new_state == DocumentStatus.SIGNED:
             document.signing_date = datetime.utcnow()
 
-        session.commit()
-
-        notif_repo = NotificationRepository(session)
-        notif_service = NotificationService(notif_repo)
-        notif_service.create_change_document_state_notification(
-            user_id=document.user_id,
-            document_name=document.name,
-            new_state=new_state.value
-        )
-
-        print(f"Document {document.id} changed from {previous_state.value} to {new_state.value}")
-        return document
+        return previous_state
 
     @staticmethod
     def get_allowed_transitions(user: User, document: Document) -> list[DocumentStatus]:
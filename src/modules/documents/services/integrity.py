@@ -0,0 +1,114 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.orm import Session
+from modules.documents.models.document import Document
+
+HASH_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+@dataclass(frozen=True)
+class FileDigest:
+    """Hash de un archivo junto con el tamaño y mtime que tenía al leerlo."""
+    file_path: str
+    sha256: str
+    size: int
+    mtime: float
+
+    def matches(self, file_path: str) -> bool:
+        """True si el archivo sigue siendo el que se hasheó (solo hace stat)."""
+        if file_path != self.file_path:
+            return False
+        st = os.stat(file_path)
+        return st.st_size == self.size and st.st_mtime == self.mtime
+
+class DocumentIntegrity:
+    """
+    Mantiene el SHA-256 persistido de cada documento. El hash se calcula una
+    vez al subir el archivo y solo se recalcula si el tamaño o mtime del
+    archivo cambian, o si el scrub periódico marcó el documento.
+    """
+
+    @staticmethod
+    def hash_file(file_path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def digest_file(file_path: str) -> FileDigest:
+        """Hashea el archivo; el stat se toma antes para detectar cambios durante la lectura."""
+        st = os.stat(file_path)
+        return FileDigest(file_path, DocumentIntegrity.hash_file(file_path), st.st_size, st.st_mtime)
+
+    @staticmethod
+    def record(document: Document, sha256: str):
+        """Guarda el hash y el estado (tamaño, mtime) con que fue verificado."""
+        st = os.stat(document.file_path)
+        document.sha256_hash = sha256
+        document.file_size = st.st_size
+        document.file_mtime = st.st_mtime
+        document.needs_rehash = False
+
+    @staticmethod
+    def is_stale(document: Document) -> bool:
+        """
+        True si el hash guardado ya no puede darse por válido (solo hace stat).
+        Acepta también una fila con las mismas columnas (sha256_hash, etc.).
+        """
+        if not document.sha256_hash or document.needs_rehash:
+            return True
+        st = os.stat(document.file_path)
+        return st.st_size != document.file_size or st.st_mtime != document.file_mtime
+
+    @staticmethod
+    def current_digest(document: Document, precomputed: Optional[FileDigest] = None) -> str:
+        """
+        Devuelve el SHA-256 actual del archivo, releyéndolo solo si está obsoleto.
+        Si precomputed sigue correspondiendo al archivo se usa sin volver a leerlo.
+        Puede modificar el documento; el llamador hace commit.
+        """
+        if DocumentIntegrity.is_stale(document):
+            if precomputed is not None and precomputed.matches(document.file_path):
+                sha256 = precomputed.sha256
+            else:
+                sha256 = DocumentIntegrity.hash_file(document.file_path)
+            DocumentIntegrity.record(document, sha256)
+        return document.sha256_hash
+
+    @staticmethod
+    def scrub(session: Session, batch_size: int = 500) -> int:
+        """
+        Recorre los documentos comparando solo tamaño y mtime contra lo
+        registrado, y marca para re-hash los que cambiaron o no existen.
+        Devuelve la cantidad de documentos marcados.
+        """
+        flagged = 0
+        last_id = 0
+        while True:
+            documents = (
+                session.query(Document)
+                .filter(Document.id > last_id, Document.needs_rehash.is_(False))
+                .order_by(Document.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not documents:
+                break
+
+            for doc in documents:
+                try:
+                    stale = DocumentIntegrity.is_stale(doc)
+                except OSError:
+                    stale = True
+                if stale:
+                    doc.needs_rehash = True
+                    flagged += 1
+
+            last_id = documents[-1].id
+            session.commit()
+
+        return flagged
@@ -0,0 +1,139 @@
+"""
+Recepción en streaming de subidas multipart/form-data.
+
+Si el endpoint declara un UploadFile, Starlette parsea el formulario completo
+(a un SpooledTemporaryFile) antes de ejecutarlo: una subida demasiado grande
+se recibe entera antes de rechazarla y luego se copia otra vez al temporal
+del upload. Aquí se lee request.stream() con el parser de python-multipart y
+el contenido del archivo va directo al temporal (DocumentService.stage_chunks).
+"""
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from modules.documents.services.document_service import DocumentService, StagedUpload
+
+@dataclass
+class MultipartFile:
+    """Nombre y tipo declarados en la parte del archivo"""
+    filename: str
+    content_type: str
+
+class _FilePartCollector:
+    """
+    Callbacks del parser: guarda los metadatos de la primera parte con
+    nombre field_name y acumula su contenido hasta que se consuma.
+    """
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name
+        self.file: Optional[MultipartFile] = None
+        self.finished = False
+        self._chunks: List[bytes] = []
+        self._in_file = False
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+
+    def take_chunk(self) -> bytes:
+        chunk, self._chunks = b"".join(self._chunks), []
+        return chunk
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field, self._header_value = b"", b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        self._in_file = (
+            self.file is None
+            and filename is not None
+            and options.get(b"name") == self.field_name.encode()
+        )
+        if self._in_file:
+            self.file = MultipartFile(
+                filename=filename.decode("utf-8", errors="replace"),
+                content_type=self._headers.get(b"content-type", b"").decode("latin-1")
+            )
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._chunks.append(data[start:end])
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self.finished = True
+
+async def stage_multipart_upload(
+    request: Request,
+    field_name: str,
+    upload_dir: str,
+    max_file_size: int,
+    max_body_size: int
+) -> Tuple[StagedUpload, MultipartFile]:
+    """
+    Recibe el archivo field_name del cuerpo multipart hacia un temporal en
+    upload_dir. Rechaza por Content-Length antes de leer el cuerpo, valida
+    nombre y tipo al llegar las cabeceras de la parte (antes del contenido)
+    y aborta apenas el cuerpo supera max_body_size o el archivo max_file_size.
+    """
+    media_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if media_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(400, "Se esperaba un formulario multipart/form-data")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_body_size:
+        raise DocumentService.file_too_large(max_file_size)
+
+    collector = _FilePartCollector(field_name)
+    parser = MultipartParser(boundary, collector.callbacks())
+
+    async def file_chunks() -> AsyncIterator[bytes]:
+        received = 0
+        validated = False
+        try:
+            async for body_chunk in request.stream():
+                # Cuerpos sin Content-Length (chunked) también tienen límite
+                received += len(body_chunk)
+                if received > max_body_size:
+                    raise DocumentService.file_too_large(max_file_size)
+                parser.write(body_chunk)
+                if collector.file is not None and not validated:
+                    DocumentService.validate_upload_metadata(collector.file.filename, collector.file.content_type)
+                    validated = True
+                chunk = collector.take_chunk()
+                if chunk:
+                    yield chunk
+            parser.finalize()
+        except MultipartParseError:
+            raise HTTPException(400, "Formulario multipart inválido")
+        if not collector.finished:
+            raise HTTPException(422, f"Falta el archivo '{field_name}'")
+
+    staged = await DocumentService.stage_chunks(file_chunks(), upload_dir, max_file_size)
+    return staged, collector.file
@@ -0,0 +1,151 @@
+"""
+Validación de PDFs en dos niveles:
+
+1. quick_validate_pdf: chequeo estructural barato (cabecera %PDF-, trailer
+   startxref/%%EOF y offset de la tabla xref) leyendo solo el inicio y el
+   final del archivo. Se ejecuta en la request.
+2. Validación profunda: parseo completo con PyPDF2 en el pool de procesos
+   (execution.cpu_pool), con límite de tiempo de CPU y de páginas. Se ejecuta en segundo
+   plano y marca el documento como inválido si falla.
+"""
+import os
+import re
+import signal
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from execution import cpu_pool, io_pool
+from modules.documents.models.document import Document
+
+PDF_HEAD_BYTES = 1024
+PDF_TAIL_BYTES = 2048
+
+DEEP_VALIDATION_ENABLED = os.getenv("PDF_DEEP_VALIDATION", "1") == "1"
+DEEP_VALIDATION_MAX_PENDING = int(os.getenv("PDF_DEEP_VALIDATION_MAX_PENDING", "32"))
+DEEP_VALIDATION_CPU_SECONDS = int(os.getenv("PDF_DEEP_VALIDATION_CPU_SECONDS", "10"))
+DEEP_VALIDATION_MAX_PAGES = int(os.getenv("PDF_DEEP_VALIDATION_MAX_PAGES", "500"))
+
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)\s+%%EOF")
+_XREF_TARGET_RE = re.compile(rb"\s*(xref|\d+\s+\d+\s+obj)")
+
+class PdfValidationError(Exception):
+    """El archivo no es un PDF válido"""
+    pass
+
+def quick_validate_pdf(file_path: str):
+    """Valida la estructura mínima del PDF sin parsearlo completo."""
+    size = os.path.getsize(file_path)
+
+    with open(file_path, "rb") as f:
+        head = f.read(PDF_HEAD_BYTES)
+        header_pos = head.find(b"%PDF-")
+        if header_pos < 0:
+            raise PdfValidationError("Falta la cabecera %PDF-")
+
+        f.seek(max(0, size - PDF_TAIL_BYTES))
+        tail = f.read()
+        matches = _STARTXREF_RE.findall(tail)
+        if not matches:
+            raise PdfValidationError("Falta el trailer startxref/%%EOF")
+
+        # Los offsets se cuentan desde el inicio de la cabecera
+        xref_offset = header_pos + int(matches[-1])
+        if xref_offset >= size:
+            raise PdfValidationError("Offset de xref fuera del archivo")
+
+        f.seek(xref_offset)
+        if not _XREF_TARGET_RE.match(f.read(64)):
+            raise PdfValidationError("El offset de startxref no apunta a una tabla xref")
+
+
+def _on_cpu_limit(signum, frame):
+    raise PdfValidationError("Se superó el tiempo de CPU permitido")
+
+def deep_validate_pdf(file_path: str, max_pages: int, cpu_seconds: int) -> int:
+    """
+    Parseo completo (se ejecuta dentro de un proceso del pool).
+    Devuelve la cantidad de páginas.
+    """
+    from PyPDF2 import PdfReader
+
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(
+            resource.RLIMIT_CPU,
+            (int(usage.ru_utime + usage.ru_stime) + cpu_seconds, hard)
+        )
+    try:
+        with open(file_path, "rb") as f:
+            reader = PdfReader(f)
+            page_count = len(reader.pages)
+            if page_count > max_pages:
+                raise PdfValidationError(f"El PDF supera el máximo de {max_pages} páginas")
+            for page in reader.pages:
+                page.get_contents()
+        return page_count
+    finally:
+        if resource is not None:
+            resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+_pending = threading.BoundedSemaphore(DEEP_VALIDATION_MAX_PENDING)
+
+def schedule_deep_validation(document_id: int, file_path: str, session_factory: Callable) -> Optional[Future]:
+    """
+    Encola la validación profunda y registra el resultado en Document.pdf_valid.
+    No bloquea: si la cola está llena el documento queda pendiente (pdf_valid NULL).
+    """
+    if not DEEP_VALIDATION_ENABLED:
+        return None
+    if not _pending.acquire(blocking=False):
+        print(f"Validación profunda omitida para documento {document_id}: cola llena")
+        return None
+
+    try:
+        future = cpu_pool.submit(
+            deep_validate_pdf, file_path, DEEP_VALIDATION_MAX_PAGES, DEEP_VALIDATION_CPU_SECONDS
+        )
+    except Exception as e:
+        # Pool cerrado o roto al encolar: el upload ya se confirmó, el documento queda pendiente
+        _pending.release()
+        print(f"Validación profunda no encolada para documento {document_id}: {e}")
+        return None
+
+    executor = cpu_pool.executor_for(future)
+
+    def _record(done: Future):
+        # Corre en el hilo de gestión del pool de procesos: no debe esperar a la BD
+        _pending.release()
+        error = done.exception()
+        if isinstance(error, BrokenProcessPool):
+            # Un worker murió (p. ej. límite duro de CPU): se descarta ese pool
+            # (solo si sigue siendo el actual) y el documento queda pendiente
+            # en lugar de marcarse inválido
+            print(f"Validación profunda interrumpida para documento {document_id}: {error}")
+            cpu_pool.reset_if(executor)
+            return
+        io_pool.submit(_store_result, document_id, error, session_factory)
+
+    future.add_done_callback(_record)
+    return future
+
+def _store_result(document_id: int, error: Optional[BaseException], session_factory: Callable):
+    try:
+        with session_factory() as session:
+            doc = session.get(Document, document_id)
+            if doc is not None:
+                doc.pdf_valid = error is None
+                session.commit()
+    except Exception as e:
+        print(f"Error registrando validación del documento {document_id}: {e}")
+    if error is not None:
+        print(f"Documento {document_id} marcado como PDF inválido: {error}")
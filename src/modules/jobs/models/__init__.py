@@ -0,0 +1,3 @@
+from .job_run import JobRun, JobRunStatus
+
+__all__ = ['JobRun', 'JobRunStatus']
@@ -0,0 +1,28 @@
+from datetime import datetime
+from enum import Enum as PyEnum
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Float, Index
+
+from database import Base
+
+class JobRunStatus(PyEnum):
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+class JobRun(Base):
+    """Historial de ejecuciones de los jobs programados"""
+    __tablename__ = 'job_runs'
+    __table_args__ = (
+        Index('ix_job_runs_job_name_started_at', 'job_name', 'started_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    job_name = Column(String(100), nullable=False)
+    status = Column(Enum(JobRunStatus), nullable=False, default=JobRunStatus.RUNNING)
+    started_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+    duration_seconds = Column(Float)
+    # Resumen del resultado (reporte del job) o el error
+    detail = Column(String(2000))
+    # host:pid del worker que la ejecutó
+    worker = Column(String(255))
@@ -0,0 +1,5 @@
+from .job_runner import JobRunner
+from .leader import job_leadership
+from .scheduler import get_scheduler, schedule_interval_job, shutdown_scheduler
+
+__all__ = ['JobRunner', 'job_leadership', 'get_scheduler', 'schedule_interval_job', 'shutdown_scheduler']
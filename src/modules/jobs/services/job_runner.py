@@ -0,0 +1,97 @@
+import os
+import socket
+import time
+from dataclasses import asdict, is_dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from modules.jobs.models.job_run import JobRun, JobRunStatus
+from modules.jobs.services.leader import job_leadership
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+# Fracción del intervalo dentro de la cual se considera que el job ya corrió
+RECENT_RUN_FACTOR = 0.9
+# Una ejecución RUNNING más vieja que esto se da por muerta (el worker cayó sin registrar el fin)
+JOB_RUN_STALE_SECONDS = int(os.getenv("JOB_RUN_STALE_SECONDS", "3600"))
+
+class JobRunner:
+
+    @staticmethod
+    def run_exclusive(
+        session_factory: Callable[[], Session],
+        job_name: str,
+        interval: timedelta,
+        fn: Callable[[Session], Any]
+    ) -> Optional[JobRun]:
+        """
+        Ejecuta fn(session) solo si este proceso obtiene el liderazgo del job y
+        nadie lo ejecutó dentro del intervalo; registra la ejecución en job_runs.
+        Devuelve el JobRun, o None si la ejecución se omitió.
+        """
+        with session_factory() as session:
+            with job_leadership(session.get_bind(), job_name) as leader:
+                if not leader:
+                    return None
+                if JobRunner._ran_recently(session, job_name, interval):
+                    return None
+                return JobRunner._run(session, job_name, fn)
+
+    @staticmethod
+    def _ran_recently(session: Session, job_name: str, interval: timedelta) -> bool:
+        # Los schedulers de cada worker no arrancan a la vez: sin esto, otro
+        # worker podría tomar el lock recién liberado y repetir la ejecución
+        now = datetime.utcnow()
+        since = now - interval * RECENT_RUN_FACTOR
+        alive_since = now - timedelta(seconds=JOB_RUN_STALE_SECONDS)
+        return session.execute(
+            select(JobRun.id)
+            .where(
+                JobRun.job_name == job_name,
+                JobRun.started_at >= since,
+                or_(
+                    JobRun.status == JobRunStatus.SUCCEEDED,
+                    and_(JobRun.status == JobRunStatus.RUNNING, JobRun.started_at >= alive_since)
+                )
+            )
+            .limit(1)
+        ).first() is not None
+
+    @staticmethod
+    def _run(session: Session, job_name: str, fn: Callable[[Session], Any]) -> JobRun:
+        run = JobRun(job_name=job_name, status=JobRunStatus.RUNNING, started_at=datetime.utcnow(), worker=WORKER_ID)
+        session.add(run)
+        session.commit()
+
+        started = time.perf_counter()
+        try:
+            result = fn(session)
+            run.status = JobRunStatus.SUCCEEDED
+            run.detail = JobRunner._describe(result)
+        except Exception as e:
+            session.rollback()
+            run.status = JobRunStatus.FAILED
+            run.detail = f"{type(e).__name__}: {e}"[:2000]
+            print(f"Job {job_name} falló: {e}")
+        run.finished_at = datetime.utcnow()
+        run.duration_seconds = round(time.perf_counter() - started, 3)
+        session.commit()
+        session.refresh(run)
+        return run
+
+    @staticmethod
+    def _describe(result: Any) -> Optional[str]:
+        if result is None:
+            return None
+        if is_dataclass(result):
+            result = asdict(result)
+        return str(result)[:2000]
+
+    @staticmethod
+    def recent_runs(session: Session, job_name: Optional[str] = None, limit: int = 50) -> list[JobRun]:
+        stmt = select(JobRun).order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit)
+        if job_name:
+            stmt = stmt.where(JobRun.job_name == job_name)
+        return list(session.execute(stmt).scalars().all())
@@ -0,0 +1,61 @@
+"""
+Elección de líder para los jobs programados.
+
+Cada worker ejecuta su propio BackgroundScheduler; antes de correr un job se
+toma un lock exclusivo por nombre de job sin esperar. Quien no lo obtiene
+omite esa ejecución.
+
+- Postgres: pg_try_advisory_xact_lock en una conexión dedicada, cuya
+  transacción se mantiene abierta mientras dura el job (compatible con
+  pgbouncer en modo transacción).
+- Otros motores (SQLite en desarrollo): flock sobre un archivo por job, que
+  coordina los procesos de un mismo nodo.
+"""
+import os
+import tempfile
+import zlib
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+JOB_LOCK_DIR = os.getenv("JOB_LOCK_DIR", tempfile.gettempdir())
+# Espacio de claves propio para no chocar con el lock de migraciones
+JOB_LOCK_NAMESPACE = 724_100
+
+def job_lock_key(job_name: str) -> int:
+    return (JOB_LOCK_NAMESPACE << 32) | zlib.crc32(job_name.encode())
+
+@contextmanager
+def job_leadership(bind: Engine, job_name: str) -> Iterator[bool]:
+    """Contexto que indica si este proceso es líder del job mientras dure"""
+    if bind.dialect.name == "postgresql":
+        with bind.connect() as conn:
+            with conn.begin():
+                acquired = conn.execute(
+                    text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": job_lock_key(job_name)}
+                ).scalar()
+                yield bool(acquired)
+        return
+
+    if fcntl is None:
+        yield True
+        return
+
+    path = os.path.join(JOB_LOCK_DIR, f"dp-fes-job-{job_name}.lock")
+    with open(path, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,35 @@
+"""
+Scheduler en segundo plano compartido por todos los jobs del proceso.
+
+Se crea (e importa APScheduler) al registrar el primer job, así los procesos
+que no corren jobs no pagan el import. Cada job se registra con un id fijo:
+volver a registrarlo reemplaza al anterior en lugar de duplicarlo.
+"""
+import threading
+from typing import Callable
+
+_scheduler = None
+_lock = threading.Lock()
+
+def get_scheduler():
+    global _scheduler
+    with _lock:
+        if _scheduler is None:
+            from apscheduler.schedulers.background import BackgroundScheduler
+
+            _scheduler = BackgroundScheduler()
+            _scheduler.start()
+        return _scheduler
+
+def schedule_interval_job(job_id: str, fn: Callable[[], None], **interval):
+    """Registra fn para correr cada intervalo (kwargs de IntervalTrigger: seconds, hours, days...)"""
+    get_scheduler().add_job(
+        fn, "interval", id=job_id, replace_existing=True, max_instances=1, coalesce=True, **interval
+    )
+
+def shutdown_scheduler():
+    global _scheduler
+    with _lock:
+        if _scheduler is not None:
+            _scheduler.shutdown(wait=False)
+            _scheduler = None
@@ -1,18 +1,41 @@
 # modules/notifications/controllers/notification_controller.py
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Optional
 
-from database import SessionLocal
-from modules.notifications.repositories.notification_repository import NotificationRepository
+from database import SessionLocal, get_async_db, get_async_read_db
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError
+from modules.auth.controllers.auth_controller import get_stream_principal, get_token_principal
+from modules.auth.services.auth_service import TokenPrincipal
+from modules.documents.models.user import UserRole
+from modules.notifications.repositories.notification_repository import (
+    AsyncNotificationRepository,
+    NotificationRepository,
+)
+from modules.notifications.services.notification_hub import notification_hub
 from modules.notifications.services.notification_service import NotificationService
 from modules.notifications.models.schemas import (
+    BulkDeleteResponse,
+    BulkUpdateResponse,
+    MarkReadRequest,
+    NotificationListResponse,
     NotificationResponse,
+    UnreadCountResponse,
     ChangeDocumentStateRequest,
 )
 
 router = APIRouter()
 
+# Comentario keep-alive para que proxies no corten conexiones SSE inactivas
+SSE_KEEPALIVE_SECONDS = float(os.getenv("NOTIFICATIONS_SSE_KEEPALIVE_SECONDS", "15"))
+
 
 def get_db():
     db = SessionLocal()
@@ -27,16 +50,103 @@ def get_notification_service(db: Session = Depends(get_db)) -> NotificationServi
     return NotificationService(repo)
 
 
+def get_async_notification_service(db: AsyncSession = Depends(get_async_db)) -> NotificationService:
+    repo = AsyncNotificationRepository(db)
+    return NotificationService(repo)
+
+
+def get_async_read_notification_service(db: AsyncSession = Depends(get_async_read_db)) -> NotificationService:
+    repo = AsyncNotificationRepository(db)
+    return NotificationService(repo)
+
+
+def _ensure_owner(current_user: TokenPrincipal, user_id: int, allow_admin: bool = True):
+    """Cada usuario opera sobre sus notificaciones; un administrador, sobre las de cualquiera"""
+    if current_user.id == user_id or (allow_admin and current_user.role == UserRole.ADMIN):
+        return
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="No puede acceder a las notificaciones de otro usuario"
+    )
+
+
 @router.get(
     "/users/{user_id}",
-    response_model=List[NotificationResponse],
+    response_model=NotificationListResponse,
     summary="Obtener notificaciones de un usuario"
 )
-def list_notifications(
+async def list_notifications(
     user_id: int,
-    service: NotificationService = Depends(get_notification_service)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tamaño de página"),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto como next_cursor"),
+    unread_only: bool = Query(False, description="Solo notificaciones no leídas"),
+    service: NotificationService = Depends(get_async_read_notification_service),
+    current_user: TokenPrincipal = Depends(get_token_principal)
+):
+    """
+    Notificaciones más recientes primero, paginadas por cursor como el
+    listado de documentos: next_cursor es None en la última página.
+    """
+    _ensure_owner(current_user, user_id)
+    try:
+        notifications, next_cursor = await service.get_notifications_page_async(
+            user_id, limit=limit, cursor=cursor, unread_only=unread_only
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return NotificationListResponse(notifications=notifications, next_cursor=next_cursor)
+
+
+@router.get(
+    "/users/{user_id}/unread-count",
+    response_model=UnreadCountResponse,
+    summary="Cantidad de notificaciones no leídas"
+)
+async def count_unread_notifications(
+    user_id: int,
+    service: NotificationService = Depends(get_async_read_notification_service),
+    current_user: TokenPrincipal = Depends(get_token_principal)
+):
+    _ensure_owner(current_user, user_id)
+    return {"unread": await service.count_unread_async(user_id)}
+
+
+@router.get(
+    "/users/{user_id}/stream",
+    summary="Recibir notificaciones en tiempo real (Server-Sent Events)"
+)
+async def stream_notifications(
+    user_id: int,
+    request: Request,
+    current_user: TokenPrincipal = Depends(get_stream_principal)
 ):
-    return service.get_notifications(user_id)
+    """
+    Mantiene la conexión abierta y envía un evento `notification` por cada
+    notificación nueva del usuario, en lugar de consultar el listado.
+    Solo el propio usuario puede suscribirse a su stream.
+    """
+    _ensure_owner(current_user, user_id, allow_admin=False)
+    subscriber = notification_hub.subscribe(user_id)
+    _, queue = subscriber
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {payload['id']}\nevent: notification\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            notification_hub.unsubscribe(user_id, subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.post(
@@ -62,14 +172,61 @@ def create_change_state_notification(
     response_model=NotificationResponse,
     summary="Marcar notificación como leída"
 )
-def mark_notification_as_read(
+async def mark_notification_as_read(
     notification_id: int,
-    service: NotificationService = Depends(get_notification_service)
+    service: NotificationService = Depends(get_async_notification_service)
 ):
-    notif = service.mark_as_read(notification_id)
+    notif = await service.mark_as_read_async(notification_id)
     if not notif:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Notificación no encontrada"
         )
     return notif
+
+
+@router.patch(
+    "/users/{user_id}/read-all",
+    response_model=BulkUpdateResponse,
+    summary="Marcar todas las notificaciones del usuario como leídas"
+)
+async def mark_all_notifications_as_read(
+    user_id: int,
+    service: NotificationService = Depends(get_async_notification_service),
+    current_user: TokenPrincipal = Depends(get_token_principal)
+):
+    _ensure_owner(current_user, user_id)
+    return {"updated": await service.mark_all_as_read_async(user_id)}
+
+
+@router.patch(
+    "/users/{user_id}/read",
+    response_model=BulkUpdateResponse,
+    summary="Marcar varias notificaciones como leídas"
+)
+async def mark_notifications_as_read(
+    user_id: int,
+    payload: MarkReadRequest,
+    service: NotificationService = Depends(get_async_notification_service),
+    current_user: TokenPrincipal = Depends(get_token_principal)
+):
+    _ensure_owner(current_user, user_id)
+    return {"updated": await service.mark_many_as_read_async(user_id, payload.ids)}
+
+
+@router.delete(
+    "/users/{user_id}/read",
+    response_model=BulkDeleteResponse,
+    summary="Eliminar notificaciones leídas anteriores a una fecha"
+)
+async def delete_read_notifications(
+    user_id: int,
+    before: datetime = Query(..., description="Se eliminan las leídas creadas antes de esta fecha"),
+    service: NotificationService = Depends(get_async_notification_service),
+    current_user: TokenPrincipal = Depends(get_token_principal)
+):
+    _ensure_owner(current_user, user_id)
+    if before.tzinfo is not None:
+        # created_at se guarda en UTC sin zona horaria
+        before = before.astimezone(timezone.utc).replace(tzinfo=None)
+    return {"deleted": await service.delete_read_before_async(user_id, before)}
@@ -0,0 +1,4 @@
+from .outbox_dispatch import start_outbox_dispatch_job
+from .retention import start_notification_retention_job
+
+__all__ = ['start_outbox_dispatch_job', 'start_notification_retention_job']
@@ -0,0 +1,29 @@
+import os
+from datetime import timedelta
+
+from modules.jobs.services.job_runner import JobRunner
+from modules.jobs.services.scheduler import schedule_interval_job
+from modules.notifications.services.outbox_dispatcher import OutboxDispatcher
+from database import SessionLocal
+
+OUTBOX_DISPATCH_INTERVAL_SECONDS = int(os.getenv("NOTIFICATION_OUTBOX_INTERVAL_SECONDS", "2"))
+OUTBOX_DISPATCH_JOB = "notification_outbox_dispatch"
+
+def dispatch_outbox(session_factory=SessionLocal):
+    """
+    En Postgres todos los workers despachan a la vez: SKIP LOCKED reparte las
+    filas. Otros motores (SQLite) ignoran SKIP LOCKED y dos workers tomarían
+    las mismas filas, así que ahí despacha un solo worker (JobRunner.run_exclusive).
+    """
+    with session_factory() as session:
+        if session.get_bind().dialect.name == "postgresql":
+            return OutboxDispatcher.dispatch(session)
+    return JobRunner.run_exclusive(
+        session_factory,
+        OUTBOX_DISPATCH_JOB,
+        timedelta(seconds=OUTBOX_DISPATCH_INTERVAL_SECONDS),
+        OutboxDispatcher.dispatch
+    )
+
+def start_outbox_dispatch_job():
+    schedule_interval_job(OUTBOX_DISPATCH_JOB, dispatch_outbox, seconds=OUTBOX_DISPATCH_INTERVAL_SECONDS)
@@ -0,0 +1,21 @@
+from datetime import timedelta
+from modules.jobs.services.job_runner import JobRunner
+from modules.jobs.services.scheduler import schedule_interval_job
+from modules.notifications.services.retention import purge_read_notifications
+from database import SessionLocal
+
+RETENTION_JOB_INTERVAL = timedelta(days=1)
+
+def start_notification_retention_job():
+    def purge(session):
+        report = purge_read_notifications(session)
+        print(
+            f"Retención de notificaciones: {report.deleted} eliminadas "
+            f"en {report.batches} lotes ({report.duration_seconds}s)"
+        )
+        return report
+
+    def job():
+        JobRunner.run_exclusive(SessionLocal, "notification_retention", RETENTION_JOB_INTERVAL, purge)
+
+    schedule_interval_job("notification_retention", job, days=1)  # cada 24 horas
@@ -1,12 +1,27 @@
 from datetime import datetime
 from enum import Enum as PyEnum
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Enum, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Enum, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 
 from database import Base
 
 class Notification(Base):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        Index('ix_notifications_user_id_created_at', 'user_id', 'created_at'),
+        # Badge de no leídas y feed filtrado: solo indexa las no leídas
+        Index(
+            'ix_notifications_user_id_unread', 'user_id', 'created_at', 'id',
+            postgresql_where=text("read = false"),
+            sqlite_where=text("read = 0")
+        ),
+        # Job de retención: solo las leídas, por fecha
+        Index(
+            'ix_notifications_read_created_at', 'created_at',
+            postgresql_where=text("read = true"),
+            sqlite_where=text("read = 1")
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     title = Column(String(255), nullable=False)
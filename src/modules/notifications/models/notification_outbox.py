@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+
+from database import Base
+
+class NotificationOutbox(Base):
+    """
+    Notificación pendiente, escrita en la misma transacción que el cambio que
+    la origina. El despachador la materializa en `notifications` y la elimina.
+    """
+    __tablename__ = 'notification_outbox'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    title = Column(String(255), nullable=False)
+    message = Column(String(1024), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
 class NotificationResponse(BaseModel):
@@ -12,6 +13,22 @@ class NotificationResponse(BaseModel):
 
     model_config = {"from_attributes": True}
 
+class NotificationListResponse(BaseModel):
+    notifications: List[NotificationResponse]
+    next_cursor: Optional[str] = None
+
+class UnreadCountResponse(BaseModel):
+    unread: int
+
+class MarkReadRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+class BulkUpdateResponse(BaseModel):
+    updated: int
+
+class BulkDeleteResponse(BaseModel):
+    deleted: int
+
 class ChangeDocumentStateRequest(BaseModel):
     document_name: str
     new_state: str
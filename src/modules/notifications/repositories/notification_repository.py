@@ -1,14 +1,29 @@
-from typing import List, Dict, Optional
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+from sqlalchemy import delete, false, func, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from modules.notifications.models.notification import Notification
+from modules.notifications.services.notification_hub import notification_hub
+from pagination import DEFAULT_PAGE_SIZE, after_cursor, clamp_page_size, encode_cursor
+
+def _notify_statement(notification: Notification):
+    return notification_hub.notify_statement(notification.user_id, notification_hub.payload(notification))
 
 class NotificationRepository:
     def __init__(self, db_session: Session):
         self.db = db_session
 
-    def save(self, notification: Notification) -> Notification:
+    def bridge_enabled(self) -> bool:
+        return notification_hub.bridge_enabled(self.db.get_bind())
+
+    def save(self, notification: Notification, notify: bool = False) -> Notification:
+        """Con notify=True emite el pg_notify del puente en la misma transacción"""
         self.db.add(notification)
+        if notify:
+            self.db.flush()
+            self.db.execute(_notify_statement(notification))
         self.db.commit()
         self.db.refresh(notification)
         return notification
@@ -31,3 +46,113 @@ class NotificationRepository:
         self.db.commit()
         self.db.refresh(notif)
         return notif
+
+
+class AsyncNotificationRepository:
+    def __init__(self, db_session: AsyncSession):
+        self.db = db_session
+
+    def bridge_enabled(self) -> bool:
+        return notification_hub.bridge_enabled(self.db.get_bind())
+
+    async def save(self, notification: Notification, notify: bool = False) -> Notification:
+        """Con notify=True emite el pg_notify del puente en la misma transacción"""
+        self.db.add(notification)
+        if notify:
+            await self.db.flush()
+            await self.db.execute(_notify_statement(notification))
+        await self.db.commit()
+        await self.db.refresh(notification)
+        return notification
+
+    async def find_by_user_id(self, user_id: int) -> List[Notification]:
+        result = await self.db.execute(
+            select(Notification)
+            .where(Notification.user_id == user_id)
+            .order_by(Notification.created_at.desc())
+        )
+        return list(result.scalars().all())
+
+    async def find_page_by_user_id(
+        self,
+        user_id: int,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        unread_only: bool = False
+    ) -> Tuple[List[Notification], Optional[str]]:
+        """
+        Página de notificaciones, de la más reciente a la más antigua, con
+        cursor sobre (created_at, id). Devuelve (notificaciones, next_cursor).
+        """
+        limit = clamp_page_size(limit)
+        stmt = (
+            select(Notification)
+            .where(Notification.user_id == user_id)
+            .order_by(Notification.created_at.desc(), Notification.id.desc())
+            .limit(limit + 1)
+        )
+        if unread_only:
+            stmt = stmt.where(Notification.read == false())
+        if cursor:
+            stmt = stmt.where(after_cursor(Notification.created_at, Notification.id, cursor))
+
+        notifications = list((await self.db.execute(stmt)).scalars().all())
+        next_cursor = None
+        if len(notifications) > limit:
+            notifications = notifications[:limit]
+            next_cursor = encode_cursor(notifications[-1].created_at, notifications[-1].id)
+        return notifications, next_cursor
+
+    async def count_unread(self, user_id: int) -> int:
+        """
+        Resuelto con el índice parcial ix_notifications_user_id_unread: el
+        filtro debe escribirse igual que su predicado (read = false), ya que
+        Postgres no deduce que read IS false lo cumpla.
+        """
+        result = await self.db.execute(
+            select(func.count())
+            .select_from(Notification)
+            .where(Notification.user_id == user_id, Notification.read == false())
+        )
+        return result.scalar_one()
+
+    async def update(self, notification_id: int, data: Dict) -> Optional[Notification]:
+        notif = await self.db.get(Notification, notification_id)
+        if not notif:
+            return None
+        for field, value in data.items():
+            setattr(notif, field, value)
+        await self.db.commit()
+        await self.db.refresh(notif)
+        return notif
+
+    async def mark_read(self, user_id: int, notification_ids: Optional[List[int]] = None) -> int:
+        """
+        Marca como leídas las notificaciones no leídas del usuario (todas o
+        las indicadas) con un solo UPDATE. Devuelve la cantidad afectada.
+        """
+        stmt = (
+            update(Notification)
+            .where(Notification.user_id == user_id, Notification.read == false())
+            .values(read=True, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if notification_ids is not None:
+            stmt = stmt.where(Notification.id.in_(notification_ids))
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+        return result.rowcount
+
+    async def delete_read_before(self, user_id: int, cutoff: datetime) -> int:
+        """Elimina con un solo DELETE las leídas creadas antes de cutoff"""
+        result = await self.db.execute(
+            delete(Notification)
+            .where(
+                Notification.user_id == user_id,
+                Notification.read == true(),
+                Notification.created_at < cutoff
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount
@@ -0,0 +1,146 @@
+"""
+Hub en proceso para enviar notificaciones en tiempo real (SSE).
+
+Cada conexión abierta se suscribe con una cola asyncio propia. publish() se
+puede llamar desde cualquier hilo (p. ej. el job del outbox) y reparte el
+mensaje a las conexiones del usuario en este proceso.
+
+Con NOTIFICATIONS_PG_BRIDGE=1 los mensajes viajan por LISTEN/NOTIFY de
+Postgres: quien crea la notificación emite pg_notify dentro de su
+transacción, y cada worker escucha el canal y reparte a sus conexiones
+locales. El listener usa una conexión directa a la base (LISTEN no funciona
+a través de pgbouncer en modo transacción). Sin el puente, con varios workers
+cada conexión solo recibe lo publicado en su propio proceso.
+"""
+import asyncio
+import json
+import os
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from database import DATABASE_URL, is_postgres_url, libpq_dsn
+from modules.notifications.models.notification import Notification
+from modules.notifications.models.schemas import NotificationResponse
+
+NOTIFICATIONS_PG_BRIDGE = os.getenv("NOTIFICATIONS_PG_BRIDGE", "0") == "1"
+NOTIFICATIONS_PG_CHANNEL = os.getenv("NOTIFICATIONS_PG_CHANNEL", "notifications")
+# Mensajes pendientes por conexión; si un cliente lento la llena se descartan los más antiguos
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("NOTIFICATIONS_SUBSCRIBER_QUEUE_SIZE", "100"))
+# Cantidad de workers de uvicorn/gunicorn (la misma variable que leen ambos)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+Subscriber = Tuple[asyncio.AbstractEventLoop, asyncio.Queue]
+
+class NotificationHub:
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[asyncio.Task] = None
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        """Registra una conexión (llamar desde el event loop)"""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id: int, subscriber: Subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: int, payload: dict) -> int:
+        """
+        Reparte el mensaje a las conexiones locales del usuario.
+        Devuelve a cuántas conexiones se entregó.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._offer, queue, payload)
+        return len(subscribers)
+
+    @staticmethod
+    def payload(notification: Notification) -> dict:
+        return NotificationResponse.model_validate(notification).model_dump(mode="json")
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, payload: dict):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(payload)
+
+    def connection_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    # --- Puente Postgres LISTEN/NOTIFY ---
+
+    @staticmethod
+    def bridge_enabled(bind) -> bool:
+        return NOTIFICATIONS_PG_BRIDGE and bind.dialect.name == "postgresql"
+
+    @staticmethod
+    def notify_statement(user_id: int, payload: dict):
+        """pg_notify a ejecutar dentro de la transacción que crea la notificación"""
+        return text("SELECT pg_notify(:channel, :message)").bindparams(
+            channel=NOTIFICATIONS_PG_CHANNEL,
+            message=json.dumps({"user_id": user_id, "payload": payload}, default=str)
+        )
+
+    def _on_pg_notification(self, connection, pid, channel, message: str):
+        try:
+            data = json.loads(message)
+            self.publish(data["user_id"], data["payload"])
+        except (ValueError, KeyError) as e:
+            print(f"Mensaje de notificación inválido en {channel}: {e}")
+
+    async def _listen(self):
+        import asyncpg
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(libpq_dsn(DATABASE_URL))
+                await connection.add_listener(NOTIFICATIONS_PG_CHANNEL, self._on_pg_notification)
+                while not connection.is_closed():
+                    await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Listener de notificaciones desconectado: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(1)
+
+    def start_listener(self):
+        """Inicia el listener de Postgres en el event loop actual (si está habilitado)"""
+        if not (NOTIFICATIONS_PG_BRIDGE and is_postgres_url(DATABASE_URL)):
+            if WEB_CONCURRENCY > 1:
+                print(
+                    f"⚠️  {WEB_CONCURRENCY} workers sin NOTIFICATIONS_PG_BRIDGE=1 (requiere Postgres): "
+                    "las notificaciones en tiempo real solo llegan a conexiones del worker que las publica"
+                )
+            return
+        if self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop_listener(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+notification_hub = NotificationHub()
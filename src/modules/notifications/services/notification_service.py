@@ -1,8 +1,14 @@
 # modules/notifications/services/notification_service.py
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
 
 from modules.notifications.models.notification import Notification
-from modules.notifications.repositories.notification_repository import NotificationRepository
+from modules.notifications.models.notification_outbox import NotificationOutbox
+from modules.notifications.services.notification_hub import notification_hub
+from modules.notifications.repositories.notification_repository import (
+    AsyncNotificationRepository,
+    NotificationRepository,
+)
 
 class NotificationTemplate:
     def __init__(self, user_id: int, title: str, message: str):
@@ -30,25 +36,104 @@ class ChangeDocumentStateNotification(NotificationTemplate):
         super().__init__(user_id, title, message)
 
 class NotificationService:
-    def __init__(self, repository: NotificationRepository):
+    """
+    Los métodos síncronos usan un NotificationRepository; los *_async un
+    AsyncNotificationRepository.
+    """
+    def __init__(self, repository: Union[NotificationRepository, AsyncNotificationRepository]):
         self.notification_repository = repository
 
-    def create_change_document_state_notification(
-        self,
+    @staticmethod
+    def _build_change_document_state_notification(
         user_id: int,
         document_name: str,
         new_state: str
     ) -> Notification:
         template = ChangeDocumentStateNotification(user_id, document_name, new_state)
-        notif = Notification(
+        return Notification(
             user_id=template.user_id,
             title=template.title,
             message=template.message
         )
-        return self.notification_repository.save(notif)
+
+    @staticmethod
+    def enqueue_change_document_state_notification(
+        session,
+        user_id: int,
+        document_name: str,
+        new_state: str
+    ) -> NotificationOutbox:
+        """
+        Agrega la notificación al outbox en la sesión recibida, sin commit:
+        se confirma junto con el cambio de estado (sesión síncrona o asíncrona).
+        """
+        template = ChangeDocumentStateNotification(user_id, document_name, new_state)
+        entry = NotificationOutbox(
+            user_id=template.user_id,
+            title=template.title,
+            message=template.message
+        )
+        session.add(entry)
+        return entry
+
+    def create_change_document_state_notification(
+        self,
+        user_id: int,
+        document_name: str,
+        new_state: str
+    ) -> Notification:
+        notif = self._build_change_document_state_notification(user_id, document_name, new_state)
+        # Con el puente, NOTIFY se entrega al confirmar a los workers de todos los nodos
+        bridged = self.notification_repository.bridge_enabled()
+        notif = self.notification_repository.save(notif, notify=bridged)
+        if not bridged:
+            notification_hub.publish(notif.user_id, notification_hub.payload(notif))
+        return notif
 
     def get_notifications(self, user_id: int) -> List[Notification]:
         return self.notification_repository.find_by_user_id(user_id)
 
     def mark_as_read(self, notification_id: int) -> Optional[Notification]:
         return self.notification_repository.update(notification_id, {'read': True})
+
+    async def create_change_document_state_notification_async(
+        self,
+        user_id: int,
+        document_name: str,
+        new_state: str
+    ) -> Notification:
+        notif = self._build_change_document_state_notification(user_id, document_name, new_state)
+        bridged = self.notification_repository.bridge_enabled()
+        notif = await self.notification_repository.save(notif, notify=bridged)
+        if not bridged:
+            notification_hub.publish(notif.user_id, notification_hub.payload(notif))
+        return notif
+
+    async def get_notifications_async(self, user_id: int) -> List[Notification]:
+        return await self.notification_repository.find_by_user_id(user_id)
+
+    async def get_notifications_page_async(
+        self,
+        user_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        unread_only: bool = False
+    ) -> Tuple[List[Notification], Optional[str]]:
+        return await self.notification_repository.find_page_by_user_id(
+            user_id, limit=limit, cursor=cursor, unread_only=unread_only
+        )
+
+    async def count_unread_async(self, user_id: int) -> int:
+        return await self.notification_repository.count_unread(user_id)
+
+    async def mark_as_read_async(self, notification_id: int) -> Optional[Notification]:
+        return await self.notification_repository.update(notification_id, {'read': True})
+
+    async def mark_all_as_read_async(self, user_id: int) -> int:
+        return await self.notification_repository.mark_read(user_id)
+
+    async def mark_many_as_read_async(self, user_id: int, notification_ids: List[int]) -> int:
+        return await self.notification_repository.mark_read(user_id, notification_ids)
+
+    async def delete_read_before_async(self, user_id: int, cutoff: datetime) -> int:
+        return await self.notification_repository.delete_read_before(user_id, cutoff)
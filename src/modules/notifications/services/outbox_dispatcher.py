@@ -0,0 +1,67 @@
+import os
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from modules.notifications.models.notification import Notification
+from modules.notifications.models.notification_outbox import NotificationOutbox
+from modules.notifications.services.notification_hub import notification_hub
+
+OUTBOX_BATCH_SIZE = int(os.getenv("NOTIFICATION_OUTBOX_BATCH_SIZE", "500"))
+
+class OutboxDispatcher:
+
+    @staticmethod
+    def dispatch(session: Session, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+        """
+        Materializa las filas del outbox en `notifications` por lotes: un
+        INSERT multi-fila y un DELETE por lote, en la misma transacción.
+        Las notificaciones creadas se publican en el hub de tiempo real.
+        Devuelve la cantidad de notificaciones creadas.
+        """
+        total = 0
+        while True:
+            rows = session.execute(
+                select(NotificationOutbox)
+                .order_by(NotificationOutbox.id)
+                .limit(batch_size)
+                # Varios workers pueden despachar sin procesar la misma fila
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not rows:
+                break
+
+            now = datetime.utcnow()
+            created = session.scalars(
+                insert(Notification).returning(Notification),
+                [
+                    {
+                        "user_id": row.user_id,
+                        "title": row.title,
+                        "message": row.message,
+                        "created_at": row.created_at,
+                        "updated_at": now,
+                        "read": False,
+                    }
+                    for row in rows
+                ]
+            ).all()
+            session.execute(
+                delete(NotificationOutbox).where(NotificationOutbox.id.in_([row.id for row in rows]))
+            )
+
+            messages = [(n.user_id, notification_hub.payload(n)) for n in created]
+            bridged = notification_hub.bridge_enabled(session.get_bind())
+            if bridged:
+                # NOTIFY se entrega al confirmar, junto con las notificaciones
+                for user_id, payload in messages:
+                    session.execute(notification_hub.notify_statement(user_id, payload))
+            session.commit()
+            if not bridged:
+                for user_id, payload in messages:
+                    notification_hub.publish(user_id, payload)
+            total += len(rows)
+            if len(rows) < batch_size:
+                break
+        return total
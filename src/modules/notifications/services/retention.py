@@ -0,0 +1,54 @@
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, true
+from sqlalchemy.orm import Session
+from modules.notifications.models.notification import Notification
+
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+NOTIFICATION_RETENTION_BATCH_SIZE = int(os.getenv("NOTIFICATION_RETENTION_BATCH_SIZE", "1000"))
+
+@dataclass
+class RetentionReport:
+    deleted: int = 0
+    batches: int = 0
+    duration_seconds: float = 0.0
+
+def purge_read_notifications(
+    session: Session,
+    retention_days: int = NOTIFICATION_RETENTION_DAYS,
+    batch_size: int = NOTIFICATION_RETENTION_BATCH_SIZE
+) -> RetentionReport:
+    """
+    Elimina las notificaciones leídas con más de retention_days de antigüedad.
+    Borra por lotes de batch_size filas con un commit por lote, para no
+    mantener locks largos; las no leídas se conservan siempre.
+    """
+    started = time.perf_counter()
+    cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
+    report = RetentionReport()
+
+    while True:
+        ids = session.execute(
+            select(Notification.id)
+            # Igual que el predicado de ix_notifications_read_created_at (read = true)
+            .where(Notification.read == true(), Notification.created_at < cutoff_date)
+            .order_by(Notification.created_at)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        result = session.execute(
+            delete(Notification)
+            .where(Notification.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        report.deleted += result.rowcount
+        report.batches += 1
+        if len(ids) < batch_size:
+            break
+
+    report.duration_seconds = round(time.perf_counter() - started, 3)
+    return report
@@ -0,0 +1,42 @@
+"""
+Paginación por cursor (keyset) compartida por los listados.
+
+Los listados se ordenan por (fecha, id) descendente y el cursor, opaco para
+el cliente, codifica la fecha y el id del último elemento de la página. La
+respuesta lo devuelve en el campo next_cursor (None en la última página).
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+class InvalidCursorError(ValueError):
+    pass
+
+def clamp_page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def encode_cursor(date: datetime, id: int) -> str:
+    raw = f"{date.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_str, id_str = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date_str), int(id_str)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursorError("Cursor inválido")
+
+def after_cursor(date_column, id_column, cursor: str):
+    """Condición WHERE para las filas posteriores al cursor en orden (fecha, id) descendente"""
+    last_date, last_id = decode_cursor(cursor)
+    return or_(
+        date_column < last_date,
+        and_(date_column == last_date, id_column < last_id)
+    )
@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+
+from database import Base
+
+@pytest.fixture
+def run_async_session():
+    """
+    Ejecuta escenario(session) con una AsyncSession sobre un SQLite en memoria
+    (aiosqlite) con el esquema creado, y devuelve su resultado.
+    """
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    async def run(escenario):
+        async_engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        try:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            AsyncTestingSession = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+            async with AsyncTestingSession() as session:
+                return await escenario(session)
+        finally:
+            await async_engine.dispose()
+
+    return lambda escenario: asyncio.run(run(escenario))
@@ -0,0 +1,212 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from datetime import datetime
+
+from modules.documents.models.user import User, UserRole
+# Modelos relacionados con User: se importan para poder configurar los mapeos
+from modules.documents.models.signature import Signature  # noqa: F401
+from modules.notifications.models.notification import Notification  # noqa: F401
+from modules.auth.services.auth_service import AuthService
+from modules.auth.services.user_cache import CachedUser, UserCache, user_cache
+from database import Base
+
+engine = create_engine("sqlite:///:memory:")
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    Base.metadata.create_all(bind=engine)
+    user_cache.clear()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def isolated_token_versions():
+    """Restaura la tabla de versiones global (singleton) al terminar el test"""
+    from modules.auth.services.token_versions import token_versions
+
+    state = {name: value.copy() if isinstance(value, dict) else value for name, value in vars(token_versions).items()}
+    yield token_versions
+    vars(token_versions).clear()
+    vars(token_versions).update(state)
+
+def create_user(session, id=1, email="cache@mail.com", role=UserRole.EMPLOYEE):
+    user = User(id=id, name="Cache", email=email, password_hash="x", role=role, is_active=True, created_at=datetime.utcnow())
+    session.add(user)
+    session.commit()
+    return user
+
+def test_usuario_autenticado_se_cachea_e_invalida():
+    session = TestingSessionLocal()
+    user = create_user(session)
+    token = AuthService.create_access_token({"sub": user.email})
+    before = user_cache.stats()
+
+    first = AuthService.get_current_user(session, token)
+    second = AuthService.get_current_user(session, token)
+    assert isinstance(first, CachedUser) and first == second
+    stats = user_cache.stats()
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 1
+
+    # Cambio de rol + invalidación explícita: la siguiente request lo ve
+    user.role = UserRole.SUPERVISOR
+    session.commit()
+    user_cache.invalidate(user.email)
+    assert AuthService.get_current_user(session, token).role == UserRole.SUPERVISOR
+
+def test_cache_lru_y_ttl():
+    cache = UserCache(ttl_seconds=60, max_entries=2)
+    u = CachedUser(1, "a", "a@mail.com", UserRole.EMPLOYEE, True, None)
+    cache.set("a", u)
+    cache.set("b", u)
+    cache.get("a")
+    cache.set("c", u)  # desaloja "b", el menos usado
+    assert cache.get("b") is None
+    assert cache.get("a") is u
+
+    expired = UserCache(ttl_seconds=0, max_entries=2)
+    expired.set("a", u)
+    assert expired.get("a") is None
+
+def test_token_sin_estado_y_revocacion(monkeypatch, run_async_session, isolated_token_versions):
+    from modules.auth.services import auth_service
+    from modules.auth.services.auth_service import TokenPrincipal
+
+    token_versions = isolated_token_versions
+
+    monkeypatch.setattr(auth_service, "STATELESS_TOKENS", True)
+
+    async def escenario(db):
+        user = User(id=7, name="S", email="s@mail.com", password_hash="x", role=UserRole.SUPERVISOR,
+                    is_active=True, token_version=0)
+        db.add(user)
+        await db.commit()
+
+        token = AuthService.create_access_token(AuthService.build_token_claims(user))
+        await token_versions.refresh_async(db)
+        principal = await AuthService.get_token_principal_async(db, token)
+        assert principal == TokenPrincipal(id=7, email="s@mail.com", role=UserRole.SUPERVISOR)
+
+        # Cambio de rol: se sube la versión y el token anterior deja de valer
+        user.role = UserRole.EMPLOYEE
+        AuthService.revoke_tokens(user)
+        await db.commit()
+        token_versions.update(user.id, user.token_version, user.is_active)
+        assert await AuthService.get_token_principal_async(db, token) is None
+
+    run_async_session(escenario)
+
+def test_token_sin_estado_revocado_se_rechaza_sin_tabla_de_versiones(monkeypatch, run_async_session):
+    from modules.auth.services import auth_service
+    from modules.auth.services.token_versions import token_versions
+
+    monkeypatch.setattr(auth_service, "STATELESS_TOKENS", True)
+    # Arranque o recarga fallida: el usuario no está en la tabla en memoria
+    monkeypatch.setattr(token_versions, "check", lambda user_id, token_version: None)
+    monkeypatch.setattr(token_versions, "refresh_in_background", lambda session_factory: None)
+
+    async def escenario(db):
+        user = User(id=8, name="R", email="r@mail.com", password_hash="x", role=UserRole.SUPERVISOR,
+                    is_active=True, token_version=0)
+        db.add(user)
+        await db.commit()
+        token = AuthService.create_access_token(AuthService.build_token_claims(user))
+        assert (await AuthService.get_token_principal_async(db, token)).id == 8
+
+        AuthService.revoke_tokens(user)
+        await db.commit()
+        user_cache.invalidate(user.email)
+        assert await AuthService.get_token_principal_async(db, token) is None
+
+        fresh = AuthService.create_access_token(AuthService.build_token_claims(user))
+        user.is_active = False
+        await db.commit()
+        user_cache.invalidate(user.email)
+        assert await AuthService.get_token_principal_async(db, fresh) is None
+
+    run_async_session(escenario)
+
+def test_login_rehashea_si_cambio_el_costo_de_bcrypt():
+    from passlib.hash import bcrypt
+    session = TestingSessionLocal()
+    user = create_user(session, email="rehash@mail.com")
+    user.password_hash = bcrypt.using(rounds=4).hash("secreta")
+    session.commit()
+
+    assert AuthService.authenticate_user(session, "rehash@mail.com", "otra") is None
+    assert AuthService.authenticate_user(session, "rehash@mail.com", "secreta") is not None
+    session.refresh(user)
+    assert not user.password_hash.startswith("$2b$04$")
+    assert AuthService.verify_password("secreta", user.password_hash)
+
+def test_password_hasher_rechaza_con_cola_llena():
+    import threading
+    from modules.auth.services.password_hasher import PasswordHasher, PasswordHasherBusy
+
+    hasher = PasswordHasher(workers=1, max_queue=0, queue_timeout=5)
+    release = threading.Event()
+    blocked = hasher._submit(release.wait)
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash("x")
+    release.set()
+    blocked.result()
+    assert hasher.stats()["rejected"] == 1
+
+def test_password_hasher_descarta_tareas_vencidas_en_cola():
+    import threading
+    import time
+    from modules.auth.services.password_hasher import PasswordHasher, PasswordHasherBusy
+
+    hasher = PasswordHasher(workers=1, max_queue=1, queue_timeout=0.05)
+    release = threading.Event()
+    blocked = hasher._submit(release.wait)
+    queued = hasher._submit(lambda: "no debería ejecutarse")
+    time.sleep(0.1)
+    release.set()
+    blocked.result()
+    with pytest.raises(PasswordHasherBusy):
+        queued.result()
+    assert hasher.stats()["expired"] == 1
+
+def test_versiones_de_token_se_recargan_incrementalmente_en_una_sola_tarea(run_async_session):
+    from sqlalchemy import update
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+    from modules.auth.services.token_versions import TokenVersionTable
+
+    table = TokenVersionTable(refresh_seconds=0, full_reload_seconds=3600, overlap_seconds=0)
+
+    async def escenario(db):
+        a = User(id=1, name="A", email="a@mail.com", password_hash="x", role=UserRole.EMPLOYEE, is_active=True)
+        b = User(id=2, name="B", email="b@mail.com", password_hash="x", role=UserRole.EMPLOYEE, is_active=True)
+        db.add_all([a, b])
+        await db.commit()
+        await table.refresh_async(db)
+        assert table.check(1, 0) and table.check(2, 0)
+
+        # Cambio vía ORM (actualiza updated_at) y otro "invisible" sin marca
+        AuthService.revoke_tokens(a)
+        await db.commit()
+        await db.execute(update(User).where(User.id == 2).values(token_version=5, updated_at=None))
+        await db.commit()
+
+        loads = []
+
+        class CountingSession(AsyncSession):
+            async def execute(self, *args, **kwargs):
+                loads.append(1)
+                return await super().execute(*args, **kwargs)
+
+        factory = async_sessionmaker(bind=db.bind, class_=CountingSession, expire_on_commit=False)
+        # Varias requests concurrentes con la copia vencida: una sola recarga
+        table.refresh_in_background(factory)
+        table.refresh_in_background(factory)
+        await table._task
+        assert len(loads) == 1
+
+        assert table.check(1, 0) is False and table.check(1, 1) is True
+        # La recarga incremental solo trajo al usuario modificado
+        assert table.check(2, 0) is True
+
+    run_async_session(escenario)
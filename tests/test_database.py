@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import event, text
+
+import database
+from database import build_async_engine, build_engine, libpq_dsn
+
+@pytest.mark.parametrize("url", [
+    "postgresql://u:p@db:5432/app",
+    "postgres://u:p@db:5432/app",
+    "postgresql+psycopg2://u:p@db:5432/app",
+])
+def test_urls_postgres_usan_asyncpg_en_el_motor_asincrono(url):
+    async_engine = build_async_engine(url)
+    assert async_engine.url.drivername == "postgresql+asyncpg"
+    assert async_engine.url.host == "db" and async_engine.url.database == "app"
+    assert async_engine.url.password == "p"
+
+    sync_engine = build_engine(url)
+    assert sync_engine.url.get_backend_name() == "postgresql"
+    assert libpq_dsn(url) == "postgresql://u:p@db:5432/app"
+
+def test_motor_postgres_configura_pool_y_timeouts(monkeypatch):
+    monkeypatch.setattr(database, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 5000)
+    sync_engine = build_engine("postgresql://u:p@db/app")
+    assert sync_engine.pool.size() == 7
+
+    async_engine = build_async_engine("postgresql://u:p@db/app")
+    assert async_engine.sync_engine.pool.size() == 7
+
+def test_sqlite_no_recibe_opciones_de_pool():
+    sync_engine = build_engine("sqlite:///:memory:")
+    with sync_engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+
+def test_pgbouncer_aplica_timeouts_con_set_local(monkeypatch):
+    monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 5000)
+    monkeypatch.setattr(database, "DB_LOCK_TIMEOUT_MS", 1000)
+    sync_engine = build_engine("sqlite:///:memory:")
+    database._set_local_timeouts(sync_engine)
+
+    executed = []
+
+    @event.listens_for(sync_engine, "before_cursor_execute", retval=True)
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+        # SQLite no entiende SET LOCAL: se registra y se reemplaza
+        if statement.startswith("SET LOCAL"):
+            return "SELECT 1", ()
+        return statement, parameters
+
+    with sync_engine.begin() as conn:
+        conn.execute(text("SELECT 2"))
+
+    assert executed[:2] == ["SET LOCAL statement_timeout = 5000", "SET LOCAL lock_timeout = 1000"]
+    assert executed[-1] == "SELECT 2"
+
+def _engines_for(env: dict) -> str:
+    code = (
+        "import database as d; "
+        "print(d.engine.url.database, d.read_engine.url.database, "
+        "d.async_engine.url.database, d.async_read_engine.url.database)"
+    )
+    src = os.path.join(os.path.dirname(__file__), "..", "src")
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=src, env={**os.environ, **env},
+        capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+def test_lecturas_van_a_la_replica_si_esta_configurada(tmp_path):
+    primary = f"sqlite:///{tmp_path / 'primary.db'}"
+    replica = f"sqlite:///{tmp_path / 'replica.db'}"
+    env = {"DATABASE_URL": primary, "DATABASE_REPLICA_URL": replica}
+    names = _engines_for(env).split()
+    assert [os.path.basename(n) for n in names] == ["primary.db", "replica.db", "primary.db", "replica.db"]
+
+def test_sin_replica_las_lecturas_usan_el_primario(tmp_path):
+    env = {"DATABASE_URL": f"sqlite:///{tmp_path / 'primary.db'}", "DATABASE_REPLICA_URL": ""}
+    names = _engines_for(env).split()
+    assert {os.path.basename(n) for n in names} == {"primary.db"}
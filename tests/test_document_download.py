@@ -0,0 +1,115 @@
+import io
+import os
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from reportlab.pdfgen import canvas
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from modules.auth.controllers.auth_controller import get_token_principal
+from modules.auth.services.auth_service import TokenPrincipal
+from modules.documents.controllers.signature_controller import _etag_matches, get_db, router
+from modules.documents.models.signature import Signature
+from modules.documents.models.user import User, UserRole
+from modules.documents.services.document_service import DocumentService
+from modules.notifications.models.notification import Notification  # noqa: F401 (mappers)
+
+MAX_FILE_SIZE = 10 * 1024 * 1024
+
+@pytest.fixture
+def signed_document(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'download.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autoflush=False, bind=engine)
+
+    session = SessionFactory()
+    session.add(User(id=1, name="Ana", email="ana@mail.com", password_hash="x",
+                     role=UserRole.SUPERVISOR, is_active=True, created_at=datetime.utcnow()))
+    session.commit()
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    c.drawString(50, 750, "PDF para descarga")
+    c.save()
+    doc = DocumentService.upload_document(
+        session, 1, buf.getvalue(), "descarga.pdf", "application/pdf", str(tmp_path), MAX_FILE_SIZE
+    )
+    sig = DocumentService.add_signature(session, doc.id, 1)
+    document = {"id": doc.id, "sha256": sig.sha256_hash, "path": doc.file_path}
+    session.close()
+
+    def override_db():
+        db = SessionFactory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(router, prefix="/documents")
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_token_principal] = lambda: TokenPrincipal(1, "ana@mail.com", UserRole.SUPERVISOR)
+    with TestClient(app) as client:
+        yield client, document
+    engine.dispose()
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"otro", W/"abc"', True),
+    ('"otro",  "tambien-otro"', False),
+    ("*", True),
+    ('"ABC"', False),
+])
+def test_etag_matches(header, expected):
+    assert _etag_matches(header, '"abc"') is expected
+
+def test_descarga_devuelve_etag_y_hash(signed_document):
+    client, document = signed_document
+    resp = client.get(f"/documents/{document['id']}/download")
+    assert resp.status_code == 200
+    assert resp.headers["etag"] == f'"{document["sha256"]}"'
+    assert resp.headers["x-document-hash"] == document["sha256"]
+    with open(document["path"], "rb") as f:
+        assert resp.content == f.read()
+
+@pytest.mark.parametrize("if_none_match", [
+    '"{sha}"',
+    'W/"{sha}"',
+    '"otro", "{sha}"',
+    "*",
+])
+def test_descarga_con_if_none_match_devuelve_304(signed_document, if_none_match):
+    client, document = signed_document
+    resp = client.get(
+        f"/documents/{document['id']}/download",
+        headers={"If-None-Match": if_none_match.format(sha=document["sha256"])},
+    )
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == f'"{document["sha256"]}"'
+
+def test_descarga_con_etag_distinto_devuelve_el_archivo(signed_document):
+    client, document = signed_document
+    resp = client.get(f"/documents/{document['id']}/download", headers={"If-None-Match": '"otro"'})
+    assert resp.status_code == 200
+    assert resp.content.startswith(b"%PDF")
+
+def test_descarga_parcial_con_range_devuelve_206(signed_document):
+    client, document = signed_document
+    size = os.path.getsize(document["path"])
+    with open(document["path"], "rb") as f:
+        data = f.read()
+
+    resp = client.get(f"/documents/{document['id']}/download", headers={"Range": "bytes=0-99"})
+    assert resp.status_code == 206
+    assert resp.headers["content-range"] == f"bytes 0-99/{size}"
+    assert resp.content == data[:100]
+
+    resp = client.get(f"/documents/{document['id']}/download", headers={"Range": "bytes=-10"})
+    assert resp.status_code == 206
+    assert resp.content == data[-10:]
@@ -3,6 +3,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, timedelta
 import os
+import sys
 import io
 import tempfile
 import hashlib
@@ -15,13 +16,18 @@ from modules.documents.services.document_state_service import DocumentStateServi
 from database import Base
 from reportlab.pdfgen import canvas
 
-UPLOAD_DIR = "uploads"
+UPLOAD_DIR = None  # lo fija use_tmp_upload_dir para cada test
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
 engine = create_engine("sqlite:///:memory:")
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base.metadata.create_all(bind=engine)
 
+@pytest.fixture(autouse=True)
+def use_tmp_upload_dir(tmp_path, monkeypatch):
+    # Los PDFs de prueba no deben quedar en el uploads/ del repositorio
+    monkeypatch.setattr(sys.modules[__name__], "UPLOAD_DIR", str(tmp_path / "uploads"))
+
 @pytest.fixture(autouse=True)
 def clean_db():
     Base.metadata.drop_all(bind=engine)
@@ -231,4 +237,584 @@ def test_PF_FR09_01_09_02_notificaciones_internas():
     assert "firmado" in alerta_ui.lower()
     correo_enviado = False
     assert correo_enviado is False
-    os.remove(doc.file_path)
\ No newline at end of file
+    os.remove(doc.file_path)
+
+class _FakeUpload:
+    def __init__(self, data: bytes):
+        self._buf = io.BytesIO(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._buf.read(size)
+
+def test_stage_upload_calcula_hash_por_bloques():
+    import asyncio
+    data = create_dummy_pdf_bytes()
+    staged = asyncio.run(DocumentService.stage_upload(_FakeUpload(data), UPLOAD_DIR, MAX_FILE_SIZE, chunk_size=64))
+    assert staged.size == len(data)
+    assert staged.sha256 == hashlib.sha256(data).hexdigest()
+    with open(staged.temp_path, "rb") as f:
+        assert f.read() == data
+    staged.discard()
+
+def test_stage_upload_rechaza_archivo_demasiado_grande():
+    import asyncio
+    from fastapi import HTTPException
+    before = set(os.listdir(UPLOAD_DIR)) if os.path.isdir(UPLOAD_DIR) else set()
+    with pytest.raises(HTTPException):
+        asyncio.run(DocumentService.stage_upload(_FakeUpload(b"x" * 1000), UPLOAD_DIR, 100, chunk_size=64))
+    assert set(os.listdir(UPLOAD_DIR)) == before
+
+def _multipart_request(body: bytes, boundary: str, chunk_size: int = 64, content_length=None):
+    from starlette.requests import Request
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    received = []
+
+    async def receive():
+        received.append(True)
+        chunk = chunks.pop(0) if chunks else b""
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    headers = [(b"content-type", f"multipart/form-data; boundary={boundary}".encode()),
+               (b"content-length", str(content_length or len(body)).encode())]
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive), received
+
+def _multipart_body(boundary: str, data: bytes, filename="subida.pdf") -> bytes:
+    return (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"nota\"\r\n\r\nhola\r\n"
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: application/pdf\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+
+def test_subida_multipart_se_escribe_directo_al_temporal():
+    import asyncio
+    from modules.documents.services.multipart_upload import stage_multipart_upload
+    data = create_dummy_pdf_bytes()
+    request, _ = _multipart_request(_multipart_body("limite", data), "limite")
+    staged, file = asyncio.run(stage_multipart_upload(request, "file", UPLOAD_DIR, MAX_FILE_SIZE, MAX_FILE_SIZE + 1024))
+    assert (file.filename, file.content_type) == ("subida.pdf", "application/pdf")
+    assert staged.size == len(data) and staged.sha256 == hashlib.sha256(data).hexdigest()
+    with open(staged.temp_path, "rb") as f:
+        assert f.read() == data
+    staged.discard()
+
+def test_subida_multipart_rechaza_antes_de_leer_el_cuerpo():
+    import asyncio
+    from fastapi import HTTPException
+    from modules.documents.services.multipart_upload import stage_multipart_upload
+
+    # Content-Length excesivo: no se lee el cuerpo
+    request, received = _multipart_request(b"", "limite", content_length=MAX_FILE_SIZE * 2)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(stage_multipart_upload(request, "file", UPLOAD_DIR, MAX_FILE_SIZE, MAX_FILE_SIZE + 1024))
+    assert exc.value.status_code == 400 and received == []
+
+    # Extensión inválida: se rechaza con las cabeceras de la parte, sin recibir el resto
+    body = _multipart_body("limite", b"x" * 10000, filename="informe.docx")
+    request, received = _multipart_request(body, "limite", chunk_size=256)
+    with pytest.raises(HTTPException):
+        asyncio.run(stage_multipart_upload(request, "file", UPLOAD_DIR, MAX_FILE_SIZE, MAX_FILE_SIZE + 1024))
+    assert len(received) < len(body) // 256
+    assert [name for name in os.listdir(UPLOAD_DIR) if name.endswith(".part")] == []
+
+def test_pdf_duplicado_comparte_blob():
+    from modules.documents.models.document_blob import DocumentBlob
+    from modules.documents.services.cleanup import delete_rejected_documents
+    session = TestingSessionLocal()
+    user = create_dummy_user(session)
+    data = create_dummy_pdf_bytes()
+    doc1 = DocumentService.upload_document(session, user.id, data, "dup.pdf", "application/pdf", UPLOAD_DIR, MAX_FILE_SIZE)
+    doc2 = DocumentService.upload_document(session, user.id, data, "dup.pdf", "application/pdf", UPLOAD_DIR, MAX_FILE_SIZE)
+    assert doc1.name != doc2.name
+    assert doc1.file_path == doc2.file_path
+    blob = session.get(DocumentBlob, hashlib.sha256(data).hexdigest())
+    assert blob.ref_count == 2
+
+    # Al eliminar uno de los rechazados el archivo sigue existiendo para el otro
+    doc1.status = DocumentStatus.REJECTED
+    doc1.rejection_date = datetime.utcnow() - timedelta(days=31)
+    session.commit()
+    delete_rejected_documents(session)
+    session.refresh(blob)
+    assert blob.ref_count == 1
+    assert os.path.exists(doc2.file_path)
+
+    doc2.status = DocumentStatus.REJECTED
+    doc2.rejection_date = datetime.utcnow() - timedelta(days=31)
+    session.commit()
+    path = doc2.file_path
+    report = delete_rejected_documents(session)
+    assert session.get(DocumentBlob, blob.sha256) is None
+    assert not os.path.exists(path)
+    assert report.documents == 1 and report.files == 1
+    assert report.bytes_freed == len(data) and report.errors == 0
+
+def test_scrub_elimina_blobs_sin_registro(tmp_path):
+    from modules.documents.services.blob_storage import BlobStorage
+    session = TestingSessionLocal()
+    user = create_dummy_user(session)
+    upload_dir = str(tmp_path)
+    doc = DocumentService.upload_document(
+        session, user.id, create_dummy_pdf_bytes(), "vivo.pdf", "application/pdf", upload_dir, MAX_FILE_SIZE
+    )
+    # Simula el archivo que dejó un upload cuyo commit hizo rollback
+    orphan = BlobStorage.blob_path(upload_dir, "ab" * 32)
+    os.makedirs(os.path.dirname(orphan), exist_ok=True)
+    open(orphan, "wb").write(b"%PDF-huerfano")
+    stale_part = os.path.join(upload_dir, ".upload-abandonado.part")
+    open(stale_part, "wb").write(b"x")
+    old = datetime.utcnow().timestamp() - 7200
+    for path in (orphan, stale_part, doc.file_path):
+        os.utime(path, (old, old))
+
+    # Archivos recientes se respetan: pueden ser de una transacción en curso
+    assert BlobStorage.scrub_orphans(session, upload_dir, min_age_seconds=10 * 3600) == 0
+    assert BlobStorage.scrub_orphans(session, upload_dir, min_age_seconds=3600) == 2
+    assert not os.path.exists(orphan) and not os.path.exists(stale_part)
+    assert os.path.exists(doc.file_path)
+
+def test_limpieza_de_rechazados_por_lotes():
+    from modules.documents.models.user import UserRole
+    from modules.documents.services.cleanup import delete_rejected_documents
+    session = TestingSessionLocal()
+    user = create_dummy_user(session)
+    create_dummy_user(session, id=2, role=UserRole.SUPERVISOR)
+    old = datetime.utcnow() - timedelta(days=31)
+    docs = [upload_pdf_obj(session, user.id, f"lote{i}.pdf") for i in range(5)]
+    for doc in docs[:4]:
+        doc.status = DocumentStatus.REJECTED
+        doc.rejection_date = old
+    session.add(Signature(document_id=docs[0].id, user_id=2, ts=datetime.utcnow(), order=1, sha256_hash="x"))
+    session.commit()
+
+    report = delete_rejected_documents(session, batch_size=3)
+    assert report.documents == 4 and report.batches == 2 and report.errors == 0
+    assert [d.id for d in session.query(Document).all()] == [docs[4].id]
+    assert session.query(Signature).count() == 0
+
+def test_hash_persistido_se_reutiliza_hasta_que_cambia_el_archivo(monkeypatch):
+    from modules.documents.services.integrity import DocumentIntegrity
+    session = TestingSessionLocal()
+    supervisor = create_dummy_user(session, id=701, role="SUPERVISOR")
+    doc = upload_pdf_obj(session, supervisor.id, "persistido.pdf")
+    with open(doc.file_path, "rb") as f:
+        assert doc.sha256_hash == hashlib.sha256(f.read()).hexdigest()
+
+    calls = []
+    original = DocumentIntegrity.hash_file
+    monkeypatch.setattr(DocumentIntegrity, "hash_file", staticmethod(lambda p: calls.append(p) or original(p)))
+
+    sig = DocumentService.add_signature(session, doc.id, supervisor.id)
+    assert sig.sha256_hash == doc.sha256_hash
+    assert calls == []
+
+    # Un cambio de tamaño/mtime lo detecta el scrub y obliga a recalcular
+    with open(doc.file_path, "ab") as f:
+        f.write(b"MODIFICACION")
+    assert DocumentIntegrity.scrub(session) == 1
+    assert DocumentIntegrity.current_digest(doc) != sig.sha256_hash
+    assert len(calls) == 1
+    os.remove(doc.file_path)
+
+def test_archivos_obsoletos_se_hashean_antes_de_tomar_el_lock(monkeypatch):
+    from sqlalchemy import event
+    from modules.documents.services.integrity import DocumentIntegrity
+    session = TestingSessionLocal()
+    supervisor = create_dummy_user(session, id=702, role="SUPERVISOR")
+    docs = [upload_pdf_obj(session, supervisor.id, f"obsoleto{i}.pdf") for i in range(3)]
+    for doc in docs:
+        doc.needs_rehash = True
+    session.commit()
+    doc_ids = [doc.id for doc in docs]
+
+    events = []
+    original = DocumentIntegrity.hash_file
+    monkeypatch.setattr(DocumentIntegrity, "hash_file", staticmethod(lambda p: events.append("hash") or original(p)))
+
+    @event.listens_for(session, "do_orm_execute")
+    def track_locks(state):
+        if state.is_select and state.statement._for_update_arg is not None:
+            events.append("lock")
+
+    sig = DocumentService.add_signature(session, doc_ids[0], supervisor.id)
+    assert events == ["hash", "lock"]
+    assert sig.sha256_hash == session.get(Document, doc_ids[0]).sha256_hash
+
+    events.clear()
+    results = DocumentService.sign_documents(session, doc_ids[1:], supervisor.id)
+    assert all(r.signed for r in results)
+    assert events == ["hash", "hash", "lock"]
+    for doc_id in doc_ids:
+        os.remove(session.get(Document, doc_id).file_path)
+
+def test_prehash_no_descarta_la_transaccion_del_llamador(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'prehash.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autoflush=False, bind=engine)()
+    supervisor = create_dummy_user(session, id=703, role="SUPERVISOR")
+    doc = upload_pdf_obj(session, supervisor.id, "pendiente.pdf")
+    doc.needs_rehash = True
+    session.commit()
+
+    # Trabajo del llamador ya enviado a la BD pero sin commit
+    session.add(User(id=704, name="Pendiente", email="pendiente@mail.com",
+                     password_hash="x", role="EMPLOYEE", is_active=True))
+    session.flush()
+
+    sig = DocumentService.add_signature(session, doc.id, supervisor.id)
+    assert sig.sha256_hash == doc.sha256_hash
+    with sessionmaker(bind=engine)() as other:
+        assert other.get(User, 704) is not None
+    session.close()
+    engine.dispose()
+
+def test_validacion_rapida_detecta_pdf_truncado(tmp_path):
+    from modules.documents.services.pdf_validation import PdfValidationError, quick_validate_pdf, deep_validate_pdf
+    data = create_dummy_pdf_bytes()
+    ok = tmp_path / "ok.pdf"
+    ok.write_bytes(data)
+    quick_validate_pdf(str(ok))
+    assert deep_validate_pdf(str(ok), max_pages=10, cpu_seconds=5) == 1
+
+    truncado = tmp_path / "truncado.pdf"
+    truncado.write_bytes(data[: len(data) // 2])
+    with pytest.raises(PdfValidationError):
+        quick_validate_pdf(str(truncado))
+
+    with pytest.raises(PdfValidationError):
+        deep_validate_pdf(str(ok), max_pages=0, cpu_seconds=5)
+
+def test_validacion_profunda_no_encolada_libera_el_permiso(monkeypatch):
+    from modules.documents.services import pdf_validation
+
+    def pool_cerrado(*args, **kwargs):
+        raise RuntimeError("cannot schedule new futures after shutdown")
+
+    monkeypatch.setattr(pdf_validation.cpu_pool, "submit", pool_cerrado)
+    free = pdf_validation._pending._value
+    assert pdf_validation.schedule_deep_validation(1, "x.pdf", TestingSessionLocal) is None
+    assert pdf_validation._pending._value == free
+
+def test_resultado_de_validacion_profunda_se_guarda_en_el_pool_de_io(tmp_path, monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from execution import _TrackedPool
+    from modules.documents.services import pdf_validation
+
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'validacion.db'}")
+    Base.metadata.create_all(bind=file_engine)
+    Sessions = sessionmaker(bind=file_engine)
+    session = Sessions()
+    create_dummy_user(session)
+    session.add(Document(id=1, name="a.pdf", file_path="a.pdf", file_size=1, user_id=1))
+    session.commit()
+
+    def invalido(*args):
+        raise pdf_validation.PdfValidationError("roto")
+
+    cpu = _TrackedPool("cpu-test", lambda n: ThreadPoolExecutor(n, thread_name_prefix="cpu-test"), 1)
+    io = _TrackedPool("io-test", lambda n: ThreadPoolExecutor(n, thread_name_prefix="io-test"), 1)
+    monkeypatch.setattr(pdf_validation, "cpu_pool", cpu)
+    monkeypatch.setattr(pdf_validation, "io_pool", io)
+    monkeypatch.setattr(pdf_validation, "deep_validate_pdf", invalido)
+    threads = []
+    original = pdf_validation._store_result
+    monkeypatch.setattr(
+        pdf_validation, "_store_result",
+        lambda *args: threads.append(threading.current_thread().name) or original(*args)
+    )
+
+    free = pdf_validation._pending._value
+    pdf_validation.schedule_deep_validation(1, "a.pdf", Sessions).exception()
+    # Sin cancel_futures: se espera el callback y la escritura encolada
+    cpu._executor.shutdown(wait=True)
+    io._executor.shutdown(wait=True)
+
+    assert threads and threads[0].startswith("io-test")
+    assert pdf_validation._pending._value == free
+    session.expire_all()
+    assert session.get(Document, 1).pdf_valid is False
+    session.close()
+    file_engine.dispose()
+
+def test_subida_pdf_truncado_rechazada():
+    from fastapi import HTTPException
+    session = TestingSessionLocal()
+    user = create_dummy_user(session)
+    data = create_dummy_pdf_bytes()
+    with pytest.raises(HTTPException):
+        DocumentService.upload_document(session, user.id, data[:-200], "roto.pdf", "application/pdf", UPLOAD_DIR, MAX_FILE_SIZE)
+
+def test_servicios_async_listan_y_rechazan(run_async_session):
+    from modules.documents.models.user import UserRole
+    from sqlalchemy import select
+    from modules.notifications.models.notification import Notification
+    from modules.notifications.models.notification_outbox import NotificationOutbox
+
+    async def escenario(session):
+        empleado = User(id=1, name="Emp", email="e@mail.com", password_hash="x", role=UserRole.EMPLOYEE)
+        supervisor = User(id=2, name="Sup", email="s@mail.com", password_hash="x", role=UserRole.SUPERVISOR)
+        session.add_all([empleado, supervisor])
+        session.add(Document(id=10, name="a.pdf", file_path="a.pdf", file_size=1, user_id=1))
+        await session.commit()
+
+        docs, next_cursor = await DocumentService.get_documents_by_user_async(session, 1)
+        assert [d.id for d in docs] == [10]
+        assert next_cursor is None
+
+        doc = await DocumentService.reject_document_async(session, 10, 2)
+        assert doc.status == DocumentStatus.REJECTED
+        # La notificación queda en el outbox, confirmada con el cambio de estado
+        outbox = (await session.execute(select(NotificationOutbox))).scalars().all()
+        assert [o.user_id for o in outbox] == [1]
+        assert await session.get(Notification, 1) is None
+
+    run_async_session(escenario)
+
+def test_nombres_unicos_con_contador():
+    session = TestingSessionLocal()
+    user = create_dummy_user(session)
+    first = upload_pdf_obj(session, user.id, "scan.pdf")
+    # Un nombre con sufijo subido directamente no debe chocar con el contador
+    literal = upload_pdf_obj(session, user.id, "scan_1.pdf")
+    names = [upload_pdf_obj(session, user.id, "scan.pdf").name for _ in range(2)]
+    assert first.name == "scan.pdf"
+    assert literal.name == "scan_1.pdf"
+    assert names == ["scan_2.pdf", "scan_3.pdf"]
+    assert len({d.name for d in session.query(Document).filter_by(user_id=user.id)}) == 4
+
+def test_sufijo_heredado_trata_comodines_del_nombre_como_literales():
+    session = TestingSessionLocal()
+    user = create_dummy_user(session)
+    # Documentos previos al contador: sin escapar, "_" y "%" del nombre
+    # harían contar aXb_7.pdf y 1009_5.pdf como sufijos de a_b.pdf y 100%.pdf
+    for name in ["a_b.pdf", "aXb_7.pdf", "100%.pdf", "1009_5.pdf"]:
+        session.add(Document(name=name, file_path="x", file_size=1, user_id=user.id))
+    session.commit()
+
+    assert upload_pdf_obj(session, user.id, "a_b.pdf").name == "a_b_1.pdf"
+    assert upload_pdf_obj(session, user.id, "100%.pdf").name == "100%_1.pdf"
+
+def test_listado_paginado_por_cursor_con_filtros(run_async_session):
+    from modules.documents.models.user import UserRole
+    from modules.documents.services.document_service import DocumentFilters
+
+    async def escenario(session):
+        session.add(User(id=1, name="Sup", email="s@mail.com", password_hash="x", role=UserRole.SUPERVISOR))
+        base = datetime(2025, 1, 1)
+        for i in range(1, 6):
+            session.add(Document(
+                id=i, name=f"{i}.pdf", file_path="x", file_size=1, user_id=1,
+                upload_date=base + timedelta(days=i // 2),  # fechas repetidas a propósito
+                status=DocumentStatus.REJECTED if i % 2 else DocumentStatus.IN_REVIEW
+            ))
+        await session.commit()
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = await DocumentService.get_documents_by_user_async(session, 1, limit=2, cursor=cursor)
+            seen += [d.id for d in page]
+            if cursor is None:
+                break
+        assert seen == [5, 4, 3, 2, 1]
+
+        rejected, _ = await DocumentService.get_documents_by_user_async(
+            session, 1, filters=DocumentFilters(status=DocumentStatus.REJECTED)
+        )
+        assert [d.id for d in rejected] == [5, 3, 1]
+
+        # Serialización tipada: sin password_hash
+        from modules.documents.schemas import DocumentListResponse, DocumentResponse
+        body = DocumentListResponse(
+            documents=[DocumentResponse.model_validate(d) for d in rejected]
+        ).model_dump_json().encode()
+        assert b'"status":"REJECTED"' in body
+        assert b"password_hash" not in body
+
+    run_async_session(escenario)
+
+def test_listado_acepta_fechas_con_zona_y_dias_completos(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from database import get_async_read_db
+    from modules.auth.controllers.auth_controller import get_token_principal
+    from modules.auth.services.auth_service import TokenPrincipal
+    from modules.documents.controllers.document_controller import router
+    from modules.documents.models.user import UserRole
+
+    db_path = tmp_path / "listado.db"
+    file_engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=file_engine)
+    with sessionmaker(bind=file_engine)() as session:
+        create_dummy_user(session, id=1, role="SUPERVISOR")
+        for i, upload_date in enumerate([datetime(2025, 1, 1, 10), datetime(2025, 1, 2, 23), datetime(2025, 1, 3, 1)], 1):
+            session.add(Document(id=i, name=f"{i}.pdf", file_path="x", file_size=1, user_id=1, upload_date=upload_date))
+        session.commit()
+    file_engine.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    AsyncTestingSession = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_db():
+        async with AsyncTestingSession() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router, prefix="/documents")
+    app.dependency_overrides[get_async_read_db] = override_db
+    app.dependency_overrides[get_token_principal] = lambda: TokenPrincipal(1, "test1@mail.com", UserRole.SUPERVISOR)
+
+    def ids(**params):
+        resp = client.get("/documents", params=params)
+        assert resp.status_code == 200
+        return [d["id"] for d in resp.json()["documents"]]
+
+    with TestClient(app) as client:
+        # 2025-01-02T02:00-03:00 = 05:00 UTC
+        assert ids(date_from="2025-01-01T12:00:00Z") == [3, 2]
+        assert ids(date_to="2025-01-02T02:00:00-03:00") == [1]
+        # Una fecha sin hora incluye todo el día
+        assert ids(date_to="2025-01-02") == [2, 1]
+
+def test_firma_por_lote_informa_resultado_por_documento():
+    from modules.documents.models.user import UserRole
+    from modules.notifications.models.notification_outbox import NotificationOutbox
+    session = TestingSessionLocal()
+    user = create_dummy_user(session)
+    supervisor = create_dummy_user(session, id=2, role=UserRole.SUPERVISOR)
+    docs = [upload_pdf_obj(session, user.id, f"batch{i}.pdf") for i in range(3)]
+    docs[1].status = DocumentStatus.REJECTED
+    # Archivo modificado: el hash se recalcula en el pool
+    docs[2].needs_rehash = True
+    session.commit()
+
+    results = DocumentService.sign_documents(session, [docs[0].id, docs[1].id, 999, docs[2].id, docs[0].id], supervisor.id)
+    assert [r.document_id for r in results] == [docs[0].id, docs[1].id, 999, docs[2].id]
+    assert [r.signed for r in results] == [True, False, False, True]
+    assert "REJECTED" in results[1].error and results[2].error == "Documento no existe"
+
+    session.expire_all()
+    for result, doc in ((results[0], docs[0]), (results[3], docs[2])):
+        doc = session.get(Document, doc.id)
+        assert doc.status == DocumentStatus.SIGNED and not doc.needs_rehash
+        assert result.order == 1 and result.sha256_hash == doc.sha256_hash
+        assert session.get(Signature, result.signature_id).document_id == doc.id
+    assert session.query(NotificationOutbox).count() == 2
+
+    with pytest.raises(ValueError):
+        DocumentService.sign_documents(session, list(range(1, 102)), supervisor.id)
+
+def test_firma_por_lote_rechaza_roles_sin_permiso(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from modules.auth.controllers.auth_controller import get_token_principal
+    from modules.auth.services.auth_service import TokenPrincipal
+    from modules.documents.controllers import signature_controller
+    from modules.documents.models.user import UserRole
+
+    def no_debe_firmar(*args, **kwargs):
+        raise AssertionError("el lote no debe llegar al servicio")
+    monkeypatch.setattr(DocumentService, "sign_documents", no_debe_firmar)
+
+    app = FastAPI()
+    app.include_router(signature_controller.router, prefix="/documents")
+    app.dependency_overrides[signature_controller.get_db] = lambda: None
+    app.dependency_overrides[get_token_principal] = lambda: TokenPrincipal(1, "test1@mail.com", UserRole.EMPLOYEE)
+
+    resp = TestClient(app).post("/documents/sign-batch", json={"document_ids": [1, 2]})
+    assert resp.status_code == 403
+
+def test_orden_de_firma_unico_con_reintento():
+    from sqlalchemy.exc import IntegrityError
+    from modules.documents.models.user import UserRole
+    session = TestingSessionLocal()
+    user = create_dummy_user(session)
+    create_dummy_user(session, id=2, role=UserRole.SUPERVISOR)
+    create_dummy_user(session, id=3, role=UserRole.SUPERVISOR)
+    doc = upload_pdf_obj(session, user.id, "concurrente.pdf")
+    assert doc.signatures == []  # firmas ya cargadas (y luego obsoletas) en esta sesión
+
+    # Otro firmante confirma la firma 1 mientras tanto
+    other = TestingSessionLocal()
+    other.add(Signature(document_id=doc.id, user_id=3, ts=datetime.utcnow(), order=1, sha256_hash="x"))
+    other.commit()
+    other.close()
+
+    sig = DocumentService.add_signature(session, doc.id, 2)
+    assert sig.order == 2
+
+    # La BD rechaza un orden repetido
+    session.add(Signature(document_id=doc.id, user_id=2, ts=datetime.utcnow(), order=2, sha256_hash="x"))
+    with pytest.raises(IntegrityError):
+        session.commit()
+    session.rollback()
+
+def test_retry_de_firma_se_agota_en_conflictos_persistentes():
+    import sqlite3
+    from sqlalchemy.exc import IntegrityError
+    session = TestingSessionLocal()
+    calls = []
+    orig = sqlite3.IntegrityError("UNIQUE constraint failed: signatures.document_id, signatures.order")
+    orig.sqlite_errorname = "SQLITE_CONSTRAINT_UNIQUE"
+
+    def conflicto():
+        calls.append(1)
+        raise IntegrityError("INSERT", {}, orig)
+
+    with pytest.raises(ValueError):
+        DocumentService._retry_signature_conflicts(session, conflicto)
+    assert len(calls) == 3
+
+def test_conflicto_de_orden_se_detecta_por_restriccion_en_postgres():
+    from types import SimpleNamespace
+    from sqlalchemy.exc import IntegrityError
+
+    def pg_error(pgcode, constraint_name):
+        orig = Exception("duplicate key value violates unique constraint")
+        orig.pgcode = pgcode
+        orig.diag = SimpleNamespace(constraint_name=constraint_name)
+        return IntegrityError("INSERT", {}, orig)
+
+    assert DocumentService._is_signature_order_conflict(pg_error("23505", "uq_signatures_document_id_order"))
+    assert not DocumentService._is_signature_order_conflict(pg_error("23505", "uq_documents_user_id_name"))
+    assert not DocumentService._is_signature_order_conflict(pg_error("23503", "uq_signatures_document_id_order"))
+    # El texto del mensaje ya no alcanza para reintentar
+    assert not DocumentService._is_signature_order_conflict(
+        IntegrityError("INSERT", {}, Exception("uq_signatures_document_id_order"))
+    )
+
+def test_firma_por_lote_reintenta_si_otro_firmante_gana_el_orden(tmp_path, monkeypatch):
+    # Base en archivo: cada sesión usa su propia conexión, como dos workers
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'firmas.db'}")
+    Base.metadata.create_all(bind=file_engine)
+    Sessions = sessionmaker(autocommit=False, autoflush=False, bind=file_engine)
+    session = Sessions()
+    create_dummy_user(session, id=1)
+    create_dummy_user(session, id=2, role="SUPERVISOR")
+    create_dummy_user(session, id=3, role="SUPERVISOR")
+    doc = upload_pdf_obj(session, 1, "lote_concurrente.pdf")
+    doc_id = doc.id
+
+    attempts = []
+    original = DocumentStateService.change_document_state
+
+    def cambio_con_firmante_concurrente(*args, **kwargs):
+        attempts.append(1)
+        if len(attempts) == 1:
+            # Otro firmante confirma la firma 1 antes del flush del lote
+            other = Sessions()
+            other.add(Signature(document_id=doc_id, user_id=3, ts=datetime.utcnow(), order=1, sha256_hash="x"))
+            other.commit()
+            other.close()
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(DocumentStateService, "change_document_state", staticmethod(cambio_con_firmante_concurrente))
+
+    [result] = DocumentService.sign_documents(session, [doc_id], 2)
+    assert result.signed and result.order == 2
+    assert len(attempts) == 2
+    assert sorted(s.order for s in session.get(Document, doc_id).signatures) == [1, 2]
+    os.remove(session.get(Document, doc_id).file_path)
+    session.close()
+    file_engine.dispose()
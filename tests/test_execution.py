@@ -0,0 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from execution import _TrackedPool
+
+def test_reset_if_solo_descarta_el_executor_que_fallo():
+    pool = _TrackedPool("test", lambda n: ThreadPoolExecutor(max_workers=n), 1)
+    first = pool.submit(lambda: 1)
+    broken = pool.executor_for(first)
+    assert first.result() == 1
+
+    assert pool.reset_if(broken)
+    second = pool.submit(lambda: 2)
+    replacement = pool.executor_for(second)
+    assert replacement is not broken
+
+    # Un callback tardío del executor viejo no toca el reemplazo
+    assert not pool.reset_if(broken)
+    assert pool.submit(lambda: 3).result() == 3
+    assert pool.executor_for(second) is replacement
+    pool.shutdown()
@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from modules.jobs.models.job_run import JobRun, JobRunStatus
+from modules.jobs.services.job_runner import JobRunner
+from modules.jobs.services.leader import job_leadership
+
+def _session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine)
+
+def test_job_se_ejecuta_una_vez_por_intervalo_y_registra_historial(tmp_path):
+    engine, SessionFactory = _session_factory(tmp_path)
+    calls = []
+
+    def fn(session):
+        calls.append(1)
+        return {"deleted": 3}
+
+    run = JobRunner.run_exclusive(SessionFactory, "limpieza", timedelta(hours=1), fn)
+    assert run.status == JobRunStatus.SUCCEEDED and run.detail == "{'deleted': 3}"
+    assert run.finished_at is not None and run.duration_seconds >= 0
+
+    # Otro worker dentro del mismo intervalo no la repite
+    assert JobRunner.run_exclusive(SessionFactory, "limpieza", timedelta(hours=1), fn) is None
+    assert len(calls) == 1
+
+def test_job_no_corre_si_otro_proceso_es_lider(tmp_path, monkeypatch):
+    monkeypatch.setattr("modules.jobs.services.leader.JOB_LOCK_DIR", str(tmp_path))
+    engine, SessionFactory = _session_factory(tmp_path)
+
+    with job_leadership(engine, "scrub") as leader:
+        assert leader
+        # flock es por descripción de archivo: un segundo open se comporta como otro proceso
+        assert JobRunner.run_exclusive(SessionFactory, "scrub", timedelta(hours=1), lambda s: None) is None
+
+    with SessionFactory() as session:
+        assert session.query(JobRun).count() == 0
+
+def test_job_fallido_queda_registrado_y_se_reintenta(tmp_path):
+    engine, SessionFactory = _session_factory(tmp_path)
+
+    def falla(session):
+        raise RuntimeError("disco lleno")
+
+    run = JobRunner.run_exclusive(SessionFactory, "retencion", timedelta(hours=1), falla)
+    assert run.status == JobRunStatus.FAILED and "disco lleno" in run.detail
+    run = JobRunner.run_exclusive(SessionFactory, "retencion", timedelta(hours=1), lambda s: None)
+    assert run.status == JobRunStatus.SUCCEEDED
+
+def test_ejecucion_running_colgada_no_bloquea_el_job(tmp_path, monkeypatch):
+    from datetime import datetime
+    monkeypatch.setattr("modules.jobs.services.job_runner.JOB_RUN_STALE_SECONDS", 600)
+    engine, SessionFactory = _session_factory(tmp_path)
+    now = datetime.utcnow()
+
+    with SessionFactory() as session:
+        # Un worker que murió a mitad de ejecución hace media hora
+        session.add(JobRun(job_name="limpieza", status=JobRunStatus.RUNNING, started_at=now - timedelta(minutes=30)))
+        session.commit()
+    run = JobRunner.run_exclusive(SessionFactory, "limpieza", timedelta(hours=1), lambda s: None)
+    assert run is not None and run.status == JobRunStatus.SUCCEEDED
+
+    with SessionFactory() as session:
+        # Una ejecución en curso reciente sí cuenta como ejecutada
+        session.add(JobRun(job_name="scrub", status=JobRunStatus.RUNNING, started_at=now - timedelta(minutes=1)))
+        session.commit()
+    assert JobRunner.run_exclusive(SessionFactory, "scrub", timedelta(hours=1), lambda s: None) is None
+
+def test_metricas_de_jobs_solo_para_administradores():
+    from fastapi.testclient import TestClient
+    from main import app
+    from modules.auth.controllers.auth_controller import get_token_principal
+    from modules.auth.services.auth_service import TokenPrincipal
+    from modules.documents.models.user import UserRole
+
+    client = TestClient(app)
+    endpoints = ["/metrics/jobs", "/metrics/startup", "/metrics/executors"]
+    for endpoint in endpoints:
+        assert client.get(endpoint).status_code in (401, 403)
+    app.dependency_overrides[get_token_principal] = lambda: TokenPrincipal(1, "e@mail.com", UserRole.EMPLOYEE)
+    try:
+        for endpoint in endpoints:
+            assert client.get(endpoint).status_code == 403
+        app.dependency_overrides[get_token_principal] = lambda: TokenPrincipal(2, "a@mail.com", UserRole.ADMIN)
+        assert set(client.get("/metrics/startup").json()) == {"mode", "timings_ms"}
+    finally:
+        app.dependency_overrides.clear()
+
+def test_jobs_comparten_un_scheduler_y_no_se_duplican():
+    pytest.importorskip("apscheduler")
+    from modules.jobs.services import scheduler
+
+    try:
+        scheduler.schedule_interval_job("a", lambda: None, hours=1)
+        first = scheduler.get_scheduler()
+        scheduler.schedule_interval_job("b", lambda: None, days=1)
+        scheduler.schedule_interval_job("a", lambda: None, hours=2)
+        assert scheduler.get_scheduler() is first
+        assert sorted(job.id for job in first.get_jobs()) == ["a", "b"]
+    finally:
+        scheduler.shutdown_scheduler()
+    assert scheduler._scheduler is None
@@ -0,0 +1,104 @@
+from sqlalchemy import create_engine, inspect
+
+from migrations import run_migrations
+
+def _index_names(engine, table):
+    return {ix["name"] for ix in inspect(engine).get_indexes(table)}
+
+def test_migraciones_crean_esquema_e_indices(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    applied = run_migrations(engine)
+    assert applied == sorted(applied) and applied[0] == "0001"
+    assert "ix_documents_rejected_rejection_date" in _index_names(engine, "documents")
+    assert "ix_notifications_user_id_created_at" in _index_names(engine, "notifications")
+    assert inspect(engine).has_table("notification_outbox")
+    assert inspect(engine).has_table("job_runs")
+    assert "ix_users_updated_at" in _index_names(engine, "users")
+    assert "uq_signatures_document_id_order" in _index_names(engine, "signatures")
+    assert {"ix_notifications_user_id_unread", "ix_notifications_read_created_at"} <= _index_names(engine, "notifications")
+    # Segunda ejecución: nada pendiente
+    assert run_migrations(engine) == []
+
+def test_migraciones_evolucionan_esquema_existente(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, email VARCHAR NOT NULL, "
+                             "password_hash VARCHAR NOT NULL, role VARCHAR NOT NULL, is_active BOOLEAN, created_at DATETIME)")
+        conn.exec_driver_sql("CREATE TABLE documents (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, file_path VARCHAR NOT NULL, "
+                             "file_size INTEGER NOT NULL, status VARCHAR NOT NULL, upload_date DATETIME, "
+                             "rejection_date DATETIME, signed_date DATETIME, user_id INTEGER NOT NULL)")
+        conn.exec_driver_sql("INSERT INTO users VALUES (1, 'a', 'a@a.com', 'x', 'EMPLOYEE', 1, NULL)")
+        conn.exec_driver_sql("INSERT INTO documents (id, name, file_path, file_size, status, user_id) VALUES "
+                             "(1, 'a.pdf', 'a', 1, 'IN_REVIEW', 1), (2, 'a.pdf', 'a', 1, 'IN_REVIEW', 1)")
+
+    run_migrations(engine)
+
+    columns = {c["name"] for c in inspect(engine).get_columns("documents")}
+    assert {"blob_sha256", "sha256_hash", "file_mtime", "needs_rehash", "pdf_valid"} <= columns
+    assert "uq_documents_user_id_name" in _index_names(engine, "documents")
+    with engine.connect() as conn:
+        names = [row[0] for row in conn.exec_driver_sql("SELECT name FROM documents ORDER BY id")]
+    assert names == ["a.pdf", "a.pdf (2)"]
+    # Sin upload_date el cursor del listado no se podría codificar
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM documents WHERE upload_date IS NULL").scalar() == 0
+
+def test_baseline_congelado_no_depende_de_los_modelos(tmp_path):
+    from migrations import discover_migrations
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    version, baseline = discover_migrations()[0]
+    with engine.begin() as conn:
+        baseline.upgrade(conn)
+
+    assert version == "0001"
+    assert set(inspect(engine).get_table_names()) == {"users", "documents", "signatures", "notifications"}
+    # Columnas e índices posteriores los agregan sus propias migraciones
+    columns = {c["name"] for c in inspect(engine).get_columns("documents")}
+    assert not {"sha256_hash", "blob_sha256", "needs_rehash"} & columns
+    assert _index_names(engine, "documents") == set()
+
+def test_migraciones_no_importan_los_modelos():
+    import inspect as pyinspect
+    from migrations import discover_migrations
+    # Los modelos reflejan el esquema final: una migración que los use cambia
+    # lo que crea cada vez que cambia un modelo
+    for version, module in discover_migrations():
+        source = pyinspect.getsource(module)
+        assert "from modules." not in source and "from database import" not in source, version
+
+class _FakePostgresConnection:
+    """Registra el SQL emitido; indisvalid simula el estado del índice en pg_index"""
+
+    def __init__(self, indisvalid=None):
+        from types import SimpleNamespace
+        self.dialect = SimpleNamespace(name="postgresql")
+        self.info = {}
+        self.indisvalid = indisvalid
+        self.statements = []
+
+    def exec_driver_sql(self, sql):
+        self.statements.append(sql)
+
+    def execute(self, stmt, params=None):
+        from types import SimpleNamespace
+        return SimpleNamespace(scalar=lambda: self.indisvalid)
+
+def test_indices_en_postgres_se_construyen_concurrentemente():
+    from migrations.ops import build_index_concurrently, create_index, take_deferred_indexes
+    conn = _FakePostgresConnection()
+    create_index(conn, "uq_x", "documents", ["user_id", "name"], unique=True, where="name IS NOT NULL")
+    # Dentro de la transacción de la migración no se emite nada
+    assert conn.statements == []
+    [spec] = take_deferred_indexes(conn)
+    assert take_deferred_indexes(conn) == []
+
+    create = "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_x ON documents (user_id, name) WHERE name IS NOT NULL"
+    for indisvalid, expected in [
+        (None, [create]),
+        (True, [create]),
+        # Build anterior interrumpido: se descarta el índice INVALID y se reconstruye
+        (False, ["DROP INDEX CONCURRENTLY IF EXISTS uq_x", create]),
+    ]:
+        autocommit = _FakePostgresConnection(indisvalid)
+        build_index_concurrently(autocommit, spec)
+        assert autocommit.statements == expected
@@ -0,0 +1,365 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from modules.documents.models.document import Document, DocumentStatus
+from modules.documents.models.signature import Signature  # noqa: F401 (mappers)
+from modules.documents.models.user import User, UserRole
+from modules.documents.services.document_state_service import DocumentStateService
+from modules.notifications.models.notification import Notification
+from modules.notifications.models.notification_outbox import NotificationOutbox
+from modules.notifications.repositories.notification_repository import (
+    AsyncNotificationRepository,
+    NotificationRepository,
+)
+from modules.notifications.services.notification_hub import notification_hub
+from modules.notifications.services.notification_service import NotificationService
+from modules.notifications.services.outbox_dispatcher import OutboxDispatcher
+from modules.notifications.services.retention import purge_read_notifications
+from pagination import InvalidCursorError
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'notifications.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def _user(session, id, role=UserRole.EMPLOYEE):
+    session.add(User(id=id, name="Test", email=f"test{id}@mail.com", password_hash="x", role=role, is_active=True))
+    session.commit()
+
+def test_outbox_se_despacha_en_lotes(session):
+    _user(session, 1)
+    _user(session, 2, UserRole.SUPERVISOR)
+    for i in range(3):
+        session.add(Document(id=100 + i, name=f"o{i}.pdf", file_path="x", file_size=1, user_id=1))
+    session.commit()
+
+    for i in range(3):
+        DocumentStateService.change_document_state(session, 100 + i, 2, DocumentStatus.REJECTED)
+    assert session.query(NotificationOutbox).count() == 3
+    assert session.query(Notification).count() == 0
+
+    assert OutboxDispatcher.dispatch(session, batch_size=2) == 3
+    assert session.query(NotificationOutbox).count() == 0
+    notifs = session.query(Notification).order_by(Notification.id).all()
+    assert [n.user_id for n in notifs] == [1, 1, 1]
+    assert "o0.pdf" in notifs[0].message and notifs[0].read is False
+    assert OutboxDispatcher.dispatch(session) == 0
+
+def test_outbox_en_sqlite_lo_despacha_un_solo_worker(session, tmp_path, monkeypatch):
+    from modules.jobs.models.job_run import JobRun, JobRunStatus
+    from modules.jobs.services.leader import job_leadership
+    from modules.notifications.job.outbox_dispatch import OUTBOX_DISPATCH_JOB, dispatch_outbox
+    monkeypatch.setattr("modules.jobs.services.leader.JOB_LOCK_DIR", str(tmp_path))
+    _user(session, 1)
+    session.add(NotificationOutbox(user_id=1, title="t", message="m"))
+    session.commit()
+    SessionFactory = sessionmaker(autoflush=False, bind=session.get_bind())
+
+    # SQLite ignora SKIP LOCKED: mientras otro worker despacha, este no toma filas
+    with job_leadership(session.get_bind(), OUTBOX_DISPATCH_JOB) as leader:
+        assert leader
+        assert dispatch_outbox(SessionFactory) is None
+    assert session.query(NotificationOutbox).count() == 1
+
+    run = dispatch_outbox(SessionFactory)
+    assert run.status == JobRunStatus.SUCCEEDED and run.detail == "1"
+    assert session.query(NotificationOutbox).count() == 0
+    assert session.query(Notification).count() == 1
+    assert session.query(JobRun).filter_by(job_name=OUTBOX_DISPATCH_JOB).count() == 1
+
+def test_feed_de_notificaciones_paginado_y_no_leidas(run_async_session):
+    base = datetime(2024, 1, 1)
+
+    async def escenario(session):
+        session.add(User(id=1, name="Emp", email="e@mail.com", password_hash="x", role=UserRole.EMPLOYEE))
+        session.add_all([
+            Notification(id=i, user_id=1, title="t", message=f"m{i}", read=(i % 2 == 0),
+                         created_at=base + timedelta(minutes=i))
+            for i in range(1, 6)
+        ])
+        await session.commit()
+
+        service = NotificationService(AsyncNotificationRepository(session))
+        page, cursor = await service.get_notifications_page_async(1, limit=2)
+        assert [n.id for n in page] == [5, 4] and cursor
+        page, cursor = await service.get_notifications_page_async(1, limit=2, cursor=cursor)
+        assert [n.id for n in page] == [3, 2]
+        page, cursor = await service.get_notifications_page_async(1, limit=2, cursor=cursor)
+        assert [n.id for n in page] == [1] and cursor is None
+
+        unread, _ = await service.get_notifications_page_async(1, limit=10, unread_only=True)
+        assert [n.id for n in unread] == [5, 3, 1]
+        assert await service.count_unread_async(1) == 3
+
+        with pytest.raises(InvalidCursorError):
+            await service.get_notifications_page_async(1, limit=2, cursor="no-es-cursor")
+
+        # Operaciones masivas: un solo UPDATE/DELETE con la cantidad afectada
+        assert await service.mark_many_as_read_async(1, [1, 2, 3]) == 2
+        assert await service.count_unread_async(1) == 1
+        assert await service.mark_all_as_read_async(1) == 1
+        assert await service.count_unread_async(1) == 0
+        assert await service.delete_read_before_async(1, base + timedelta(minutes=3)) == 2
+        remaining, _ = await service.get_notifications_page_async(1, limit=10)
+        assert [n.id for n in remaining] == [5, 4, 3]
+
+    run_async_session(escenario)
+
+def _index_predicate(name, dialect):
+    index = next(ix for ix in Notification.__table__.indexes if ix.name == name)
+    return str(index.dialect_options[dialect]["where"])
+
+def test_filtros_de_no_leidas_coinciden_con_el_indice_parcial(run_async_session):
+    from sqlalchemy import event
+    from sqlalchemy.dialects import postgresql, sqlite
+
+    async def escenario(session):
+        session.add(User(id=1, name="Emp", email="e@mail.com", password_hash="x", role=UserRole.EMPLOYEE))
+        await session.commit()
+        statements = []
+        event.listen(session.sync_session, "do_orm_execute", lambda state: statements.append(state.statement))
+
+        repo = AsyncNotificationRepository(session)
+        await repo.find_page_by_user_id(1, unread_only=True)
+        await repo.count_unread(1)
+        await repo.mark_read(1)
+        await repo.mark_read(1, [1])
+        return statements
+
+    statements = run_async_session(escenario)
+    assert len(statements) == 4
+    # Postgres solo usa el índice parcial si el filtro implica su predicado (read = false, no read IS false)
+    for dialect, name in ((postgresql.dialect(), "postgresql"), (sqlite.dialect(), "sqlite")):
+        predicate = "notifications." + _index_predicate("ix_notifications_user_id_unread", name)
+        for stmt in statements:
+            assert predicate in str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+def test_filtros_de_leidas_coinciden_con_el_indice_de_retencion(session, run_async_session):
+    from sqlalchemy import event
+    from sqlalchemy.dialects import postgresql, sqlite
+
+    statements = []
+    event.listen(session, "do_orm_execute", lambda state: statements.append(state.statement))
+    session.add(Notification(user_id=1, title="t", message="m", read=True, created_at=datetime(2000, 1, 1)))
+    session.commit()
+    purge_read_notifications(session, retention_days=90)
+
+    async def escenario(async_session):
+        event.listen(async_session.sync_session, "do_orm_execute", lambda state: statements.append(state.statement))
+        await AsyncNotificationRepository(async_session).delete_read_before(1, datetime(2000, 1, 1))
+
+    run_async_session(escenario)
+    # Lote de retención y borrado por usuario: el SELECT de ids y el DELETE filtran por read
+    filtered = [stmt for stmt in statements if "read" in str(stmt.whereclause)]
+    assert len(filtered) == 2
+    for dialect, name in ((postgresql.dialect(), "postgresql"), (sqlite.dialect(), "sqlite")):
+        predicate = "notifications." + _index_predicate("ix_notifications_read_created_at", name)
+        for stmt in filtered:
+            assert predicate in str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+def test_hub_publica_notificaciones_despachadas(session):
+    _user(session, 1)
+    _user(session, 2, UserRole.SUPERVISOR)
+    session.add(Document(id=200, name="push.pdf", file_path="x", file_size=1, user_id=1))
+    session.commit()
+    DocumentStateService.change_document_state(session, 200, 2, DocumentStatus.REJECTED)
+
+    async def escenario():
+        subscriber = notification_hub.subscribe(1)
+        try:
+            OutboxDispatcher.dispatch(session)
+            payload = await asyncio.wait_for(subscriber[1].get(), timeout=1)
+        finally:
+            notification_hub.unsubscribe(1, subscriber)
+        return payload
+
+    payload = asyncio.run(escenario())
+    assert payload["user_id"] == 1 and "push.pdf" in payload["message"]
+    assert notification_hub.connection_count() == 0
+
+def test_creacion_directa_notifica_por_el_puente_si_esta_habilitado(session, run_async_session, monkeypatch):
+    from sqlalchemy import text
+    _user(session, 1)
+    sent, published = [], []
+    monkeypatch.setattr(notification_hub, "bridge_enabled", lambda bind: True)
+    monkeypatch.setattr(
+        notification_hub, "notify_statement",
+        lambda user_id, payload: sent.append((user_id, payload)) or text("SELECT 1")
+    )
+    monkeypatch.setattr(notification_hub, "publish", lambda user_id, payload: published.append(user_id))
+
+    notif = NotificationService(NotificationRepository(session)).create_change_document_state_notification(
+        1, "puente.pdf", "SIGNED"
+    )
+    assert sent == [(1, notification_hub.payload(notif))]
+
+    async def escenario(db):
+        return await NotificationService(AsyncNotificationRepository(db)).create_change_document_state_notification_async(
+            1, "puente.pdf", "REJECTED"
+        )
+
+    notif = run_async_session(escenario)
+    assert sent[1] == (1, notification_hub.payload(notif))
+    assert published == []
+
+def test_retencion_elimina_leidas_antiguas_por_lotes(session):
+    _user(session, 1)
+    old = datetime.utcnow() - timedelta(days=120)
+    session.add_all(
+        [Notification(user_id=1, title="t", message="vieja leída", read=True, created_at=old) for _ in range(5)]
+        + [Notification(user_id=1, title="t", message="vieja no leída", read=False, created_at=old),
+           Notification(user_id=1, title="t", message="reciente", read=True, created_at=datetime.utcnow())]
+    )
+    session.commit()
+
+    report = purge_read_notifications(session, retention_days=90, batch_size=2)
+    assert report.deleted == 5 and report.batches == 3
+    assert sorted(n.message for n in session.query(Notification).all()) == ["reciente", "vieja no leída"]
+
+@pytest.fixture
+def notifications_client(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from database import get_async_db, get_async_read_db
+    from modules.auth.controllers.auth_controller import get_stream_principal, get_token_principal
+    from modules.auth.services.auth_service import TokenPrincipal
+    from modules.notifications.controllers.notification_controller import router
+
+    db_path = tmp_path / "api.db"
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        _user(session, 1)
+        session.add_all([Notification(user_id=1, title="t", message=f"m{i}") for i in range(3)])
+        session.commit()
+    engine.dispose()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    AsyncTestingSession = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_db():
+        async with AsyncTestingSession() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router, prefix="/notifications")
+    app.dependency_overrides[get_async_db] = override_db
+    app.dependency_overrides[get_async_read_db] = override_db
+
+    def as_user(id, role=UserRole.EMPLOYEE):
+        principal = TokenPrincipal(id, f"test{id}@mail.com", role)
+        app.dependency_overrides[get_token_principal] = lambda: principal
+        app.dependency_overrides[get_stream_principal] = lambda: principal
+
+    with TestClient(app) as client:
+        yield client, as_user, async_engine
+
+def test_stream_requiere_token_del_mismo_usuario(notifications_client):
+    client, as_user, _ = notifications_client
+    assert client.get("/notifications/users/1/stream").status_code in (401, 403)
+    as_user(2, UserRole.ADMIN)
+    assert client.get("/notifications/users/1/stream").status_code == 403
+    assert notification_hub.connection_count() == 0
+
+def test_stream_no_retiene_conexiones_del_pool(notifications_client):
+    from modules.auth.services.auth_service import AuthService
+    from modules.auth.services.user_cache import user_cache
+
+    client, _, async_engine = notifications_client
+    token = AuthService.create_access_token({"sub": "test1@mail.com"})
+    user_cache.clear()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/notifications/users/1/stream", "raw_path": b"/notifications/users/1/stream",
+        "root_path": "", "query_string": b"", "client": ("test", 1), "server": ("test", 80),
+        "headers": [(b"host", b"test"), (b"authorization", f"Bearer {token}".encode())],
+    }
+
+    async def escenario():
+        disconnected = asyncio.Event()
+        first_chunk = asyncio.Event()
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                assert message["status"] == 200
+            elif message["type"] == "http.response.body" and message.get("body"):
+                first_chunk.set()
+
+        app_task = asyncio.create_task(client.app(scope, receive, send))
+        await asyncio.wait_for(first_chunk.wait(), timeout=5)
+        checked_out = async_engine.pool.checkedout()
+        connections = notification_hub.connection_count()
+        disconnected.set()
+        await asyncio.wait_for(app_task, timeout=5)
+        await async_engine.dispose()
+        return checked_out, connections
+
+    checked_out, connections = asyncio.run(escenario())
+    assert connections == 1 and checked_out == 0
+    assert notification_hub.connection_count() == 0
+
+def test_hub_avisa_si_hay_varios_workers_sin_puente(monkeypatch, capsys):
+    from modules.notifications.services import notification_hub as hub_module
+    monkeypatch.setattr(hub_module, "NOTIFICATIONS_PG_BRIDGE", False)
+    monkeypatch.setattr(hub_module, "WEB_CONCURRENCY", 4)
+    hub = hub_module.NotificationHub()
+
+    async def escenario():
+        hub.start_listener()
+
+    asyncio.run(escenario())
+    assert "NOTIFICATIONS_PG_BRIDGE" in capsys.readouterr().out
+    assert hub._listener is None
+
+def test_operaciones_masivas_solo_del_propio_usuario_o_admin(notifications_client):
+    client, as_user, _ = notifications_client
+    requests = [
+        ("PATCH", "/notifications/users/1/read-all", {}),
+        ("PATCH", "/notifications/users/1/read", {"json": {"ids": [1]}}),
+        ("DELETE", "/notifications/users/1/read", {"params": {"before": "2100-01-01T00:00:00Z"}}),
+    ]
+    for method, url, kwargs in requests:
+        assert client.request(method, url, **kwargs).status_code in (401, 403)
+
+    as_user(2)
+    for method, url, kwargs in requests:
+        assert client.request(method, url, **kwargs).status_code == 403
+
+    as_user(1)
+    assert client.patch("/notifications/users/1/read", json={"ids": [1]}).json() == {"updated": 1}
+    as_user(99, UserRole.ADMIN)
+    assert client.patch("/notifications/users/1/read-all").json() == {"updated": 2}
+    assert client.delete("/notifications/users/1/read", params={"before": "2100-01-01T00:00:00Z"}).json() == {"deleted": 3}
+
+def test_listado_y_contador_solo_del_propio_usuario_o_admin(notifications_client):
+    client, as_user, _ = notifications_client
+    urls = ["/notifications/users/1", "/notifications/users/1/unread-count"]
+    for url in urls:
+        assert client.get(url).status_code in (401, 403)
+
+    as_user(2)
+    for url in urls:
+        assert client.get(url).status_code == 403
+
+    as_user(1)
+    page = client.get("/notifications/users/1", params={"limit": 2}).json()
+    assert len(page["notifications"]) == 2 and page["next_cursor"]
+    as_user(99, UserRole.ADMIN)
+    assert client.get("/notifications/users/1/unread-count").json() == {"unread": 3}
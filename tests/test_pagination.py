@@ -0,0 +1,19 @@
+from datetime import datetime
+
+import pytest
+
+from pagination import InvalidCursorError, clamp_page_size, decode_cursor, encode_cursor, MAX_PAGE_SIZE
+
+def test_cursor_ida_y_vuelta():
+    date = datetime(2025, 7, 7, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(date, 42)) == (date, 42)
+
+@pytest.mark.parametrize("cursor", ["no-es-cursor", "", encode_cursor(datetime(2025, 1, 1), 1)[:-4] + "%%%%"])
+def test_cursor_invalido(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+def test_tamano_de_pagina_acotado():
+    assert clamp_page_size(0) == 1
+    assert clamp_page_size(10) == 10
+    assert clamp_page_size(10_000) == MAX_PAGE_SIZE